@@ -0,0 +1,206 @@
+import os
+import queue
+import threading
+from datetime import date, datetime
+
+import pymysql
+
+from db_pool import PoolTimeout
+
+
+class ActivityLogWriter:
+    """Background, batched writer for activity_log rows.
+
+    record() stamps the event and puts it on a bounded in-process queue
+    without touching the database. A writer thread drains the queue every
+    `flush_interval` seconds, or sooner once `batch_size` events are
+    waiting, inserting up to `batch_size` rows per multi-row INSERT.
+    stop() drains whatever is left.
+
+    Failed batches are requeued and retried on the next flush. If the
+    queue is full (the database is down or far behind) new events are
+    dropped and counted rather than blocking requests; a crash loses at
+    most the events still queued.
+    """
+
+    def __init__(self, pool, batch_size=500, flush_interval=2.0, max_queue=50000):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self._written = 0
+        self._batches = 0
+        self._failures = 0
+        self._dropped = 0
+
+    def record(self, action_type, table_name, record_id, user_id, details):
+        """Queue one activity_log row"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((action_type, table_name, record_id, user_id, details, datetime.now()))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        # Checked per process so forked workers each get their own writer
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+            self._thread.start()
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything currently queued; returns the number of rows written"""
+        written = 0
+        while True:
+            batch = self._drain()
+            if not batch:
+                return written
+            if not self._write(batch):
+                return written
+            written += len(batch)
+
+    def _write(self, batch):
+        try:
+            conn = self.pool.acquire()
+        except (pymysql.Error, PoolTimeout) as e:
+            print(f"Error writing activity log: {e}")
+            self._requeue(batch)
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO activity_log (action_type, table_name, record_id, user_id, details, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, batch)
+            conn.commit()
+            cursor.close()
+        except pymysql.Error as e:
+            print(f"Error writing activity log: {e}")
+            self._requeue(batch)
+            return False
+        finally:
+            conn.release()
+
+        with self._lock:
+            self._written += len(batch)
+            self._batches += 1
+        return True
+
+    def _requeue(self, batch):
+        with self._lock:
+            self._failures += 1
+        for event in batch:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                with self._lock:
+                    self._dropped += 1
+
+    def stop(self):
+        """Stop the writer thread and write whatever is still queued"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self._thread = None
+        self.flush()
+
+    def stats(self):
+        """Snapshot of writer counters"""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'written': self._written,
+                'batches': self._batches,
+                'failures': self._failures,
+                'dropped': self._dropped,
+            }
+
+
+def _month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def maintain_partitions(conn, retention_months=6, months_ahead=2, today=None):
+    """Keep activity_log's monthly partitions rolling.
+
+    Splits the catch-all `pmax` partition so every month up to
+    `months_ahead` from now has its own partition, then drops partitions
+    whose rows are all older than `retention_months`. Dropping a
+    partition is a metadata operation, unlike a DELETE over old rows.
+    Returns (added, dropped) partition names.
+    """
+    today = today or date.today()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT PARTITION_NAME AS name
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'activity_log'
+        AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    existing = [row['name'] for row in cursor.fetchall()]
+
+    added = []
+    for offset in range(0, months_ahead + 1):
+        month = _month_start(today, offset)
+        name = f"p{month:%Y%m}"
+        if name in existing:
+            continue
+        upper = _month_start(month, 1)
+        cursor.execute(f"""
+            ALTER TABLE activity_log REORGANIZE PARTITION pmax INTO (
+                PARTITION {name} VALUES LESS THAN (UNIX_TIMESTAMP('{upper:%Y-%m-%d}')),
+                PARTITION pmax VALUES LESS THAN MAXVALUE
+            )
+        """)
+        added.append(name)
+
+    cutoff = _month_start(today, -retention_months)
+    dropped = []
+    for name in existing:
+        if name == 'pmax' or not name.startswith('p'):
+            continue
+        try:
+            month = datetime.strptime(name[1:], '%Y%m').date()
+        except ValueError:
+            continue
+        # Every row in this partition is older than the next month's start
+        if _month_start(month, 1) <= cutoff:
+            cursor.execute(f"ALTER TABLE activity_log DROP PARTITION {name}")
+            dropped.append(name)
+
+    cursor.close()
+    return added, dropped
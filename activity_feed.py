@@ -0,0 +1,429 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pymysql
+
+from db_pool import PoolTimeout
+
+
+SUMMARY_LENGTH = 200  # characters of a comment or reply kept in its feed item
+
+FEED_ITEM_COLUMNS = """feed_item_id, kind, user_id, username, video_id, video_title,
+                       comment_id, reply_id, summary, created_at"""
+JOINED_FEED_ITEM_COLUMNS = """f.feed_item_id, f.kind, f.user_id, f.username, f.video_id, f.video_title,
+                              f.comment_id, f.reply_id, f.summary, f.created_at"""
+
+
+def record_feed_item(cursor, kind, user_id, username, video_id, video_title,
+                     comment_id=None, reply_id=None, content=None):
+    """Append a feed_items row in the caller's transaction and return it.
+
+    Hand the returned item to ActivityFeed.published() once the
+    transaction has committed.
+    """
+    item = {
+        'kind': kind,
+        'user_id': user_id,
+        'username': username,
+        'video_id': video_id,
+        'video_title': video_title,
+        'comment_id': comment_id,
+        'reply_id': reply_id,
+        'summary': content[:SUMMARY_LENGTH] if content else None,
+        'created_at': datetime.now().replace(microsecond=0),
+    }
+    cursor.execute("""
+        INSERT INTO feed_items (kind, user_id, username, video_id, video_title,
+                                comment_id, reply_id, summary, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, (kind, user_id, username, video_id, video_title, comment_id, reply_id, item['summary'],
+          item['created_at']))
+    item['feed_item_id'] = cursor.lastrowid
+    return item
+
+
+def parse_cursor(value):
+    """A feed cursor (the last feed_item_id of the previous page), or None if missing or malformed"""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def feed_page(items, limit):
+    """Split limit + 1 newest-first items into (items, next_cursor)"""
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = str(items[-1]['feed_item_id'])
+    return items, next_cursor
+
+
+def fetch_feed_items(cursor, before=None, limit=30):
+    """One page of everyone's feed items from the database, newest first.
+
+    Returns (items, next_cursor); each page is a backwards range scan on
+    the primary key.
+    """
+    position = parse_cursor(before)
+    if position:
+        cursor.execute(f"""
+            SELECT {FEED_ITEM_COLUMNS} FROM feed_items
+            WHERE feed_item_id < %s
+            ORDER BY feed_item_id DESC
+            LIMIT %s
+        """, (position, limit + 1))
+    else:
+        cursor.execute(f"""
+            SELECT {FEED_ITEM_COLUMNS} FROM feed_items
+            ORDER BY feed_item_id DESC
+            LIMIT %s
+        """, (limit + 1,))
+    return feed_page(cursor.fetchall(), limit)
+
+
+def fetch_following_items(cursor, user_id, before=None, limit=30):
+    """One page of a user's fanned-out "following" feed, newest first.
+
+    The page of ids is a range scan on user_feed's primary key; only those
+    rows are then read from feed_items. Returns (items, next_cursor).
+    """
+    conditions, params = ["user_id = %s"], [user_id]
+    position = parse_cursor(before)
+    if position:
+        conditions.append("feed_item_id < %s")
+        params.append(position)
+    cursor.execute(f"""
+        SELECT {JOINED_FEED_ITEM_COLUMNS}
+        FROM (
+            SELECT feed_item_id FROM user_feed
+            WHERE {' AND '.join(conditions)}
+            ORDER BY feed_item_id DESC
+            LIMIT %s
+        ) uf
+        JOIN feed_items f ON uf.feed_item_id = f.feed_item_id
+        ORDER BY f.feed_item_id DESC
+    """, params + [limit + 1])
+    return feed_page(cursor.fetchall(), limit)
+
+
+def follow(cursor, follower_id, followee_id, backfill=50):
+    """Follow a user, copying their newest `backfill` items into the follower's feed.
+
+    Returns False if the follow already existed. The caller commits.
+    """
+    cursor.execute("INSERT IGNORE INTO follows (follower_id, followee_id) VALUES (%s, %s)",
+                   (follower_id, followee_id))
+    if not cursor.rowcount:
+        return False
+    cursor.execute("""
+        INSERT IGNORE INTO user_feed (user_id, feed_item_id)
+        SELECT %s, feed_item_id FROM feed_items
+        WHERE user_id = %s
+        ORDER BY feed_item_id DESC
+        LIMIT %s
+    """, (follower_id, followee_id, backfill))
+    return True
+
+
+def unfollow(cursor, follower_id, followee_id):
+    """Stop following a user and drop their items from the follower's feed.
+
+    Returns False if there was no such follow. The caller commits.
+    """
+    cursor.execute("DELETE FROM follows WHERE follower_id = %s AND followee_id = %s", (follower_id, followee_id))
+    if not cursor.rowcount:
+        return False
+    cursor.execute("""
+        DELETE uf FROM user_feed uf
+        JOIN feed_items f ON uf.feed_item_id = f.feed_item_id
+        WHERE uf.user_id = %s AND f.user_id = %s
+    """, (follower_id, followee_id))
+    return True
+
+
+class ActivityFeed:
+    """The newest feed items in an in-memory ring buffer, plus write-time fan-out.
+
+    Content routes append a feed_items row in their own transaction
+    (record_feed_item()) and call published() after the commit, which
+    adds the item to this process's buffer of the newest `capacity`
+    items and queues its fan-out. recent() serves pages from the buffer
+    and returns None when a page reaches past it, for the caller to read
+    the table instead.
+
+    Items written by other worker processes are pulled in by id every
+    `sync_interval` seconds. The whole buffer is reloaded every
+    `resync_interval` seconds, which also picks up items that committed
+    out of id order and drops items of content deleted elsewhere. Both
+    run on a background thread that recent() starts when one is due, so
+    pages never wait for them; until the first load finishes, recent()
+    returns None.
+
+    Fan-out copies each item into user_feed for every follower of its
+    author on a background thread, `fanout_chunk` followers per
+    transaction, so a popular author never holds locks for long.
+    Followers see new items once that thread gets to them. Failed chunks
+    are retried. A full queue drops items, and so does a crash for the
+    items still queued; dropped items are still in the global feed.
+    """
+
+    def __init__(self, read_pool, write_pool, capacity=1000, sync_interval=2.0, resync_interval=60.0,
+                 fanout_chunk=1000, max_queue=10000):
+        self.read_pool = read_pool
+        self.write_pool = write_pool
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self.resync_interval = resync_interval
+        self.fanout_chunk = fanout_chunk
+
+        self._lock = threading.Lock()
+        self._items = deque(maxlen=capacity)  # oldest first
+        self._loaded = False
+        self._complete = False  # True while the buffer holds every item in the table
+        self._synced_id = 0
+        self._synced_at = 0.0
+        self._resynced_at = 0.0
+        self._syncing = False
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self._hits = 0
+        self._misses = 0
+        self._syncs = 0
+        self._sync_failures = 0
+        self._fanned_out = 0
+        self._fanout_rows = 0
+        self._fanout_failures = 0
+        self._dropped = 0
+
+    def recent(self, before=None, limit=30):
+        """(items, next_cursor) for a page of everyone's feed, or None if the buffer cannot serve it"""
+        self._maybe_sync()
+        position = parse_cursor(before)
+        page = []
+        with self._lock:
+            if self._loaded:
+                for item in reversed(self._items):
+                    if position is None or item['feed_item_id'] < position:
+                        page.append(item)
+                        if len(page) > limit:
+                            break
+            if not self._loaded or (len(page) <= limit and not self._complete):
+                self._misses += 1
+                return None
+            self._hits += 1
+        return feed_page(page, limit)
+
+    def published(self, item):
+        """Add a committed item to the buffer and queue its fan-out to followers"""
+        with self._lock:
+            if self._loaded:
+                if self._items and item['feed_item_id'] < self._items[-1]['feed_item_id']:
+                    self._replace(list(self._items) + [item])
+                else:
+                    if len(self._items) == self.capacity:
+                        self._complete = False
+                    self._items.append(item)
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((item['feed_item_id'], item['user_id'], 0))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    def forget(self, video_ids=(), comment_ids=()):
+        """Drop the items of deleted videos or comments (the table cascades on its own)"""
+        video_ids, comment_ids = set(video_ids), set(comment_ids)
+        with self._lock:
+            self._replace([item for item in self._items
+                           if item['video_id'] not in video_ids and item['comment_id'] not in comment_ids])
+
+    def _replace(self, items):
+        # Called with the lock held
+        items.sort(key=lambda item: item['feed_item_id'])
+        if len(items) > self.capacity:
+            self._complete = False
+        self._items = deque(items[-self.capacity:], maxlen=self.capacity)
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        with self._lock:
+            due_full = now - self._resynced_at >= self.resync_interval
+            if self._syncing or not (due_full or now - self._synced_at >= self.sync_interval):
+                return
+            full = due_full or not self._loaded
+            self._syncing = True
+            self._synced_at = now
+            if full:
+                self._resynced_at = now
+        # Requests never wait for a sync: this one serves the buffer as it is
+        threading.Thread(target=self._background_sync, args=(full,), name='feed-sync', daemon=True).start()
+
+    def _background_sync(self, full):
+        try:
+            self.sync(full)
+        finally:
+            with self._lock:
+                self._syncing = False
+
+    def sync(self, full=False):
+        """Pull in items written since the last sync, or reload the newest `capacity` when `full`"""
+        with self._lock:
+            after = self._synced_id
+            full = full or not self._loaded
+        try:
+            if full:
+                rows = self._query(f"""
+                    SELECT {FEED_ITEM_COLUMNS} FROM feed_items
+                    ORDER BY feed_item_id DESC
+                    LIMIT %s
+                """, (self.capacity,))
+            else:
+                rows = self._query(f"""
+                    SELECT {FEED_ITEM_COLUMNS} FROM feed_items
+                    WHERE feed_item_id > %s
+                    ORDER BY feed_item_id
+                    LIMIT %s
+                """, (after, self.capacity))
+                if len(rows) == self.capacity:
+                    return self.sync(full=True)  # too far behind to patch up
+        except (pymysql.Error, PoolTimeout) as e:
+            print(f"Error syncing activity feed: {e}")
+            with self._lock:
+                self._sync_failures += 1
+            return False
+
+        with self._lock:
+            newest = max((row['feed_item_id'] for row in rows), default=after)
+            if full:
+                # Keep items published here while the query ran
+                kept = [item for item in self._items if item['feed_item_id'] > newest]
+                self._replace(rows + kept)
+                self._complete = len(rows) < self.capacity and len(rows) + len(kept) <= self.capacity
+                self._loaded = True
+            else:
+                known = {item['feed_item_id'] for item in self._items}
+                fresh = [row for row in rows if row['feed_item_id'] not in known]
+                if fresh:
+                    self._replace(list(self._items) + fresh)
+            self._synced_id = max(self._synced_id, newest)
+            self._syncs += 1
+        return True
+
+    def _query(self, sql, params):
+        conn = self.read_pool.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+        finally:
+            conn.release()
+
+    def _ensure_started(self):
+        # Checked per process so forked workers each get their own fan-out thread
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='feed-fanout', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            resume = self._fan_out(*job)
+            if resume is not None:
+                try:
+                    self._queue.put_nowait(resume)
+                except queue.Full:
+                    with self._lock:
+                        self._dropped += 1
+                self._stopping.wait(1)  # back off while the database is unavailable
+
+    def _fan_out(self, feed_item_id, author_id, after):
+        """Copy an item into its author's followers' feeds; returns a job to retry on failure"""
+        while True:
+            try:
+                conn = self.write_pool.acquire()
+            except (pymysql.Error, PoolTimeout) as e:
+                print(f"Error fanning out feed item {feed_item_id}: {e}")
+                with self._lock:
+                    self._fanout_failures += 1
+                return feed_item_id, author_id, after
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT follower_id FROM follows
+                    WHERE followee_id = %s AND follower_id > %s
+                    ORDER BY follower_id
+                    LIMIT %s
+                """, (author_id, after, self.fanout_chunk))
+                followers = [row['follower_id'] for row in cursor.fetchall()]
+                if followers:
+                    cursor.executemany("INSERT IGNORE INTO user_feed (user_id, feed_item_id) VALUES (%s, %s)",
+                                       [(follower_id, feed_item_id) for follower_id in followers])
+                conn.commit()
+                cursor.close()
+            except pymysql.Error as e:
+                conn.rollback()
+                print(f"Error fanning out feed item {feed_item_id}: {e}")
+                with self._lock:
+                    self._fanout_failures += 1
+                return feed_item_id, author_id, after
+            finally:
+                conn.release()
+
+            with self._lock:
+                self._fanout_rows += len(followers)
+            if len(followers) < self.fanout_chunk:
+                with self._lock:
+                    self._fanned_out += 1
+                return None
+            after = followers[-1]
+
+    def stop(self):
+        """Stop the fan-out thread, then fan out whatever is still queued (once, without retries)"""
+        self._stopping.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        self._thread = None
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._fan_out(*job)
+
+    def stats(self):
+        """Snapshot of buffer and fan-out counters"""
+        with self._lock:
+            return {
+                'buffered': len(self._items),
+                'complete': self._complete,
+                'synced_id': self._synced_id,
+                'buffer_hits': self._hits,
+                'buffer_misses': self._misses,
+                'syncs': self._syncs,
+                'sync_failures': self._sync_failures,
+                'fanout_queue': self._queue.qsize(),
+                'fanned_out': self._fanned_out,
+                'fanout_rows': self._fanout_rows,
+                'fanout_failures': self._fanout_failures,
+                'dropped': self._dropped,
+            }
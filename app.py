@@ -1,18 +1,146 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, g, send_from_directory
+from flask import before_render_template, template_rendered
+from werkzeug.middleware.proxy_fix import ProxyFix
 import pymysql
 import os
+import json
+import hashlib
+import hmac
 from datetime import datetime
 from functools import wraps
-import re
+import atexit
+import time
+import click
+import logging
+from markupsafe import Markup
+
+from db_pool import ConnectionPool, PoolTimeout
+from db_router import ReplicaRouter
+from async_db import AsyncDatabase
+from compression import compress_response
+from profiling import RequestMetrics, RequestProfile, acquire_profiled, gauge, log_json, one_line, structured_logger
+from view_counter import ViewCounter
+from cache import TieredCache, shared_store_from_url
+from trending import TrendingEngine
+import counters
+from activity_events import ActivityLogWriter, maintain_partitions
+from activity_feed import ActivityFeed, fetch_feed_items, fetch_following_items, follow, record_feed_item, unfollow
+import search
+from moderation import BulkModerator, ModerationJob, ThumbnailReaper, delete_comment_chunk, delete_video_chunk
+from mentions import UsernameCache, extract_mentions, record_mentions
+from passwords import HasherBusy, LoginRateLimiter, PasswordHasher
+from comment_events import CommentHub, QueueSubscriber, RETRY, SSE_HEADERS
+from thumbnails import ThumbnailProcessor, VARIANT_WIDTHS, is_content_addressed, store_upload, stream_upload, variant_name
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this-in-production'
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['VIDEOS_PER_PAGE'] = 20
+app.config['COMMENTS_PER_PAGE'] = 50
+app.config['REPLIES_PER_PAGE'] = 20
+app.config['THUMBNAIL_WORKERS'] = 2   # background threads resizing uploads
+app.config['THUMBNAIL_MAX_AGE'] = 365 * 24 * 3600  # browser/CDN cache lifetime for thumbnails
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+# Connection pool settings
+app.config['DB_POOL_SIZE'] = 10          # max open connections per process
+app.config['DB_POOL_TIMEOUT'] = 5        # seconds to wait for a free connection
+app.config['DB_POOL_RECYCLE'] = 3600     # replace connections older than this (seconds)
+app.config['DB_POOL_PING_INTERVAL'] = 30 # ping idle connections unused for this long (seconds)
+
+# Read replica settings (replicas are listed in DB_REPLICAS below)
+app.config['DB_REPLICA_MAX_LAG'] = 5          # skip replicas further behind than this (seconds)
+app.config['DB_REPLICA_RETRY_INTERVAL'] = 30  # how long a failed replica is skipped (seconds)
+app.config['DB_REPLICA_CHECK_INTERVAL'] = 5   # seconds between lag checks per replica
+app.config['DB_STICKY_SECONDS'] = 10          # a session reads from the primary this long after writing
+
+# Async database settings (asgi.py turns DB_ASYNC on)
+app.config['DB_ASYNC'] = False           # run independent reads concurrently on an aiomysql pool
+app.config['DB_ASYNC_POOL_SIZE'] = 10    # max aiomysql connections per process
+app.config['ASGI_THREADS'] = 32          # threads running views under asgi.py
+
+# Write-behind view counter settings
+app.config['VIEW_FLUSH_INTERVAL'] = 5       # seconds between view count flushes
+app.config['VIEW_FLUSH_THRESHOLD'] = 1000   # flush early once this many views are pending
+app.config['VIEW_MAX_PENDING'] = 100000     # hard cap on unflushed views held in memory
+
+# Read cache settings
+app.config['CACHE_REDIS_URL'] = None      # 'redis://localhost:6379/0' shares entries across workers; 'memory://' fakes it in-process
+app.config['CACHE_LOCAL_SIZE'] = 1024     # max entries kept in each process
+app.config['CACHE_TAG_TTL'] = 1           # seconds before rechecking shared invalidations
+app.config['CACHE_LOCK_TIMEOUT'] = 5      # max seconds to wait for another worker's load
+app.config['FEED_CACHE_TTL'] = 30         # seconds a cached feed page stays fresh
+app.config['LEADERBOARD_CACHE_TTL'] = 30
+app.config['VIDEO_STATS_CACHE_TTL'] = 10
+app.config['FRAGMENT_CACHE_TTL'] = 300    # rendered HTML; keys change with the data anyway
+
+# Bulk moderation settings
+app.config['MODERATION_CHUNK_SIZE'] = 100    # rows deleted per transaction
+app.config['MODERATION_PAUSE'] = 0.2         # seconds between chunks, so live traffic gets the locks
+app.config['MODERATION_JOB_HISTORY'] = 50    # finished jobs kept for /admin/moderation-jobs
+
+# Mention settings
+app.config['MENTIONS_PER_PAGE'] = 30
+app.config['USERNAME_CACHE_SIZE'] = 10000   # username -> user_id entries kept per process
+app.config['USERNAME_CACHE_TTL'] = 600      # seconds; also how long an unknown @name stays unknown
+
+# Activity Feed Settings
+app.config['FEED_PER_PAGE'] = 30
+app.config['FEED_BUFFER_SIZE'] = 1000         # newest feed items kept in memory per process
+app.config['FEED_SYNC_INTERVAL'] = 2          # seconds between pulls of other workers' new items
+app.config['FEED_RESYNC_INTERVAL'] = 60       # seconds between full reloads of the buffer
+app.config['FEED_FANOUT_CHUNK'] = 1000        # followers written per fan-out transaction
+app.config['FEED_FANOUT_MAX_QUEUE'] = 10000   # items waiting for fan-out before new ones are dropped
+app.config['FEED_FOLLOW_BACKFILL'] = 50       # a new follow copies this many of the user's latest items
+
+# Live comment events (Server-Sent Events) settings
+app.config['COMMENT_EVENTS_HISTORY'] = 50            # recent events per video replayed to reconnecting clients
+app.config['COMMENT_EVENTS_QUEUE_SIZE'] = 100        # events buffered per client before it is dropped
+app.config['COMMENT_EVENTS_MAX_SUBSCRIBERS'] = 10000 # open streams per process
+app.config['COMMENT_EVENTS_HEARTBEAT'] = 15          # seconds between keep-alive pings
+
+# Trending engine settings
+app.config['TRENDING_WINDOW_DAYS'] = 30        # only videos uploaded this recently can trend
+app.config['TRENDING_TOP_N'] = 20
+app.config['TRENDING_HALF_LIFE_HOURS'] = 24    # engagement weight halves every this many hours
+app.config['TRENDING_REFRESH_INTERVAL'] = 60   # seconds between top-N rebuilds
+app.config['TRENDING_RESYNC_INTERVAL'] = 600   # seconds between counter resyncs from the database
+
+# Search settings
+app.config['SEARCH_RESULTS_PER_PAGE'] = 20
+app.config['SEARCH_MAX_PAGE'] = 50   # deeper pages cost an ever larger OFFSET scan
+
+# Activity log settings
+app.config['ACTIVITY_LOG_PER_PAGE'] = 100
+app.config['ACTIVITY_LOG_BATCH_SIZE'] = 500         # rows per multi-row INSERT
+app.config['ACTIVITY_LOG_FLUSH_INTERVAL'] = 2       # seconds between background writes
+app.config['ACTIVITY_LOG_MAX_QUEUE'] = 50000        # events held in memory before new ones are dropped
+app.config['ACTIVITY_LOG_RETENTION_MONTHS'] = 6     # monthly partitions older than this are dropped
+
+# Request profiling and metrics settings
+app.config['QUERY_PROFILING'] = True      # time each request's statements, templates and connection checkouts
+app.config['SLOW_QUERY_SECONDS'] = 0.1    # statements slower than this are logged and counted
+app.config['PROFILE_HEADERS'] = False     # Server-Timing/X-Query-Count response headers; always on under app.debug
+app.config['PROFILE_LOG'] = True          # JSON log line per request (off under app.debug) and per slow query
+app.config['METRICS_TOKEN'] = None        # if set, /metrics requires "Authorization: Bearer <token>"; if not, only localhost may read it
+
+# JSON API / Response Settings
+app.config['API_MAX_AGE'] = 0             # seconds clients may reuse an /api/v1 response before revalidating
+app.config['COMPRESS_RESPONSES'] = True   # gzip/brotli HTML and JSON; turn off if a proxy in front already does
+app.config['COMPRESS_MIN_SIZE'] = 500     # bytes; smaller bodies are sent as-is
+app.config['COMPRESS_LEVEL'] = 6          # gzip 1-9 / brotli quality 0-11
+
+# Login Settings
+app.config['PASSWORD_HASH_METHOD'] = 'scrypt'    # werkzeug method and cost, e.g. 'scrypt:65536:8:1'; older hashes are upgraded at login
+app.config['PASSWORD_HASH_WORKERS'] = 2          # processes hashing passwords; 0 hashes on the request thread
+app.config['PASSWORD_HASH_MAX_PENDING'] = 16     # hashes queued per process before logins are turned away as busy
+app.config['PASSWORD_HASH_TIMEOUT'] = 10         # seconds a login waits for its hash
+app.config['LOGIN_RATE_WINDOW'] = 300            # seconds per rate limit window
+app.config['LOGIN_MAX_ATTEMPTS_PER_IP'] = 30     # login attempts per client IP per window; 0 turns the limit off
+app.config['LOGIN_MAX_FAILURES_PER_USER'] = 10   # wrong passwords per username per window; 0 turns the limit off
+app.config['TRUSTED_PROXIES'] = 0                # reverse proxies in front (1 behind nginx) whose X-Forwarded-* headers are believed
+
 # Database configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -21,20 +149,330 @@ DB_CONFIG = {
     'database': 'youtube_app'
 }
 
+# Read-only replicas of DB_CONFIG's database; each entry overrides DB_CONFIG's
+# keys, e.g. [{'host': 'replica1'}, {'host': '127.0.0.1', 'port': 3307}].
+# Empty means every query goes to the primary.
+DB_REPLICAS = []
+
+# Account for `flask activity-log-maintain`, the only code that alters or drops
+# activity_log partitions; keys override DB_CONFIG's. The web user cannot.
+DB_MAINTENANCE_CONFIG = {
+    'user': 'flaskmaint',
+    'password': 'maintpass',  # Change this to the maintenance account's password
+}
+
+DB_POOL_KWARGS = {
+    'size': app.config['DB_POOL_SIZE'],
+    'timeout': app.config['DB_POOL_TIMEOUT'],
+    'recycle': app.config['DB_POOL_RECYCLE'],
+    'ping_interval': app.config['DB_POOL_PING_INTERVAL'],
+}
+
+db_pool = ConnectionPool(DB_CONFIG, **DB_POOL_KWARGS)
+
+read_router = ReplicaRouter.from_config(
+    db_pool, DB_REPLICAS, DB_CONFIG, DB_POOL_KWARGS,
+    max_lag=app.config['DB_REPLICA_MAX_LAG'],
+    retry_interval=app.config['DB_REPLICA_RETRY_INTERVAL'],
+    check_interval=app.config['DB_REPLICA_CHECK_INTERVAL']
+)
+
+# Concurrent reads for DB_ASYNC mode: one aiomysql pool for the primary and one
+# per replica, picked by read_router the same way as the synchronous reads
+DB_ASYNC_KWARGS = {
+    'maxsize': app.config['DB_ASYNC_POOL_SIZE'],
+    'timeout': app.config['DB_POOL_TIMEOUT'],
+    'recycle': app.config['DB_POOL_RECYCLE'],
+}
+async_db = AsyncDatabase(DB_CONFIG, **DB_ASYNC_KWARGS)
+atexit.register(async_db.stop)
+async_replicas = {replica.name: AsyncDatabase(replica.pool.connect_kwargs, **DB_ASYNC_KWARGS)
+                  for replica in read_router.replicas}
+for replica_db in async_replicas.values():
+    atexit.register(replica_db.stop)
+
+# Per-route latency histograms for /metrics, and the structured request log
+request_metrics = RequestMetrics()
+request_log = structured_logger('vidstream.requests')
+
+view_counter = ViewCounter(
+    db_pool,
+    flush_interval=app.config['VIEW_FLUSH_INTERVAL'],
+    flush_threshold=app.config['VIEW_FLUSH_THRESHOLD'],
+    max_pending=app.config['VIEW_MAX_PENDING']
+)
+atexit.register(view_counter.stop)
+
+activity_writer = ActivityLogWriter(
+    db_pool,
+    batch_size=app.config['ACTIVITY_LOG_BATCH_SIZE'],
+    flush_interval=app.config['ACTIVITY_LOG_FLUSH_INTERVAL'],
+    max_queue=app.config['ACTIVITY_LOG_MAX_QUEUE']
+)
+atexit.register(activity_writer.stop)
+
+# Feed pages, stats, the leaderboard and rendered fragments, tagged so writes can invalidate them:
+#   'videos'         - anything listing videos (feed pages)
+#   'video:<id>'     - one video's comment list and stats
+#   'leaderboard'    - the leaderboard table
+shared_store = shared_store_from_url(app.config['CACHE_REDIS_URL'])
+read_cache = TieredCache(
+    shared=shared_store,
+    local_size=app.config['CACHE_LOCAL_SIZE'],
+    ttl=app.config['FEED_CACHE_TTL'],
+    tag_ttl=app.config['CACHE_TAG_TTL'],
+    lock_timeout=app.config['CACHE_LOCK_TIMEOUT']
+)
+
+# Password hashing off the request threads, and login throttling shared through the cache store
+password_hasher = PasswordHasher(
+    method=app.config['PASSWORD_HASH_METHOD'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+    timeout=app.config['PASSWORD_HASH_TIMEOUT']
+)
+atexit.register(password_hasher.stop)
+
+# Behind a reverse proxy request.remote_addr is the proxy's address, which would put
+# every visitor under one login rate limit; take the client's from X-Forwarded-For
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'],
+                            x_proto=app.config['TRUSTED_PROXIES'], x_host=app.config['TRUSTED_PROXIES'])
+
+login_limiter = LoginRateLimiter(
+    shared_store,
+    max_per_ip=app.config['LOGIN_MAX_ATTEMPTS_PER_IP'],
+    max_failures_per_user=app.config['LOGIN_MAX_FAILURES_PER_USER'],
+    window=app.config['LOGIN_RATE_WINDOW']
+)
+
+# Newest feed items in memory for /feed, and write-time fan-out to followers for /feed/following
+activity_feed = ActivityFeed(
+    read_router,
+    db_pool,
+    capacity=app.config['FEED_BUFFER_SIZE'],
+    sync_interval=app.config['FEED_SYNC_INTERVAL'],
+    resync_interval=app.config['FEED_RESYNC_INTERVAL'],
+    fanout_chunk=app.config['FEED_FANOUT_CHUNK'],
+    max_queue=app.config['FEED_FANOUT_MAX_QUEUE']
+)
+atexit.register(activity_feed.stop)
+
+# Resolves @mentions in replies
+username_cache = UsernameCache(
+    maxsize=app.config['USERNAME_CACHE_SIZE'],
+    ttl=app.config['USERNAME_CACHE_TTL']
+)
+
+# New comments and replies, pushed to open video pages
+comment_hub = CommentHub(
+    history=app.config['COMMENT_EVENTS_HISTORY'],
+    max_subscribers=app.config['COMMENT_EVENTS_MAX_SUBSCRIBERS']
+)
+
+thumbnail_processor = ThumbnailProcessor(app.config['UPLOAD_FOLDER'], max_workers=app.config['THUMBNAIL_WORKERS'])
+
+# Deletes thumbnail files once no video uses them, after the deleting transaction commits
+thumbnail_reaper = ThumbnailReaper(db_pool, thumbnail_processor)
+
+trending_engine = TrendingEngine(
+    read_router,
+    window_days=app.config['TRENDING_WINDOW_DAYS'],
+    top_n=app.config['TRENDING_TOP_N'],
+    half_life_hours=app.config['TRENDING_HALF_LIFE_HOURS'],
+    refresh_interval=app.config['TRENDING_REFRESH_INTERVAL'],
+    resync_interval=app.config['TRENDING_RESYNC_INTERVAL']
+)
+
+def after_delete(kind, rows):
+    """Drop deleted videos or comments from the caches, trending list and activity feed"""
+    if kind == 'videos':
+        activity_feed.forget(video_ids=[row['video_id'] for row in rows])
+        read_cache.invalidate('videos', *(f"video:{row['video_id']}" for row in rows))
+        for row in rows:
+            trending_engine.remove_video(row['video_id'])
+            activity_writer.record('DELETE', 'videos', row['video_id'], row['user_id'],
+                                   f"Video deleted: {row['title']} (Views: {row['views']})")
+    else:
+        activity_feed.forget(comment_ids=[row['comment_id'] for row in rows])
+        read_cache.invalidate(*{f"video:{row['video_id']}" for row in rows})
+
+# Chunked, throttled deletes for the admin bulk actions and cleanup commands
+bulk_moderator = BulkModerator(
+    db_pool,
+    thumbnail_reaper,
+    chunk_size=app.config['MODERATION_CHUNK_SIZE'],
+    pause=app.config['MODERATION_PAUSE'],
+    history=app.config['MODERATION_JOB_HISTORY'],
+    on_deleted=after_delete
+)
+
+def request_profile():
+    """The current request's RequestProfile, or None when QUERY_PROFILING is off"""
+    return g.get('profile') if app.config['QUERY_PROFILING'] else None
+
 def get_db_connection():
-    """Create and return a database connection"""
-    try:
-        connection = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        return connection
-    except pymysql.Error as e:
-        print(f"Error connecting to MySQL: {e}")
-        return None
+    """Return the pooled database connection for the current request"""
+    if 'db_conn' not in g:
+        try:
+            g.db_conn = acquire_profiled(db_pool, request_profile())
+        except (pymysql.Error, PoolTimeout) as e:
+            print(f"Error connecting to MySQL: {e}")
+            return None
+    return g.db_conn
+
+def reads_from_primary():
+    """True while this session must see its own recent writes"""
+    return session.get('primary_until', 0) > time.time()
+
+def stick_to_primary():
+    """Route this session's reads to the primary for DB_STICKY_SECONDS after a write"""
+    session['primary_until'] = time.time() + app.config['DB_STICKY_SECONDS']
+
+def get_read_connection():
+    """Return a connection for read-only queries in the current request.
+    
+    Comes from a healthy replica, unless the session wrote recently (see
+    stick_to_primary()) or a primary connection is already checked out.
+    """
+    if 'db_conn' in g or reads_from_primary():
+        return get_db_connection()
+    if 'read_conn' not in g:
+        try:
+            g.read_conn = acquire_profiled(read_router, request_profile())
+        except (pymysql.Error, PoolTimeout) as e:
+            print(f"Error connecting to MySQL: {e}")
+            return None
+    return g.read_conn
+
+@app.before_request
+def start_request_profile():
+    g.profile = RequestProfile(slow_query_seconds=app.config['SLOW_QUERY_SECONDS'])
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    profile = request_profile()
+    if profile is not None:
+        profile.template_started()
+
+@template_rendered.connect_via(app)
+def stop_template_timer(sender, template, context, **extra):
+    profile = request_profile()
+    if profile is not None:
+        profile.template_finished()
+
+@app.after_request
+def record_request_profile(response):
+    """Feed /metrics, then report the request's timings as headers (dev) or log lines (prod)"""
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    elapsed = profile.elapsed()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if not app.config['QUERY_PROFILING']:
+        request_metrics.observe(route, request.method, response.status_code, elapsed)
+        return response
+    request_metrics.observe(route, request.method, response.status_code, elapsed, profile)
+    
+    if app.debug or app.config['PROFILE_HEADERS']:
+        response.headers['Server-Timing'] = profile.server_timing()
+        response.headers['X-Query-Count'] = str(profile.queries)
+        if profile.slowest_sql:
+            response.headers['X-Slowest-Query'] = f"{profile.slowest_time * 1000:.2f}ms {one_line(profile.slowest_sql, 200)}"
+    if app.config['PROFILE_LOG']:
+        for sql, seconds in profile.slow_queries:
+            log_json(request_log, logging.WARNING, event='slow_query', route=route,
+                     ms=round(seconds * 1000, 2), sql=one_line(sql))
+        if not app.debug:
+            log_json(request_log, logging.INFO, event='request', method=request.method, path=request.path,
+                     route=route, status=response.status_code, ms=round(elapsed * 1000, 2), **profile.to_dict())
+    return response
+
+@app.after_request
+def compress_text_response(response):
+    """gzip or brotli HTML and JSON bodies for clients that accept it"""
+    if app.config['COMPRESS_RESPONSES']:
+        compress_response(response, request.accept_encodings,
+                          min_size=app.config['COMPRESS_MIN_SIZE'], level=app.config['COMPRESS_LEVEL'])
+    return response
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Hand the request's connections back to their pools"""
+    for key in ('db_conn', 'read_conn'):
+        conn = g.pop(key, None)
+        if conn is not None:
+            conn.release()
+
+class DatabaseUnavailable(Exception):
+    """Raised by cache loaders that could not get a database connection"""
+
+def read_connection_or_raise():
+    """get_read_connection() for cache loaders, which cannot return a fallback page"""
+    conn = get_read_connection()
+    if not conn:
+        raise DatabaseUnavailable()
+    return conn
+
+def run_reads(*queries):
+    """Run independent read queries, concurrently when DB_ASYNC is on.
+    
+    Each query is an (sql, args, one) tuple, where `one` picks fetchone()
+    over fetchall(); the results come back in the same order. Without
+    DB_ASYNC they run one after another on the request's read connection.
+    Under DB_ASYNC they go where get_read_connection() would send them: a
+    healthy replica, or the primary after a recent write. Raises
+    DatabaseUnavailable if no connection can be had.
+    """
+    if app.config['DB_ASYNC']:
+        profile = request_profile()
+        on_query = profile.record if profile else None
+        if 'db_conn' not in g and not reads_from_primary():
+            replica = read_router.choose()
+            if replica is not None:
+                try:
+                    return async_replicas[replica.name].gather(*queries, on_query=on_query)
+                except (pymysql.err.OperationalError, PoolTimeout) as e:
+                    read_router.mark_down(replica, e)  # and retry on the primary
+        try:
+            return async_db.gather(*queries, on_query=on_query)
+        except (pymysql.err.OperationalError, PoolTimeout) as e:
+            print(f"Error running async queries: {e}")
+            raise DatabaseUnavailable()
+    
+    cursor = read_connection_or_raise().cursor()
+    results = []
+    for sql, args, one in queries:
+        cursor.execute(sql, args)
+        results.append(cursor.fetchone() if one else cursor.fetchall())
+    cursor.close()
+    return results
+
+def render_fragment(template, key, load_context, tags=(), shared=True):
+    """Render a partial template, reusing cached HTML rendered for the same key.
+    
+    `key` must change whenever the fragment's data does (an entity version,
+    counts, a cursor, whether the viewer is logged in). load_context() is
+    only called on a miss, so it can hold the queries the fragment needs.
+    Fragments must not contain per-request text; timestamps go through
+    the timeago_html filter and are made relative in the browser.
+    """
+    return read_cache.get_or_load(
+        ('fragment', template) + key,
+        lambda: Markup(render_template(template, **load_context())),
+        ttl=app.config['FRAGMENT_CACHE_TTL'], tags=tags, shared=shared
+    )
+
+def wants_json():
+    """True for requests from the page scripts, which ask for JSON instead of a redirect"""
+    return request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+def post_failed(message, video_id, status=400):
+    """Error response for the comment and reply forms: JSON, or a flash and a redirect"""
+    if wants_json():
+        return jsonify({'error': message}), status
+    flash(message, 'danger')
+    return redirect(url_for('video', video_id=video_id))
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -63,26 +501,300 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def encode_cursor(created_at, row_id):
+    """Build an opaque keyset cursor from a row's (created_at, id)"""
+    return f"{created_at.strftime('%Y%m%d%H%M%S')}-{row_id}"
+
+def decode_cursor(cursor):
+    """Parse a keyset cursor, returning None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        stamp, row_id = cursor.split('-', 1)
+        return datetime.strptime(stamp, '%Y%m%d%H%M%S'), int(row_id)
+    except ValueError:
+        return None
+
+def comment_page_query(video_id, before=None, limit=None):
+    """Build the (sql, args, one) query for one page of a video's comments, for run_reads().
+    
+    Pages are keyed on (created_at, comment_id) so every page is an index
+    range scan on idx_comments_video_created, however deep it is. One
+    extra row is fetched to tell whether another page follows.
+    """
+    limit = limit or app.config['COMMENTS_PER_PAGE']
+    position = decode_cursor(before)
+    
+    if position:
+        return ("""
+            SELECT c.comment_id, c.video_id, c.user_id, c.content, c.created_at, u.username 
+            FROM comments c 
+            JOIN users u ON c.user_id = u.user_id 
+            WHERE c.video_id = %s 
+            AND (c.created_at < %s OR (c.created_at = %s AND c.comment_id < %s))
+            ORDER BY c.created_at DESC, c.comment_id DESC
+            LIMIT %s
+        """, (video_id, position[0], position[0], position[1], limit + 1), False)
+    return ("""
+            SELECT c.comment_id, c.video_id, c.user_id, c.content, c.created_at, u.username 
+            FROM comments c 
+            JOIN users u ON c.user_id = u.user_id 
+            WHERE c.video_id = %s 
+            ORDER BY c.created_at DESC, c.comment_id DESC
+            LIMIT %s
+        """, (video_id, limit + 1), False)
+
+def comment_page(comments, limit=None):
+    """Split comment_page_query() rows into (comments, next_cursor)"""
+    limit = limit or app.config['COMMENTS_PER_PAGE']
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        last = comments[-1]
+        next_cursor = encode_cursor(last['created_at'], last['comment_id'])
+    return comments, next_cursor
+
+def fetch_comment_page(cursor, video_id, before=None, limit=None):
+    """Fetch one page of a video's comments, newest first.
+    
+    Returns (comments, next_cursor); next_cursor is None on the last page.
+    """
+    sql, args, _ = comment_page_query(video_id, before, limit)
+    cursor.execute(sql, args)
+    return comment_page(cursor.fetchall(), limit)
+
+def reply_counts_query(comments):
+    """Build the (sql, args, one) query counting replies per comment, for run_reads()"""
+    placeholders = ', '.join(['%s'] * len(comments))
+    return (f"""
+        SELECT comment_id, COUNT(*) AS reply_count
+        FROM replies
+        WHERE comment_id IN ({placeholders})
+        GROUP BY comment_id
+    """, [comment['comment_id'] for comment in comments], False)
+
+def set_reply_counts(comments, rows):
+    """Set reply_count on each comment from reply_counts_query() rows"""
+    counts = {row['comment_id']: row['reply_count'] for row in rows}
+    for comment in comments:
+        comment['reply_count'] = counts.get(comment['comment_id'], 0)
+    return comments
+
+def load_comment_page(video_id, before=None, rows=None):
+    """One page of a video's comments with reply counts, as (comments, next_cursor).
+    
+    `rows` are comment_page_query() results already fetched, if any.
+    Raises DatabaseUnavailable like run_reads().
+    """
+    if rows is None:
+        rows = run_reads(comment_page_query(video_id, before))[0]
+    comments, next_cursor = comment_page(rows)
+    if comments:
+        set_reply_counts(comments, run_reads(reply_counts_query(comments))[0])
+    return comments, next_cursor
+
+def load_reply_counts(cursor, comments):
+    """Set reply_count on each comment using one grouped query"""
+    if not comments:
+        return comments
+    sql, args, _ = reply_counts_query(comments)
+    cursor.execute(sql, args)
+    return set_reply_counts(comments, cursor.fetchall())
+
+def fetch_reply_page(cursor, comment_id, after=None, limit=None):
+    """Fetch one page of a comment's replies, oldest first.
+    
+    Returns (replies, next_cursor) like fetch_comment_page().
+    """
+    limit = limit or app.config['REPLIES_PER_PAGE']
+    position = decode_cursor(after)
+    
+    if position:
+        cursor.execute("""
+            SELECT r.reply_id, r.comment_id, r.content, r.created_at,
+                   u.username, m.username as mentioned_username
+            FROM replies r 
+            JOIN users u ON r.user_id = u.user_id 
+            LEFT JOIN users m ON r.mentioned_user_id = m.user_id
+            WHERE r.comment_id = %s 
+            AND (r.created_at > %s OR (r.created_at = %s AND r.reply_id > %s))
+            ORDER BY r.created_at ASC, r.reply_id ASC
+            LIMIT %s
+        """, (comment_id, position[0], position[0], position[1], limit + 1))
+    else:
+        cursor.execute("""
+            SELECT r.reply_id, r.comment_id, r.content, r.created_at,
+                   u.username, m.username as mentioned_username
+            FROM replies r 
+            JOIN users u ON r.user_id = u.user_id 
+            LEFT JOIN users m ON r.mentioned_user_id = m.user_id
+            WHERE r.comment_id = %s 
+            ORDER BY r.created_at ASC, r.reply_id ASC
+            LIMIT %s
+        """, (comment_id, limit + 1))
+    replies = cursor.fetchall()
+    
+    next_cursor = None
+    if len(replies) > limit:
+        replies = replies[:limit]
+        last = replies[-1]
+        next_cursor = encode_cursor(last['created_at'], last['reply_id'])
+    return replies, next_cursor
+
+def fetch_feed_page(cursor, before=None, limit=None):
+    """Fetch one page of the homepage feed, newest first.
+    
+    Only the columns index.html renders are selected. Returns
+    (videos, next_cursor) like fetch_comment_page().
+    """
+    limit = limit or app.config['VIDEOS_PER_PAGE']
+    position = decode_cursor(before)
+    
+    if position:
+        cursor.execute("""
+            SELECT v.video_id, v.title, v.thumbnail_path, v.views, v.created_at, u.username 
+            FROM videos v 
+            JOIN users u ON v.user_id = u.user_id 
+            WHERE v.created_at < %s OR (v.created_at = %s AND v.video_id < %s)
+            ORDER BY v.created_at DESC, v.video_id DESC
+            LIMIT %s
+        """, (position[0], position[0], position[1], limit + 1))
+    else:
+        cursor.execute("""
+            SELECT v.video_id, v.title, v.thumbnail_path, v.views, v.created_at, u.username 
+            FROM videos v 
+            JOIN users u ON v.user_id = u.user_id 
+            ORDER BY v.created_at DESC, v.video_id DESC
+            LIMIT %s
+        """, (limit + 1,))
+    videos = cursor.fetchall()
+    
+    next_cursor = None
+    if len(videos) > limit:
+        videos = videos[:limit]
+        last = videos[-1]
+        next_cursor = encode_cursor(last['created_at'], last['video_id'])
+    return videos, next_cursor
+
+def fetch_activity_page(cursor, before=None, limit=None, action=None, table=None):
+    """Fetch one page of the activity log, newest first.
+    
+    `action` and `table` optionally filter on action_type/table_name, each
+    backed by a (column, created_at, log_id) index so a filtered page reads
+    only matching rows. Returns (logs, next_cursor) like fetch_comment_page().
+    """
+    limit = limit or app.config['ACTIVITY_LOG_PER_PAGE']
+    position = decode_cursor(before)
+    
+    conditions, params = [], []
+    if action:
+        conditions.append("action_type = %s")
+        params.append(action)
+    if table:
+        conditions.append("table_name = %s")
+        params.append(table)
+    if position:
+        conditions.append("(created_at < %s OR (created_at = %s AND log_id < %s))")
+        params.extend([position[0], position[0], position[1]])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    cursor.execute(f"""
+        SELECT log_id, action_type, table_name, record_id, user_id, details, created_at
+        FROM activity_log
+        {where}
+        ORDER BY created_at DESC, log_id DESC
+        LIMIT %s
+    """, params + [limit + 1])
+    logs = cursor.fetchall()
+    
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        last = logs[-1]
+        next_cursor = encode_cursor(last['created_at'], last['log_id'])
+    return logs, next_cursor
+
+def fetch_mentions_page(cursor, user_id, before=None, limit=None):
+    """Fetch one page of the replies that mention a user, newest first.
+    
+    The page of mention ids is a range scan on idx_mentions_user_created;
+    the reply, author, comment and video are then joined for just those
+    rows. Returns (mentions, next_cursor) like fetch_comment_page().
+    """
+    limit = limit or app.config['MENTIONS_PER_PAGE']
+    position = decode_cursor(before)
+    
+    conditions, params = ["m.mentioned_user_id = %s"], [user_id]
+    if position:
+        conditions.append("(m.created_at < %s OR (m.created_at = %s AND m.mention_id < %s))")
+        params.extend([position[0], position[0], position[1]])
+    
+    cursor.execute(f"""
+        SELECT m.mention_id, m.created_at, r.reply_id, r.comment_id, r.content,
+               u.username, c.video_id, v.title AS video_title
+        FROM (
+            SELECT mention_id, reply_id, created_at
+            FROM mentions m
+            WHERE {' AND '.join(conditions)}
+            ORDER BY m.created_at DESC, m.mention_id DESC
+            LIMIT %s
+        ) m
+        JOIN replies r ON m.reply_id = r.reply_id
+        JOIN users u ON r.user_id = u.user_id
+        JOIN comments c ON r.comment_id = c.comment_id
+        JOIN videos v ON c.video_id = v.video_id
+        ORDER BY m.created_at DESC, m.mention_id DESC
+    """, params + [limit + 1])
+    mentions = cursor.fetchall()
+    
+    next_cursor = None
+    if len(mentions) > limit:
+        mentions = mentions[:limit]
+        last = mentions[-1]
+        next_cursor = encode_cursor(last['created_at'], last['mention_id'])
+    return mentions, next_cursor
+
+def acquire_thumbnail(cursor, filename):
+    """Add a reference to a thumbnail file, locking its refcount row"""
+    cursor.execute("""
+        INSERT INTO thumbnails (thumbnail_path, refcount) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE refcount = refcount + 1
+    """, (filename,))
+
+def feed_page(before=None):
+    """One page of the homepage feed as (videos, next_cursor), cached per cursor.
+    
+    Raises DatabaseUnavailable if the page is not cached and cannot be read.
+    """
+    cache_key = ('feed', before if decode_cursor(before) else 'first')
+    
+    def load_page():
+        conn = read_connection_or_raise()
+        cursor = conn.cursor()
+        page = fetch_feed_page(cursor, before)
+        cursor.close()
+        conn.close()
+        return page
+    
+    if reads_from_primary():
+        # A session that just wrote skips the cache, which a replica may have filled
+        page = load_page()
+        read_cache.set(cache_key, page, tags=('videos',))
+        return page
+    return read_cache.get_or_load(cache_key, load_page, tags=('videos',))
+
 @app.route('/')
 def index():
-    """Homepage showing all videos"""
-    conn = get_db_connection()
-    if not conn:
+    """Homepage showing the newest videos, one cached page at a time"""
+    before = request.args.get('before')
+    try:
+        videos, next_cursor = feed_page(before)
+    except DatabaseUnavailable:
         flash('Database connection error', 'danger')
         return render_template('index.html', videos=[])
     
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT v.*, u.username 
-        FROM videos v 
-        JOIN users u ON v.user_id = u.user_id 
-        ORDER BY v.created_at DESC
-    """)
-    videos = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    return render_template('index.html', videos=videos)
+    return render_template('index.html', videos=videos, next_cursor=next_cursor,
+                           paged=decode_cursor(before) is not None)
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -113,23 +825,41 @@ def register():
         
         cursor = conn.cursor()
         
-        # Check if username or email exists
-        cursor.execute("SELECT * FROM users WHERE username = %s OR email = %s", (username, email))
-        if cursor.fetchone():
+        # Check if username or email exists; each EXISTS is a probe of its unique index
+        cursor.execute("""
+            SELECT EXISTS(SELECT 1 FROM users WHERE username = %s)
+                OR EXISTS(SELECT 1 FROM users WHERE email = %s) AS taken
+        """, (username, email))
+        if cursor.fetchone()['taken']:
             flash('Username or email already exists.', 'danger')
             cursor.close()
             conn.close()
             return redirect(url_for('register'))
         
+        try:
+            password_hash = password_hasher.hash(password)
+        except HasherBusy:
+            cursor.close()
+            conn.close()
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return redirect(url_for('register'))
+        
         # Create user
-        password_hash = generate_password_hash(password)
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
-            (username, email, password_hash)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        try:
+            cursor.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                (username, email, password_hash)
+            )
+            conn.commit()
+        except pymysql.IntegrityError:
+            # Taken by a concurrent registration since the check above
+            conn.rollback()
+            flash('Username or email already exists.', 'danger')
+            return redirect(url_for('register'))
+        finally:
+            cursor.close()
+            conn.close()
+        username_cache.forget(username)  # it may be cached as unknown from an earlier @mention
         
         flash('Registration successful! Please log in.', 'success')
         return redirect(url_for('login'))
@@ -147,24 +877,53 @@ def login():
             flash('Username and password are required.', 'danger')
             return redirect(url_for('login'))
         
+        client = request.remote_addr or 'unknown'
+        retry_after = login_limiter.retry_after(client, username)
+        if retry_after:
+            flash(f'Too many login attempts. Please try again in {retry_after} seconds.', 'danger')
+            return redirect(url_for('login'))
+        login_limiter.attempted(client)
+        
         conn = get_db_connection()
         if not conn:
             flash('Database connection error', 'danger')
             return redirect(url_for('login'))
         
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+        cursor.execute(
+            "SELECT user_id, username, password_hash, is_admin FROM users WHERE username = %s",
+            (username,)
+        )
         user = cursor.fetchone()
+        
+        matches = False
+        if user:
+            try:
+                matches, new_hash = password_hasher.verify(user['password_hash'], password)
+            except HasherBusy:
+                cursor.close()
+                conn.close()
+                flash('The server is busy. Please try logging in again in a moment.', 'warning')
+                return redirect(url_for('login'))
+            if new_hash:
+                # Upgrade to the configured method/cost; skipped if the password changed meanwhile
+                cursor.execute(
+                    "UPDATE users SET password_hash = %s WHERE user_id = %s AND password_hash = %s",
+                    (new_hash, user['user_id'], user['password_hash'])
+                )
+                conn.commit()
         cursor.close()
         conn.close()
         
-        if user and check_password_hash(user['password_hash'], password):
+        if matches:
+            login_limiter.succeeded(username)
             session['user_id'] = user['user_id']
             session['username'] = user['username']
             session['is_admin'] = user['is_admin']
             flash(f'Welcome back, {user["username"]}!', 'success')
             return redirect(url_for('index'))
         else:
+            login_limiter.failed(username)
             flash('Invalid username or password.', 'danger')
             return redirect(url_for('login'))
     
@@ -201,31 +960,54 @@ def upload():
             return redirect(url_for('upload'))
         
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            # Add timestamp to filename to avoid conflicts
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            
-            # Create upload folder if it doesn't exist
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
-            file.save(filepath)
+            # Stream to disk; the content hash becomes the file name so identical files share one copy.
+            # The extension comes from the name allowed_file() checked; only the hash reaches the path
+            extension = file.filename.rsplit('.', 1)[1].lower()
+            temp_path, digest = stream_upload(file, app.config['UPLOAD_FOLDER'])
+            filename = f"{digest[:32]}.{extension}"
             
             # Save to database
             conn = get_db_connection()
             if not conn:
+                os.remove(temp_path)
                 flash('Database connection error', 'danger')
                 return redirect(url_for('upload'))
             
             cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO videos (title, description, thumbnail_path, user_id) VALUES (%s, %s, %s, %s)",
-                (title, description, filename, session['user_id'])
-            )
-            conn.commit()
-            cursor.close()
-            conn.close()
+            stored = False
+            try:
+                # Taking the refcount row lock first serializes this with a delete of the same file
+                acquire_thumbnail(cursor, filename)
+                stored = store_upload(temp_path, app.config['UPLOAD_FOLDER'], filename)
+                cursor.execute(
+                    "INSERT INTO videos (title, description, thumbnail_path, user_id) VALUES (%s, %s, %s, %s)",
+                    (title, description, filename, session['user_id'])
+                )
+                video_id = cursor.lastrowid
+                feed_item = record_feed_item(cursor, 'video', session['user_id'], session['username'],
+                                             video_id, title)
+                conn.commit()
+            except pymysql.Error as e:
+                # Still under the refcount row lock, so no other upload can be counting on this file yet
+                if stored:
+                    os.remove(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+                conn.rollback()
+                print(f"Error saving upload: {e}")
+                flash('Database error, please try again.', 'danger')
+                return redirect(url_for('upload'))
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                cursor.close()
+                conn.close()
+            
+            stick_to_primary()
+            activity_feed.published(feed_item)
+            # Resized variants are produced off the request
+            thumbnail_processor.submit(filename)
+            read_cache.invalidate('videos')
+            trending_engine.record_video(video_id, title, filename, session['username'], datetime.now())
+            activity_writer.record('INSERT', 'videos', video_id, session['user_id'], f"Video uploaded: {title}")
             
             flash('Video uploaded successfully!', 'success')
             return redirect(url_for('index'))
@@ -235,129 +1017,324 @@ def upload():
     
     return render_template('upload.html')
 
-@app.route('/video/<int:video_id>')
-def video(video_id):
-    """View a specific video with comments"""
-    conn = get_db_connection()
-    if not conn:
-        flash('Database connection error', 'danger')
-        return redirect(url_for('index'))
-    
-    cursor = conn.cursor()
+def video_query(video_id):
+    """Build the (sql, args, one) query for a video page's header and counters, for run_reads().
     
-    # Get video details
-    cursor.execute("""
-        SELECT v.*, u.username 
+    vs.updated_at changes with every comment or reply added or removed,
+    so with the counts it versions the video's comment threads.
+    """
+    return ("""
+        SELECT v.video_id, v.title, v.description, v.thumbnail_path, v.views, v.created_at,
+               u.username,
+               COALESCE(vs.comment_count, 0) AS comment_count,
+               COALESCE(vs.reply_count, 0) AS reply_count,
+               vs.updated_at AS stats_updated_at
         FROM videos v 
         JOIN users u ON v.user_id = u.user_id 
+        LEFT JOIN video_stats vs ON v.video_id = vs.video_id
         WHERE v.video_id = %s
-    """, (video_id,))
-    video = cursor.fetchone()
+    """, (video_id,), True)
+
+def record_view(video):
+    """Count a view of a video_query() row and add the views not yet flushed to it"""
+    # Written to the database in the next batched flush
+    view_counter.increment(video['video_id'])
+    trending_engine.record_view(video['video_id'])
+    video['views'] += view_counter.pending(video['video_id'])
+
+@app.route('/video/<int:video_id>')
+def video(video_id):
+    """View a specific video with comments"""
+    before = request.args.get('before')
+    if not decode_cursor(before):
+        before = None  # a malformed cursor shows the first page, under the first page's cache key
     
-    if not video:
-        flash('Video not found.', 'danger')
-        cursor.close()
-        conn.close()
+    # The comment list is cached with the counters it was rendered at. With
+    # nothing cached yet the comment page is fetched alongside the video
+    # (concurrently under DB_ASYNC); otherwise only the video is read, and
+    # the comments only if its counters have moved on since.
+    fragment_key = ('fragment', '_comment_list.html', video_id, before, bool(session.get('user_id')))
+    cached = read_cache.get(fragment_key, None)
+    try:
+        if cached is None:
+            video, rows = run_reads(video_query(video_id), comment_page_query(video_id, before))
+        else:
+            video, rows = run_reads(video_query(video_id))[0], None
+        
+        if not video:
+            flash('Video not found.', 'danger')
+            return redirect(url_for('index'))
+        
+        version = (video['comment_count'], video['reply_count'], video['stats_updated_at'])
+        if cached is not None and cached[0] == version:
+            comments_html = cached[1]
+        else:
+            comments, next_cursor = load_comment_page(video_id, before, rows)
+            comments_html = Markup(render_template('_comment_list.html', video=video, comments=comments,
+                                                   next_cursor=next_cursor, paged=bool(before)))
+            read_cache.set(fragment_key, (version, comments_html),
+                           ttl=app.config['FRAGMENT_CACHE_TTL'], tags=(f'video:{video_id}',))
+    except DatabaseUnavailable:
+        flash('Database connection error', 'danger')
         return redirect(url_for('index'))
     
-    # Increment view count
-    cursor.execute("UPDATE videos SET views = views + 1 WHERE video_id = %s", (video_id,))
-    conn.commit()
-    
-    # Get comments with replies
-    cursor.execute("""
-        SELECT c.*, u.username 
-        FROM comments c 
-        JOIN users u ON c.user_id = u.user_id 
-        WHERE c.video_id = %s 
-        ORDER BY c.created_at DESC
-    """, (video_id,))
-    comments = cursor.fetchall()
-    
-    # Get replies for each comment
-    for comment in comments:
-        cursor.execute("""
-            SELECT r.*, u.username, m.username as mentioned_username
-            FROM replies r 
-            JOIN users u ON r.user_id = u.user_id 
-            LEFT JOIN users m ON r.mentioned_user_id = m.user_id
-            WHERE r.comment_id = %s 
-            ORDER BY r.created_at ASC
-        """, (comment['comment_id'],))
-        comment['replies'] = cursor.fetchall()
+    record_view(video)
+    return render_template('video.html', video=video, comments_html=comments_html, live=not before)
+
+@app.route('/comment/<int:comment_id>/replies')
+def comment_replies(comment_id):
+    """JSON page of a comment's replies, loaded lazily by video.html"""
+    conn = get_read_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection error'}), 503
     
+    cursor = conn.cursor()
+    replies, next_cursor = fetch_reply_page(cursor, comment_id, after=request.args.get('after'))
     cursor.close()
     conn.close()
     
-    return render_template('video.html', video=video, comments=comments)
+    return jsonify({
+        'replies': [{
+            'reply_id': reply['reply_id'],
+            'username': reply['username'],
+            'mentioned_username': reply['mentioned_username'],
+            'content': reply['content'],
+            'created_at': reply['created_at'].astimezone().isoformat(),
+            'timeago': timeago_filter(reply['created_at'])
+        } for reply in replies],
+        'next_cursor': next_cursor
+    })
 
 @app.route('/video/<int:video_id>/comment', methods=['POST'])
 @login_required
 def add_comment(video_id):
-    """Add a comment to a video"""
+    """Add a comment to a video and push it to the video's live viewers"""
     content = request.form.get('content')
     
     if not content or not content.strip():
-        flash('Comment cannot be empty.', 'danger')
-        return redirect(url_for('video', video_id=video_id))
+        return post_failed('Comment cannot be empty.', video_id)
     
     conn = get_db_connection()
     if not conn:
-        flash('Database connection error', 'danger')
-        return redirect(url_for('video', video_id=video_id))
+        return post_failed('Database connection error', video_id, 503)
     
     cursor = conn.cursor()
+    
+    # The title goes into the feed item
+    cursor.execute("SELECT title FROM videos WHERE video_id = %s", (video_id,))
+    parent = cursor.fetchone()
+    if not parent:
+        cursor.close()
+        conn.close()
+        return post_failed('Video not found.', video_id, 404)
+    
     cursor.execute(
         "INSERT INTO comments (video_id, user_id, content) VALUES (%s, %s, %s)",
         (video_id, session['user_id'], content)
     )
+    comment_id = cursor.lastrowid
+    feed_item = record_feed_item(cursor, 'comment', session['user_id'], session['username'], video_id,
+                                 parent['title'], comment_id=comment_id, content=content)
     conn.commit()
     cursor.close()
     conn.close()
+    stick_to_primary()
+    activity_feed.published(feed_item)
+    trending_engine.record_comment(video_id)
+    read_cache.invalidate(f'video:{video_id}')
+    activity_writer.record('INSERT', 'comments', comment_id, session['user_id'],
+                           f"Comment added on video_id: {video_id}")
     
+    comment = {
+        'comment_id': comment_id,
+        'video_id': video_id,
+        'username': session['username'],
+        'content': content,
+        'created_at': datetime.now().astimezone().isoformat(),
+    }
+    comment_hub.publish(video_id, 'comment', comment)
+    
+    if wants_json():
+        return jsonify({'comment': comment}), 201
     flash('Comment added successfully!', 'success')
     return redirect(url_for('video', video_id=video_id))
 
 @app.route('/comment/<int:comment_id>/reply', methods=['POST'])
 @login_required
 def add_reply(comment_id):
-    """Add a reply to a comment"""
+    """Add a reply to a comment and push it to the video's live viewers"""
     content = request.form.get('content')
     video_id = request.form.get('video_id')
     
     if not content or not content.strip():
-        flash('Reply cannot be empty.', 'danger')
-        return redirect(url_for('video', video_id=video_id))
-    
-    # Extract @username mentions
-    mentioned_user_id = None
-    mention_match = re.search(r'@(\w+)', content)
+        return post_failed('Reply cannot be empty.', video_id)
     
     conn = get_db_connection()
     if not conn:
-        flash('Database connection error', 'danger')
-        return redirect(url_for('video', video_id=video_id))
+        return post_failed('Database connection error', video_id, 503)
     
     cursor = conn.cursor()
     
-    if mention_match:
-        mentioned_username = mention_match.group(1)
-        cursor.execute("SELECT user_id FROM users WHERE username = %s", (mentioned_username,))
-        mentioned_user = cursor.fetchone()
-        if mentioned_user:
-            mentioned_user_id = mentioned_user['user_id']
+    # The thread's video, for the live event, cache tag and feed item (the form field is only a redirect target)
+    cursor.execute("""
+        SELECT c.video_id, v.title
+        FROM comments c
+        JOIN videos v ON c.video_id = v.video_id
+        WHERE c.comment_id = %s
+    """, (comment_id,))
+    parent = cursor.fetchone()
+    if not parent:
+        cursor.close()
+        conn.close()
+        return post_failed('Comment not found.', video_id, 404)
+    video_id = parent['video_id']
+    
+    # Every @username resolved in one lookup; replies.mentioned_user_id keeps the first
+    resolved = username_cache.resolve(cursor, extract_mentions(content))
+    mentioned = [user for user in resolved.values() if user]
+    mentioned_user_id, mentioned_username = mentioned[0] if mentioned else (None, None)
     
     cursor.execute(
         "INSERT INTO replies (comment_id, user_id, content, mentioned_user_id) VALUES (%s, %s, %s, %s)",
         (comment_id, session['user_id'], content, mentioned_user_id)
     )
+    reply_id = cursor.lastrowid
+    record_mentions(cursor, reply_id, session['user_id'], mentioned)
+    feed_item = record_feed_item(cursor, 'reply', session['user_id'], session['username'], video_id,
+                                 parent['title'], comment_id=comment_id, reply_id=reply_id, content=content)
     conn.commit()
     cursor.close()
     conn.close()
+    stick_to_primary()
+    activity_feed.published(feed_item)
+    read_cache.invalidate(f'video:{video_id}')
+    
+    reply = {
+        'reply_id': reply_id,
+        'comment_id': comment_id,
+        'video_id': video_id,
+        'username': session['username'],
+        'mentioned_username': mentioned_username,
+        'content': content,
+        'created_at': datetime.now().astimezone().isoformat(),
+    }
+    comment_hub.publish(video_id, 'reply', reply)
     
+    if wants_json():
+        return jsonify({'reply': reply}), 201
     flash('Reply added successfully!', 'success')
     return redirect(url_for('video', video_id=video_id))
 
+@app.route('/video/<int:video_id>/events')
+def video_events(video_id):
+    """Server-Sent Events stream of a video's new comments and replies.
+    
+    Served this way, every open stream holds a worker thread; under
+    asgi.py the same path is answered from the event loop instead.
+    """
+    subscriber = QueueSubscriber(app.config['COMMENT_EVENTS_QUEUE_SIZE'])
+    if not comment_hub.subscribe(video_id, subscriber, request.headers.get('Last-Event-ID')):
+        return jsonify({'error': 'Too many live streams'}), 503
+    
+    def stream():
+        try:
+            yield RETRY
+            yield from subscriber.frames(app.config['COMMENT_EVENTS_HEARTBEAT'])
+        finally:
+            comment_hub.unsubscribe(video_id, subscriber)
+    
+    return Response(stream(), headers=SSE_HEADERS)
+
+@app.route('/mentions')
+@login_required
+def mentions():
+    """Replies that @mention the logged-in user, newest first"""
+    conn = get_read_connection()
+    if not conn:
+        flash('Database connection error', 'danger')
+        return redirect(url_for('index'))
+    
+    before = request.args.get('before')
+    cursor = conn.cursor()
+    mentions, next_cursor = fetch_mentions_page(cursor, session['user_id'], before=before)
+    cursor.close()
+    conn.close()
+    
+    return render_template('mentions.html', mentions=mentions, next_cursor=next_cursor, paged=bool(before))
+
+@app.route('/feed')
+def feed():
+    """Everyone's new videos, comments and replies, newest first"""
+    before = request.args.get('before')
+    page = activity_feed.recent(before, app.config['FEED_PER_PAGE'])
+    if page is None:
+        # Past the in-memory buffer (or not loaded yet): one range scan on feed_items
+        conn = get_read_connection()
+        if not conn:
+            flash('Database connection error', 'danger')
+            return render_template('feed.html', items=[], following=False)
+        cursor = conn.cursor()
+        page = fetch_feed_items(cursor, before, app.config['FEED_PER_PAGE'])
+        cursor.close()
+        conn.close()
+    
+    items, next_cursor = page
+    return render_template('feed.html', items=items, next_cursor=next_cursor, paged=bool(before), following=False)
+
+@app.route('/feed/following')
+@login_required
+def following_feed():
+    """New videos, comments and replies by the users the logged-in user follows"""
+    conn = get_read_connection()
+    if not conn:
+        flash('Database connection error', 'danger')
+        return render_template('feed.html', items=[], following=True)
+    
+    before = request.args.get('before')
+    cursor = conn.cursor()
+    items, next_cursor = fetch_following_items(cursor, session['user_id'], before, app.config['FEED_PER_PAGE'])
+    cursor.close()
+    conn.close()
+    
+    return render_template('feed.html', items=items, next_cursor=next_cursor, paged=bool(before), following=True)
+
+@app.route('/user/<username>/follow', methods=['POST'])
+@login_required
+def follow_user(username):
+    """Follow or unfollow (action=unfollow) a user"""
+    conn = get_db_connection()
+    if not conn:
+        flash('Database connection error', 'danger')
+        return redirect(url_for('user_profile', username=username))
+    
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_id, username FROM users WHERE username = %s", (username,))
+    user = cursor.fetchone()
+    if not user:
+        cursor.close()
+        conn.close()
+        flash('User not found.', 'danger')
+        return redirect(url_for('index'))
+    if user['user_id'] == session['user_id']:
+        cursor.close()
+        conn.close()
+        flash('You cannot follow yourself.', 'warning')
+        return redirect(url_for('user_profile', username=username))
+    
+    if request.form.get('action') == 'unfollow':
+        unfollow(cursor, session['user_id'], user['user_id'])
+        message = f"You unfollowed {user['username']}."
+    else:
+        follow(cursor, session['user_id'], user['user_id'], backfill=app.config['FEED_FOLLOW_BACKFILL'])
+        message = f"You are following {user['username']}."
+    conn.commit()
+    cursor.close()
+    conn.close()
+    stick_to_primary()
+    
+    flash(message, 'success')
+    return redirect(url_for('user_profile', username=user['username']))
+
 @app.route('/admin')
 @admin_required
 def admin():
@@ -365,7 +1342,7 @@ def admin():
     conn = get_db_connection()
     if not conn:
         flash('Database connection error', 'danger')
-        return render_template('admin.html', videos=[], comments=[])
+        return render_template('admin.html', videos=[], comments=[], jobs=[])
     
     cursor = conn.cursor()
     
@@ -391,7 +1368,8 @@ def admin():
     cursor.close()
     conn.close()
     
-    return render_template('admin.html', videos=videos, comments=comments)
+    return render_template('admin.html', videos=videos, comments=comments,
+                           jobs=[job.to_dict() for job in bulk_moderator.jobs()])
 
 @app.route('/admin/delete/video/<int:video_id>', methods=['POST'])
 @admin_required
@@ -402,29 +1380,24 @@ def delete_video(video_id):
         flash('Database connection error', 'danger')
         return redirect(url_for('admin'))
     
-    cursor = conn.cursor()
-    
-    # Get thumbnail path before deletion
-    cursor.execute("SELECT thumbnail_path FROM videos WHERE video_id = %s", (video_id,))
-    video = cursor.fetchone()
+    try:
+        videos, orphaned = delete_video_chunk(conn, [video_id])
+    except pymysql.Error as e:
+        print(f"Error deleting video {video_id}: {e}")
+        flash('Database error, please try again.', 'danger')
+        return redirect(url_for('admin'))
+    finally:
+        conn.close()
     
-    if video:
-        # Delete video from database
-        cursor.execute("DELETE FROM videos WHERE video_id = %s", (video_id,))
-        conn.commit()
-        
-        # Delete thumbnail file
-        thumbnail_path = os.path.join(app.config['UPLOAD_FOLDER'], video['thumbnail_path'])
-        if os.path.exists(thumbnail_path):
-            os.remove(thumbnail_path)
-        
+    if videos:
+        # The thumbnail file goes after the commit, if no other video shares it
+        thumbnail_reaper.submit(orphaned)
+        stick_to_primary()
+        after_delete('videos', videos)
         flash('Video deleted successfully!', 'success')
     else:
         flash('Video not found.', 'danger')
     
-    cursor.close()
-    conn.close()
-    
     return redirect(url_for('admin'))
 
 @app.route('/admin/delete/comment/<int:comment_id>', methods=['POST'])
@@ -436,149 +1409,722 @@ def delete_comment(comment_id):
         flash('Database connection error', 'danger')
         return redirect(url_for('admin'))
     
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM comments WHERE comment_id = %s", (comment_id,))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        comments = delete_comment_chunk(conn, [comment_id])
+    except pymysql.Error as e:
+        print(f"Error deleting comment {comment_id}: {e}")
+        flash('Database error, please try again.', 'danger')
+        return redirect(url_for('admin'))
+    finally:
+        conn.close()
+    
+    stick_to_primary()
+    if comments:
+        after_delete('comments', comments)
     
     flash('Comment deleted successfully!', 'success')
     return redirect(url_for('admin'))
 
+@app.route('/admin/bulk-delete', methods=['POST'])
+@admin_required
+def bulk_delete():
+    """Queue a chunked delete of the selected videos or comments (admin only)"""
+    kind = request.form.get('kind')
+    ids = [int(value) for value in request.form.getlist('ids') if value.isdigit()]
+    if kind not in BulkModerator.KINDS or not ids:
+        flash('Select at least one video or comment to delete.', 'danger')
+        return redirect(url_for('admin'))
+    
+    job = bulk_moderator.submit(kind, ids, requested_by=session['username'])
+    stick_to_primary()
+    
+    if wants_json():
+        return jsonify({'job': job.to_dict()}), 202
+    flash(f'Deleting {len(job.ids)} {kind} in the background (job #{job.job_id}).', 'success')
+    return redirect(url_for('admin'))
+
+@app.route('/admin/moderation-jobs')
+@admin_required
+def moderation_jobs():
+    """Progress of this process's bulk delete jobs, newest first (admin only)"""
+    return jsonify({
+        'jobs': [job.to_dict() for job in bulk_moderator.jobs()],
+        'thumbnails': thumbnail_reaper.stats(),
+    })
+
+@app.route('/admin/moderation-jobs/<int:job_id>')
+@admin_required
+def moderation_job(job_id):
+    """Progress of one bulk delete job (admin only)"""
+    job = bulk_moderator.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job': job.to_dict()})
+
 @app.route('/stats/video/<int:video_id>')
 def video_stats(video_id):
-    """View detailed video statistics using stored procedure"""
-    conn = get_db_connection()
-    if not conn:
+    """View video statistics from the denormalized video_stats counters"""
+    def load_stats():
+        conn = read_connection_or_raise()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 
+                v.video_id,
+                v.title,
+                v.views,
+                u.username AS uploaded_by,
+                COALESCE(vs.comment_count, 0) AS total_comments,
+                COALESCE(vs.reply_count, 0) AS total_replies,
+                v.created_at
+            FROM videos v
+            JOIN users u ON v.user_id = u.user_id
+            LEFT JOIN video_stats vs ON v.video_id = vs.video_id
+            WHERE v.video_id = %s
+        """, (video_id,))
+        stats = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        return stats
+    
+    try:
+        stats = read_cache.get_or_load(('video_stats', video_id), load_stats,
+                                       ttl=app.config['VIDEO_STATS_CACHE_TTL'], tags=(f'video:{video_id}',))
+    except DatabaseUnavailable:
         flash('Database connection error', 'danger')
         return redirect(url_for('index'))
     
-    cursor = conn.cursor()
-    
-    # Call stored procedure
-    cursor.callproc('get_video_stats', [video_id])
-    
-    # Fetch results
-    stats = None
-    for result in cursor.stored_results():
-        stats = result.fetchone()
-    
-    cursor.close()
-    conn.close()
-    
     if not stats:
         flash('Video not found.', 'danger')
         return redirect(url_for('index'))
     
+    # Copy before adding live views so the cached row keeps the database count
+    stats = dict(stats, views=stats['views'] + view_counter.pending(video_id))
     return render_template('video_stats.html', stats=stats)
 
 @app.route('/user/<username>')
 def user_profile(username):
-    """View user profile and activity using stored procedure"""
-    conn = get_db_connection()
-    if not conn:
+    """View user profile from the denormalized user_stats counters"""
+    # Both queries key on the username, so they can run concurrently
+    try:
+        user_activity, user_videos = run_reads(("""
+            SELECT 
+                u.user_id,
+                u.username,
+                u.is_admin,
+                u.created_at AS member_since,
+                COALESCE(s.total_videos, 0) AS total_videos,
+                COALESCE(s.total_views, 0) AS total_views,
+                COALESCE(s.total_comments, 0) AS total_comments,
+                COALESCE(s.total_replies, 0) AS total_replies,
+                COALESCE(s.engagement_score, 0) AS engagement_score
+            FROM users u
+            LEFT JOIN user_stats s ON u.user_id = s.user_id
+            WHERE u.username = %s
+        """, (username,), True), ("""
+            SELECT v.video_id, v.title, v.thumbnail_path, v.views, v.created_at,
+                   COALESCE(vs.comment_count, 0) AS comment_count
+            FROM videos v
+            JOIN users u ON v.user_id = u.user_id
+            LEFT JOIN video_stats vs ON v.video_id = vs.video_id
+            WHERE u.username = %s
+            ORDER BY v.created_at DESC
+        """, (username,), False))
+    except DatabaseUnavailable:
         flash('Database connection error', 'danger')
         return redirect(url_for('index'))
     
-    cursor = conn.cursor()
-    
-    # Call stored procedure
-    cursor.callproc('get_user_activity', [username])
-    
-    # Fetch results
-    user_activity = None
-    for result in cursor.stored_results():
-        user_activity = result.fetchone()
-    
     if not user_activity:
-        cursor.close()
-        conn.close()
         flash('User not found.', 'danger')
         return redirect(url_for('index'))
     
-    # Get user's videos
-    cursor.execute("""
-        SELECT v.*, COUNT(c.comment_id) as comment_count
-        FROM videos v
-        LEFT JOIN comments c ON v.video_id = c.video_id
-        WHERE v.user_id = %s
-        GROUP BY v.video_id
-        ORDER BY v.created_at DESC
-    """, (user_activity['user_id'],))
-    user_videos = cursor.fetchall()
-    
-    cursor.close()
-    conn.close()
+    following = False
+    if session.get('user_id') and session['user_id'] != user_activity['user_id']:
+        try:
+            following = run_reads((
+                "SELECT 1 FROM follows WHERE follower_id = %s AND followee_id = %s",
+                (session['user_id'], user_activity['user_id']), True
+            ))[0] is not None
+        except DatabaseUnavailable:
+            pass
     
-    return render_template('user_profile.html', user=user_activity, videos=user_videos)
+    return render_template('user_profile.html', user=user_activity, videos=user_videos, following=following)
+
+@app.cli.command('counters-check')
+@click.option('--repair', is_flag=True, help='Rebuild video_stats and user_stats if drift is found.')
+@click.option('--limit', default=20, help='Max drifted rows to list per table.')
+def counters_check(repair, limit):
+    """Compare video_stats/user_stats with the base tables"""
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
+        drift = counters.find_drift(cursor, limit)
+        cursor.close()
+        
+        for table in ('videos', 'users'):
+            click.echo(f"{table}: {len(drift[table])} drifted row(s) (listing at most {limit})")
+            for row in drift[table]:
+                click.echo(f"  {row}")
+        
+        if repair and (drift['videos'] or drift['users']):
+            counters.repair(conn)
+            cursor = conn.cursor()
+            drift = counters.find_drift(cursor, limit)
+            cursor.close()
+            click.echo(f"Repaired. Remaining drift: {len(drift['videos'])} video(s), {len(drift['users'])} user(s)")
+    finally:
+        conn.release()
+    read_cache.invalidate('leaderboard')
 
 @app.route('/trending')
 def trending():
-    """View trending videos using stored procedure"""
-    conn = get_db_connection()
-    if not conn:
-        flash('Database connection error', 'danger')
-        return render_template('trending.html', videos=[])
+    """View trending videos from the precomputed, time-decayed top list"""
+    version, videos = trending_engine.snapshot()
+    # Each worker has its own engine and version counter, so this fragment stays process-local
+    trending_html = render_fragment('_trending_list.html', (version,),
+                                    lambda: {'videos': videos}, shared=False)
+    return render_template('trending.html', trending_html=trending_html)
+
+@app.cli.command('trending-check')
+def trending_check():
+    """Rebuild trending from scratch and compare it with the SQL query"""
+    report = trending_engine.check()
+    click.echo(f"Videos in window: {report['videos']}")
+    click.echo(f"Counter mismatches: {len(report['mismatches'])}")
+    for mismatch in report['mismatches'][:20]:
+        click.echo(f"  {mismatch}")
+    click.echo(f"Engine top {len(report['engine_top'])}: {report['engine_top']}")
+    click.echo(f"SQL top {len(report['sql_top'])}:    {report['sql_top']}")
+    click.echo(f"Overlap: {report['top_overlap']}/{len(report['sql_top'])}")
+
+def load_leaderboard_rows():
+    """The top 50 users from the materialized user_stats table, read from the database.
     
+    Raises DatabaseUnavailable if they cannot be read.
+    """
+    conn = read_connection_or_raise()
     cursor = conn.cursor()
-    
-    # Get trending videos - direct query with all needed fields
+    # Walks idx_user_stats_engagement backwards; no joins fan out, no per-row functions
     cursor.execute("""
-        SELECT 
-            v.video_id,
-            v.title,
-            v.thumbnail_path,
-            v.views,
-            u.username,
-            COUNT(DISTINCT c.comment_id) AS comment_count,
-            v.created_at
-        FROM videos v
-        JOIN users u ON v.user_id = u.user_id
-        LEFT JOIN comments c ON v.video_id = c.video_id
-        WHERE v.created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        GROUP BY v.video_id, v.title, v.thumbnail_path, v.views, u.username, v.created_at
-        ORDER BY v.views DESC, comment_count DESC
-        LIMIT 20
+        SELECT s.user_id, u.username, s.total_videos, s.total_views,
+               s.total_comments, s.total_replies, s.engagement_score
+        FROM user_stats s
+        JOIN users u ON s.user_id = u.user_id
+        WHERE u.is_admin = FALSE
+        ORDER BY s.engagement_score DESC, s.user_id DESC
+        LIMIT 50
     """)
-    trending_videos = cursor.fetchall()
-    
+    users = cursor.fetchall()
     cursor.close()
     conn.close()
-    
-    return render_template('trending.html', videos=trending_videos)
+    return users
+
+def leaderboard_rows():
+    """load_leaderboard_rows(), cached under the 'leaderboard' tag"""
+    return read_cache.get_or_load(('leaderboard', 'rows'), load_leaderboard_rows,
+                                  ttl=app.config['LEADERBOARD_CACHE_TTL'], tags=('leaderboard',))
 
 @app.route('/leaderboard')
 def leaderboard():
-    """View user leaderboard using view"""
-    conn = get_db_connection()
+    """View the top 50 users from the materialized user_stats table"""
+    # The rendered table only depends on leaderboard_rows(), so it is cached under the same tag
+    try:
+        leaderboard_html = read_cache.get_or_load(
+            'leaderboard', lambda: Markup(render_template('_leaderboard_table.html', users=leaderboard_rows())),
+            ttl=app.config['LEADERBOARD_CACHE_TTL'], tags=('leaderboard',))
+    except DatabaseUnavailable:
+        flash('Database connection error', 'danger')
+        leaderboard_html = render_template('_leaderboard_table.html', users=[])
+    
+    return render_template('leaderboard.html', leaderboard_html=leaderboard_html)
+
+@app.cli.command('leaderboard-refresh')
+def leaderboard_refresh():
+    """Rebuild the user_stats table from scratch"""
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
+        cursor.callproc('refresh_user_stats')
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.release()
+    read_cache.invalidate('leaderboard')
+    click.echo('user_stats rebuilt.')
+
+def run_search(args):
+    """Parse ?q=&type=&page= and run the matching full-text search.
+    
+    Returns (params, results, has_more); results is None when the search
+    could not run because the database is unavailable.
+    """
+    query = (args.get('q') or '').strip()
+    kind = args.get('type') if args.get('type') in search.SEARCH_TABLES else 'videos'
+    page = min(max(args.get('page', 1, type=int), 1), app.config['SEARCH_MAX_PAGE'])
+    params = {'q': query, 'type': kind, 'page': page}
+    
+    if not search.boolean_query(query):
+        return params, [], False
+    
+    conn = get_read_connection()
     if not conn:
+        return params, None, False
+    
+    cursor = conn.cursor()
+    finder = search.search_comments if kind == 'comments' else search.search_videos
+    results, has_more = finder(cursor, query, page, app.config['SEARCH_RESULTS_PER_PAGE'])
+    cursor.close()
+    conn.close()
+    
+    return params, results, has_more and page < app.config['SEARCH_MAX_PAGE']
+
+@app.route('/search')
+def search_page():
+    """Search videos or comments, ranked by relevance"""
+    params, results, has_more = run_search(request.args)
+    if results is None:
         flash('Database connection error', 'danger')
-        return render_template('leaderboard.html', users=[])
+        results = []
+    return render_template('search.html', results=results, has_more=has_more, **params)
+
+@app.route('/api/search')
+def search_api():
+    """JSON version of /search"""
+    params, results, has_more = run_search(request.args)
+    if results is None:
+        return jsonify({'error': 'Database connection error'}), 503
+    
+    for row in results:
+        row['created_at'] = row['created_at'].isoformat()
+        row['score'] = float(row['score'])
+    return jsonify(dict(params, results=results, has_more=has_more))
+
+def api_timestamp(value):
+    """ISO 8601 with the server's UTC offset, like the JSON the page scripts get"""
+    return value.astimezone().isoformat() if value else None
+
+def api_video(video, *extra):
+    """The fields of a video row every /api/v1 listing returns, plus `extra` columns"""
+    fields = {
+        'video_id': video['video_id'],
+        'title': video['title'],
+        'thumbnail_url': thumbnail_url(video['thumbnail_path']),
+        'views': video['views'],
+        'username': video['username'],
+        'created_at': api_timestamp(video['created_at']),
+    }
+    for name in extra:
+        fields[name] = video[name]
+    return fields
+
+def api_validators(response, etag, last_modified=None):
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified.astimezone()
+    if app.config['API_MAX_AGE']:
+        response.cache_control.max_age = app.config['API_MAX_AGE']
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def api_not_modified(etag, last_modified=None):
+    """A 304 if the client already holds version `etag`, else None.
+    
+    For routes that can tell their data's version before running the
+    queries that build the body.
+    """
+    response = api_validators(app.response_class(mimetype='application/json'), etag, last_modified)
+    response = response.make_conditional(request)
+    return response if response.status_code == 304 else None
+
+def api_body(payload):
+    return json.dumps(payload, separators=(',', ':'))
+
+def api_etag(body):
+    """Validator for a JSON body: a hash of its bytes"""
+    return 'v1-' + hashlib.sha1(body.encode()).hexdigest()[:20]
+
+def api_response(payload, etag=None, last_modified=None):
+    """Compact JSON for /api/v1, or a 304 when If-None-Match/If-Modified-Since still match.
+    
+    Without an `etag` the body's hash is used, so a client revalidating
+    an unchanged page gets a 304 with no body either way.
+    """
+    body = api_body(payload)
+    if etag is None:
+        etag = api_etag(body)
+    response = api_validators(app.response_class(body, mimetype='application/json'), etag, last_modified)
+    return response.make_conditional(request)
+
+@app.route('/api/v1/feed')
+def api_feed():
+    """JSON version of the homepage feed, ?before=<cursor> for older pages"""
+    try:
+        videos, next_cursor = feed_page(request.args.get('before'))
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection error'}), 503
+    return api_response({'videos': [api_video(video) for video in videos], 'next_cursor': next_cursor})
+
+@app.route('/api/v1/videos/<int:video_id>')
+def api_video_detail(video_id):
+    """JSON version of a video page's header; counts a view like the page does.
+    
+    The view count moves with every request, this one included, so it is
+    left out of the ETag: a 304 means everything else is unchanged, and
+    the client keeps the count it has.
+    """
+    try:
+        video = run_reads(video_query(video_id))[0]
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection error'}), 503
+    if not video:
+        return jsonify({'error': 'Video not found'}), 404
+    
+    record_view(video)
+    payload = api_video(video, 'description', 'comment_count', 'reply_count')
+    return api_response(payload, api_etag(api_body({key: value for key, value in payload.items() if key != 'views'})))
+
+@app.route('/api/v1/videos/<int:video_id>/comments')
+def api_video_comments(video_id):
+    """JSON page of a video's comments, newest first, ?before=<cursor> for older ones.
+    
+    The ETag is the video's comment counters and their update time, so a
+    revalidation costs one primary-key read and no comment queries.
+    """
+    before = request.args.get('before')
+    try:
+        video = run_reads(video_query(video_id))[0]
+        if not video:
+            return jsonify({'error': 'Video not found'}), 404
+        
+        updated = video['stats_updated_at']
+        etag = (f"v1-comments-{video_id}-{before if decode_cursor(before) else ''}-{video['comment_count']}-"
+                f"{video['reply_count']}-{updated.timestamp() if updated else 0:.0f}")
+        not_modified = api_not_modified(etag, updated)
+        if not_modified:
+            return not_modified
+        comments, next_cursor = load_comment_page(video_id, before)
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection error'}), 503
+    
+    return api_response({
+        'comments': [{
+            'comment_id': comment['comment_id'],
+            'username': comment['username'],
+            'content': comment['content'],
+            'created_at': api_timestamp(comment['created_at']),
+            'reply_count': comment['reply_count']
+        } for comment in comments],
+        'next_cursor': next_cursor
+    }, etag, updated)
+
+@app.route('/api/v1/comments/<int:comment_id>/replies')
+def api_comment_replies(comment_id):
+    """JSON page of a comment's replies, oldest first, ?after=<cursor> for newer ones"""
+    conn = get_read_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection error'}), 503
     
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM user_leaderboard LIMIT 50")
-    users = cursor.fetchall()
+    replies, next_cursor = fetch_reply_page(cursor, comment_id, after=request.args.get('after'))
     cursor.close()
     conn.close()
     
-    return render_template('leaderboard.html', users=users)
+    return api_response({
+        'replies': [{
+            'reply_id': reply['reply_id'],
+            'username': reply['username'],
+            'mentioned_username': reply['mentioned_username'],
+            'content': reply['content'],
+            'created_at': api_timestamp(reply['created_at'])
+        } for reply in replies],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/v1/trending')
+def api_trending():
+    """JSON version of /trending"""
+    videos = trending_engine.top()
+    if not trending_engine.loaded:
+        # Never loaded: an empty list here would be a database outage, not "nothing trending"
+        return jsonify({'error': 'Database connection error'}), 503
+    return api_response({'videos': [api_video(video, 'comment_count') for video in videos]})
+
+@app.route('/api/v1/leaderboard')
+def api_leaderboard():
+    """JSON version of /leaderboard"""
+    try:
+        users = leaderboard_rows()
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection error'}), 503
+    return api_response({'users': [{
+        'username': user['username'],
+        'total_videos': user['total_videos'],
+        'total_views': user['total_views'],
+        'total_comments': user['total_comments'],
+        'total_replies': user['total_replies'],
+        'engagement_score': user['engagement_score']
+    } for user in users]})
+
+@app.cli.command('search-rebuild')
+def search_rebuild():
+    """Rebuild the FULLTEXT indexes behind /search"""
+    conn = db_pool.acquire()
+    try:
+        for row in search.rebuild(conn):
+            click.echo(f"{row['Table']}: {row['Msg_text']}")
+    finally:
+        conn.release()
 
 @app.route('/activity-log')
 @admin_required
 def activity_log():
-    """View activity log (admin only)"""
+    """View activity log one page at a time, optionally filtered (admin only)"""
+    before = request.args.get('before')
+    action = request.args.get('action') or None
+    table = request.args.get('table') or None
+    filters = {'action': action, 'table': table}
+    
     conn = get_db_connection()
     if not conn:
         flash('Database connection error', 'danger')
-        return render_template('activity_log.html', logs=[])
+        return render_template('activity_log.html', logs=[], filters=filters)
     
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM activity_log ORDER BY created_at DESC LIMIT 100")
-    logs = cursor.fetchall()
+    logs, next_cursor = fetch_activity_page(cursor, before, action=action, table=table)
     cursor.close()
     conn.close()
     
-    return render_template('activity_log.html', logs=logs)
+    return render_template('activity_log.html', logs=logs, next_cursor=next_cursor,
+                           paged=decode_cursor(before) is not None, filters=filters)
+
+@app.cli.command('activity-log-maintain')
+@click.option('--retention', default=None, type=int, help='Months of activity to keep (default: ACTIVITY_LOG_RETENTION_MONTHS).')
+def activity_log_maintain(retention):
+    """Add upcoming monthly activity_log partitions and drop expired ones"""
+    if retention is None:
+        retention = app.config['ACTIVITY_LOG_RETENTION_MONTHS']
+    conn = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **{**DB_CONFIG, **DB_MAINTENANCE_CONFIG})
+    try:
+        added, dropped = maintain_partitions(conn, retention_months=retention)
+    finally:
+        conn.close()
+    click.echo(f"Added partitions: {', '.join(added) or 'none'}")
+    click.echo(f"Dropped partitions: {', '.join(dropped) or 'none'}")
+
+def run_bulk_delete(kind, ids, chunk_size, pause):
+    """Delete ids in chunks from a CLI command, printing progress"""
+    job = ModerationJob(0, kind, ids, requested_by='cli')
+    if not ids:
+        click.echo(f"No {kind} to delete.")
+        return job
+    click.echo(f"Deleting {len(ids)} {kind} in chunks of {chunk_size or bulk_moderator.chunk_size}...")
+    bulk_moderator.run(job, progress=lambda job: click.echo(
+        f"  {job.processed}/{len(job.ids)} processed, {job.deleted} deleted"), chunk_size=chunk_size, pause=pause)
+    thumbnail_reaper.wait()
+    if job.error:
+        click.echo(f"Stopped after {job.deleted} deleted: {job.error}")
+    else:
+        click.echo(f"Deleted {job.deleted} {kind}.")
+    if kind == 'videos':
+        click.echo(f"Thumbnail files: {thumbnail_reaper.stats()}")
+    return job
+
+@app.cli.command('cleanup-inactive-videos')
+@click.option('--days', default=90, help='Delete zero-view videos older than this many days.')
+@click.option('--chunk-size', default=None, type=int, help='Videos per transaction (default: MODERATION_CHUNK_SIZE).')
+@click.option('--pause', default=None, type=float, help='Seconds between chunks (default: MODERATION_PAUSE).')
+@click.option('--dry-run', is_flag=True, help='Only count the videos that would be deleted.')
+def cleanup_inactive_videos(days, chunk_size, pause, dry_run):
+    """Chunked replacement for the cleanup_inactive_videos procedure that also removes thumbnails"""
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
+        # A plain consistent read: no locks are taken until each chunk is deleted
+        cursor.execute("""
+            SELECT video_id FROM videos
+            WHERE views = 0 AND created_at < DATE_SUB(NOW(), INTERVAL %s DAY)
+            ORDER BY video_id
+        """, (days,))
+        ids = [row['video_id'] for row in cursor.fetchall()]
+        cursor.close()
+        conn.commit()
+    finally:
+        conn.release()
+    
+    if dry_run:
+        click.echo(f"{len(ids)} inactive videos older than {days} days would be deleted.")
+        return
+    run_bulk_delete('videos', ids, chunk_size, pause)
+
+@app.cli.command('bulk-delete')
+@click.argument('kind', type=click.Choice(BulkModerator.KINDS))
+@click.option('--user', 'username', default=None, help='Delete everything of KIND posted by this user.')
+@click.option('--ids', default=None, help='Comma-separated ids to delete.')
+@click.option('--chunk-size', default=None, type=int, help='Rows per transaction (default: MODERATION_CHUNK_SIZE).')
+@click.option('--pause', default=None, type=float, help='Seconds between chunks (default: MODERATION_PAUSE).')
+def bulk_delete_command(kind, username, ids, chunk_size, pause):
+    """Delete videos or comments by user or id, in throttled chunks"""
+    if ids:
+        ids = [int(value) for value in ids.split(',') if value.strip().isdigit()]
+    elif username:
+        table, key = ('videos', 'video_id') if kind == 'videos' else ('comments', 'comment_id')
+        conn = db_pool.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT t.{key} FROM {table} t
+                JOIN users u ON t.user_id = u.user_id
+                WHERE u.username = %s
+                ORDER BY t.{key}
+            """, (username,))
+            ids = [row[key] for row in cursor.fetchall()]
+            cursor.close()
+            conn.commit()
+        finally:
+            conn.release()
+    else:
+        raise click.UsageError('Pass --user or --ids.')
+    run_bulk_delete(kind, ids, chunk_size, pause)
+
+@app.route('/admin/pool-stats')
+@admin_required
+def pool_stats():
+    """Connection pool usage counters, including replicas and the async pools (admin only)"""
+    return jsonify(dict(db_pool.stats(), replicas=read_router.stats(), async_pool=async_db.stats(),
+                        async_replicas={name: replica_db.stats() for name, replica_db in async_replicas.items()}))
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: per-route latency, DB time and query count histograms.
+    
+    They include SQL text and route timings, so they need METRICS_TOKEN,
+    or without one a request from this machine.
+    """
+    token = app.config['METRICS_TOKEN']
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return Response('Forbidden: set METRICS_TOKEN to scrape from another host\n', status=403,
+                        mimetype='text/plain')
+    pool = db_pool.stats()
+    body = request_metrics.render() + gauge(
+        'vidstream_db_pool_connections', 'Primary pool connections by state.',
+        [({'state': state}, pool[state]) for state in ('open', 'in_use', 'idle')]
+    )
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/view-counter-stats')
+@admin_required
+def view_counter_stats():
+    """Write-behind view counter flush counters (admin only)"""
+    return jsonify(view_counter.stats())
+
+@app.route('/admin/activity-log-stats')
+@admin_required
+def activity_log_stats():
+    """Background activity log writer counters (admin only)"""
+    return jsonify(activity_writer.stats())
+
+@app.route('/admin/comment-events-stats')
+@admin_required
+def comment_events_stats():
+    """Live comment stream counters (admin only)"""
+    return jsonify(comment_hub.stats())
+
+@app.route('/admin/login-stats')
+@admin_required
+def login_stats():
+    """Password hashing pool and login rate limit counters (admin only)"""
+    return jsonify(dict(password_hasher.stats(), rate_limit=login_limiter.stats()))
+
+@app.route('/admin/feed-stats')
+@admin_required
+def feed_stats():
+    """Activity feed buffer and fan-out counters (admin only)"""
+    return jsonify(activity_feed.stats())
+
+@app.route('/admin/cache-stats')
+@admin_required
+def cache_stats():
+    """Read cache hit/miss and invalidation counters (admin only)"""
+    return jsonify(read_cache.stats())
+
+@app.cli.command('thumbnails-backfill')
+def thumbnails_backfill():
+    """Create resized variants for every thumbnail that lacks them"""
+    if not thumbnail_processor.enabled:
+        click.echo('Pillow is not installed; nothing to do.')
+        return
+    conn = db_pool.acquire()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT thumbnail_path FROM videos")
+        filenames = [row['thumbnail_path'] for row in cursor.fetchall()]
+        cursor.close()
+    finally:
+        conn.release()
+    
+    jobs = [thumbnail_processor.submit(name) for name in filenames
+            if not all(thumbnail_processor.has_variant(name, size) for size in VARIANT_WIDTHS)]
+    for job in jobs:
+        if job is not None:
+            job.result()
+    click.echo(f'Processed {len(jobs)} of {len(filenames)} thumbnails.')
+
+@app.route('/thumbnails/<path:filename>')
+def thumbnail(filename):
+    """Serve an uploaded thumbnail with long-lived caching headers.
+    
+    Content-addressed names (and legacy names requested with a ?v=
+    version) never change their bytes, so they are cacheable forever.
+    send_from_directory handles If-None-Match / If-Modified-Since and
+    Range requests, and hands the file to wsgi.file_wrapper (sendfile
+    under gunicorn, or X-Sendfile when USE_X_SENDFILE is set).
+    """
+    immutable = is_content_addressed(filename) or 'v' in request.args
+    response = send_from_directory(
+        app.config['UPLOAD_FOLDER'], filename,
+        etag=filename.rsplit('.', 1)[0] if is_content_addressed(filename) else True,
+        max_age=app.config['THUMBNAIL_MAX_AGE'] if immutable else 3600,
+        conditional=True
+    )
+    if immutable:
+        response.headers['Cache-Control'] = f"public, max-age={app.config['THUMBNAIL_MAX_AGE']}, immutable"
+    return response
+
+@app.template_global()
+def thumbnail_url(filename, size='md'):
+    """Cache-busting URL of the best available size variant of a thumbnail"""
+    if thumbnail_processor.has_variant(filename, size):
+        filename = variant_name(filename, size)
+    if is_content_addressed(filename):
+        return url_for('thumbnail', filename=filename)
+    
+    # Legacy {timestamp}_{name} uploads are versioned by modification time instead
+    try:
+        version = int(os.path.getmtime(os.path.join(app.config['UPLOAD_FOLDER'], filename)))
+    except OSError:
+        return url_for('thumbnail', filename=filename)
+    return url_for('thumbnail', filename=filename, v=version)
+
+def request_now():
+    """One clock reading per request, shared by every timestamp on the page"""
+    if 'now' not in g:
+        g.now = datetime.now()
+    return g.now
+
+@app.template_filter('timeago_html')
+def timeago_html_filter(timestamp):
+    """Timestamp as a <time> element that static/timeago.js keeps relative.
+    
+    The markup only depends on the timestamp, so it can sit inside cached
+    fragments; the server-side text is just the fallback without JavaScript.
+    """
+    if not timestamp:
+        return ''
+    return Markup('<time class="timeago" datetime="{}" title="{}">{}</time>').format(
+        timestamp.astimezone().isoformat(), timestamp.strftime('%Y-%m-%d %H:%M'), timestamp.strftime('%B %d, %Y'))
 
 @app.template_filter('timeago')
 def timeago_filter(timestamp):
@@ -586,7 +2132,7 @@ def timeago_filter(timestamp):
     if not timestamp:
         return ''
     
-    now = datetime.now()
+    now = request_now()
     diff = now - timestamp
     
     seconds = diff.total_seconds()
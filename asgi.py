@@ -0,0 +1,66 @@
+"""ASGI entry point: the same Flask app, served by an async server.
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+The event loop accepts and streams connections while views run on a pool
+of ASGI_THREADS threads, and DB_ASYNC makes run_reads() send independent
+queries to the aiomysql pool concurrently. Live comment streams
+(/video/<id>/events) are answered on the loop itself, so open streams
+cost a buffer each rather than a thread. `python app.py` (or any WSGI
+server pointed at app:app) is still the synchronous mode.
+"""
+import asyncio
+import re
+
+from a2wsgi import WSGIMiddleware
+
+from app import app, comment_hub
+from async_db import aiomysql
+from comment_events import AsyncSubscriber, RETRY, SSE_HEADERS
+
+if aiomysql is None:
+    # Fail at startup rather than on every request's reads
+    raise RuntimeError('asgi.py needs the aiomysql package: pip install -r requirements-asgi.txt')
+app.config['DB_ASYNC'] = True
+
+wsgi_application = WSGIMiddleware(app, workers=app.config['ASGI_THREADS'])
+
+EVENTS_PATH = re.compile(r'^/video/(\d+)/events$')
+
+
+async def video_events(scope, receive, send, video_id):
+    """Event-loop version of app.video_events()"""
+    headers = dict(scope['headers'])
+    last_event_id = headers.get(b'last-event-id', b'').decode('latin-1') or None
+    subscriber = AsyncSubscriber(app.config['COMMENT_EVENTS_QUEUE_SIZE'])
+    if not comment_hub.subscribe(video_id, subscriber, last_event_id):
+        await send({'type': 'http.response.start', 'status': 503,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': b'{"error": "Too many live streams"}'})
+        return
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(name.lower().encode(), value.encode()) for name, value in SSE_HEADERS.items()]})
+        await send({'type': 'http.response.body', 'body': RETRY.encode(), 'more_body': True})
+        async for frame in subscriber.frames(app.config['COMMENT_EVENTS_HEARTBEAT']):
+            if disconnected.done():
+                break
+            await send({'type': 'http.response.body', 'body': frame.encode(), 'more_body': True})
+    finally:
+        disconnected.cancel()
+        comment_hub.unsubscribe(video_id, subscriber)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        match = EVENTS_PATH.match(scope['path'])
+        if match:
+            return await video_events(scope, receive, send, int(match.group(1)))
+    await wsgi_application(scope, receive, send)
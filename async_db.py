@@ -0,0 +1,160 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+
+from db_pool import PoolTimeout
+
+try:
+    import aiomysql
+except ImportError:  # only needed when DB_ASYNC is on
+    aiomysql = None
+
+
+class AsyncDatabase:
+    """aiomysql connection pool running on a background event loop.
+
+    Views stay synchronous; gather() hands a batch of independent queries
+    to the loop, which runs each on its own pooled connection, and blocks
+    the calling thread only until the slowest one has finished. While a
+    query waits on MySQL the loop keeps serving every other thread's
+    queries, so a slow query holds one connection, not a worker.
+
+    The loop thread and pool are created on first use in each process
+    (after a fork the parent's loop is not usable). Connections run in
+    autocommit mode so every read sees the latest committed data.
+    """
+
+    def __init__(self, connect_kwargs, minsize=1, maxsize=10, timeout=5.0, recycle=3600):
+        self.connect_kwargs = dict(connect_kwargs)
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.recycle = recycle
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pool = None
+        self._pid = None
+        self._batches = 0
+        self._queries = 0
+        self._timeouts = 0
+        self._busy_time = 0.0
+
+    def _ensure_started(self):
+        if self._loop is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return
+            if aiomysql is None:
+                raise RuntimeError('DB_ASYNC needs the aiomysql package: pip install aiomysql')
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='async-db', daemon=True)
+            thread.start()
+            future = asyncio.run_coroutine_threadsafe(self._create_pool(), loop)
+            try:
+                self._pool = future.result(self.timeout)
+            except BaseException as e:
+                # Leave nothing running, so the next call starts over cleanly
+                self._abandon(loop, thread)
+                if isinstance(e, concurrent.futures.TimeoutError):
+                    self._timeouts += 1  # self._lock is already held
+                    raise PoolTimeout(f'Async database pool not ready within {self.timeout}s') from None
+                raise
+            self._loop = loop
+            self._pid = os.getpid()
+
+    def _abandon(self, loop, thread):
+        """Cancel whatever still runs on a loop whose pool never started, then stop and close it"""
+        async def cancel_all():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_all(), loop).result(self.timeout)
+        except Exception as e:
+            print(f"Error cancelling async database startup: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(self.timeout)
+        if not thread.is_alive():
+            loop.close()
+
+    async def _create_pool(self):
+        kwargs = dict(self.connect_kwargs)
+        kwargs['db'] = kwargs.pop('database', None)  # aiomysql's name for it
+        return await aiomysql.create_pool(
+            minsize=self.minsize, maxsize=self.maxsize, pool_recycle=self.recycle,
+            cursorclass=aiomysql.DictCursor, autocommit=True, **kwargs
+        )
+
+    async def _fetch(self, sql, args, one):
+        async with self._pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                started = time.perf_counter()
+                await cursor.execute(sql, args)
+                result = await (cursor.fetchone() if one else cursor.fetchall())
+                return result, time.perf_counter() - started
+
+    async def _gather(self, queries):
+        return await asyncio.gather(*(self._fetch(*query) for query in queries))
+
+    def gather(self, *queries, on_query=None):
+        """Run (sql, args, one) queries concurrently; returns their results in order.
+
+        `one` selects fetchone() over fetchall(). Database errors propagate;
+        PoolTimeout is raised if the batch takes longer than `timeout`.
+        on_query(sql, seconds) is called for each query once all are done.
+        """
+        self._ensure_started()
+        started = time.monotonic()
+        future = asyncio.run_coroutine_threadsafe(self._gather(queries), self._loop)
+        try:
+            results = future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(f'Async queries did not finish within {self.timeout}s')
+        with self._lock:
+            self._batches += 1
+            self._queries += len(queries)
+            self._busy_time += time.monotonic() - started
+        if on_query is not None:
+            for (sql, _, _), (_, elapsed) in zip(queries, results):
+                on_query(sql, elapsed)
+        return [result for result, _ in results]
+
+    def stop(self):
+        """Close the pool and stop the loop (no-op if never started here)"""
+        if self._loop is None or self._pid != os.getpid():
+            return
+        loop, pool = self._loop, self._pool
+        self._loop = self._pool = None
+
+        async def close():
+            pool.close()
+            await pool.wait_closed()
+
+        try:
+            asyncio.run_coroutine_threadsafe(close(), loop).result(self.timeout)
+        except Exception as e:
+            print(f"Error closing async database pool: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+    def stats(self):
+        """Batch counters and pool occupancy for the admin stats endpoint"""
+        with self._lock:
+            stats = {
+                'started': self._loop is not None,
+                'batches': self._batches,
+                'queries': self._queries,
+                'timeouts': self._timeouts,
+                'avg_batch_ms': round(self._busy_time / self._batches * 1000, 2) if self._batches else 0.0,
+            }
+        if self._pool is not None:
+            stats.update(size=self._pool.size, free=self._pool.freesize, maxsize=self._pool.maxsize)
+        return stats
@@ -0,0 +1,152 @@
+"""Compare strategies for loading a video's comment threads.
+
+Seeds one throwaway video with N comments (and a few replies each) inside
+a transaction, times each strategy, then rolls everything back:
+
+- per-comment: the original loop, one replies query per comment
+- batched:     the whole tree in two queries (WHERE comment_id IN (...))
+- first page:  what video() does now, one keyset page plus reply counts
+
+    python -m benchmarks.bench_comment_tree --counts 10 100 1000 2000
+"""
+import argparse
+import time
+
+import pymysql
+
+from app import DB_CONFIG, fetch_comment_page, load_reply_counts
+
+
+class CountingCursor:
+    """Cursor wrapper that counts executed statements"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.queries = 0
+
+    def execute(self, sql, args=None):
+        self.queries += 1
+        return self._cursor.execute(sql, args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+COMMENTS_SQL = """
+    SELECT c.*, u.username
+    FROM comments c
+    JOIN users u ON c.user_id = u.user_id
+    WHERE c.video_id = %s
+    ORDER BY c.created_at DESC
+"""
+
+BATCHED_REPLIES_SQL = """
+    SELECT r.*, u.username, m.username as mentioned_username
+    FROM replies r
+    JOIN users u ON r.user_id = u.user_id
+    LEFT JOIN users m ON r.mentioned_user_id = m.user_id
+    WHERE r.comment_id IN ({placeholders})
+    ORDER BY r.created_at ASC, r.reply_id ASC
+"""
+
+REPLIES_SQL = """
+    SELECT r.*, u.username, m.username as mentioned_username
+    FROM replies r
+    JOIN users u ON r.user_id = u.user_id
+    LEFT JOIN users m ON r.mentioned_user_id = m.user_id
+    WHERE r.comment_id = %s
+    ORDER BY r.created_at ASC
+"""
+
+
+def seed(cursor, comment_count, replies_per_comment):
+    cursor.execute(
+        "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+        ('bench_user', 'bench@example.com', 'x')
+    )
+    user_id = cursor.lastrowid
+    cursor.execute(
+        "INSERT INTO videos (title, thumbnail_path, user_id) VALUES (%s, %s, %s)",
+        ('bench video', 'bench.png', user_id)
+    )
+    video_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO comments (video_id, user_id, content) VALUES (%s, %s, %s)",
+        [(video_id, user_id, f'comment {i}') for i in range(comment_count)]
+    )
+    cursor.execute("SELECT comment_id FROM comments WHERE video_id = %s", (video_id,))
+    comment_ids = [row['comment_id'] for row in cursor.fetchall()]
+    cursor.executemany(
+        "INSERT INTO replies (comment_id, user_id, content) VALUES (%s, %s, %s)",
+        [(cid, user_id, f'reply {j}') for cid in comment_ids for j in range(replies_per_comment)]
+    )
+    return video_id
+
+
+def per_comment(cursor, video_id):
+    cursor.execute(COMMENTS_SQL, (video_id,))
+    comments = cursor.fetchall()
+    for comment in comments:
+        cursor.execute(REPLIES_SQL, (comment['comment_id'],))
+        comment['replies'] = cursor.fetchall()
+    return comments
+
+
+def batched(cursor, video_id):
+    cursor.execute(COMMENTS_SQL, (video_id,))
+    comments = cursor.fetchall()
+    by_id = {}
+    for comment in comments:
+        comment['replies'] = []
+        by_id[comment['comment_id']] = comment
+    if by_id:
+        placeholders = ', '.join(['%s'] * len(by_id))
+        cursor.execute(BATCHED_REPLIES_SQL.format(placeholders=placeholders), list(by_id))
+        for reply in cursor.fetchall():
+            by_id[reply['comment_id']]['replies'].append(reply)
+    return comments
+
+
+def first_page(cursor, video_id):
+    comments, _ = fetch_comment_page(cursor, video_id)
+    return load_reply_counts(cursor, comments)
+
+
+def measure(conn, strategy, video_id, repeat):
+    best = None
+    for _ in range(repeat):
+        cursor = CountingCursor(conn.cursor())
+        started = time.perf_counter()
+        strategy(cursor, video_id)
+        elapsed = time.perf_counter() - started
+        cursor.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return cursor.queries, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 500, 1000, 2000])
+    parser.add_argument('--replies', type=int, default=2, help='replies per comment')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    conn = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **DB_CONFIG)
+    print(f"{'comments':>9} {'per-comment q':>14} {'ms':>9} {'batched q':>10} {'ms':>9} {'page q':>7} {'ms':>9}")
+    try:
+        for count in args.counts:
+            conn.begin()
+            try:
+                video_id = seed(conn.cursor(), count, args.replies)
+                old_q, old_ms = measure(conn, per_comment, video_id, args.repeat)
+                new_q, new_ms = measure(conn, batched, video_id, args.repeat)
+                page_q, page_ms = measure(conn, first_page, video_id, args.repeat)
+            finally:
+                conn.rollback()
+            print(f"{count:>9} {old_q:>14} {old_ms:>9.2f} {new_q:>10} {new_ms:>9.2f} {page_q:>7} {page_ms:>9.2f}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
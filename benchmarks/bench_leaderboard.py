@@ -0,0 +1,125 @@
+"""Compare the original user_leaderboard view query with user_stats.
+
+Seeds N users with videos, comments and replies inside a transaction,
+times the original fan-out query (LEFT JOINs + COUNT DISTINCT +
+get_user_engagement_score per row) against the top-50 read from
+user_stats, then rolls everything back.
+
+    python -m benchmarks.bench_leaderboard --users 100000
+"""
+import argparse
+import random
+import time
+
+import pymysql
+
+from app import DB_CONFIG
+
+
+LEGACY_SQL = """
+    SELECT
+        u.user_id,
+        u.username,
+        COUNT(DISTINCT v.video_id) AS total_videos,
+        COALESCE(SUM(v.views), 0) AS total_views,
+        COUNT(DISTINCT c.comment_id) AS total_comments,
+        COUNT(DISTINCT r.reply_id) AS total_replies,
+        get_user_engagement_score(u.user_id) AS engagement_score
+    FROM users u
+    LEFT JOIN videos v ON u.user_id = v.user_id
+    LEFT JOIN comments c ON u.user_id = c.user_id
+    LEFT JOIN replies r ON u.user_id = r.user_id
+    WHERE u.is_admin = FALSE
+    GROUP BY u.user_id, u.username
+    ORDER BY engagement_score DESC
+    LIMIT 50
+"""
+
+MATERIALIZED_SQL = """
+    SELECT s.user_id, u.username, s.total_videos, s.total_views,
+           s.total_comments, s.total_replies, s.engagement_score
+    FROM user_stats s
+    JOIN users u ON s.user_id = u.user_id
+    WHERE u.is_admin = FALSE
+    ORDER BY s.engagement_score DESC, s.user_id DESC
+    LIMIT 50
+"""
+
+CHUNK = 5000
+
+
+def insert_chunked(cursor, sql, rows):
+    for start in range(0, len(rows), CHUNK):
+        cursor.executemany(sql, rows[start:start + CHUNK])
+
+
+def seed(cursor, users, videos, comments, replies):
+    rng = random.Random(42)
+    insert_chunked(cursor, "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                   [(f'bench_{i}', f'bench_{i}@example.com', 'x') for i in range(users)])
+    cursor.execute("SELECT user_id FROM users WHERE username LIKE 'bench\\_%'")
+    user_ids = [row['user_id'] for row in cursor.fetchall()]
+
+    insert_chunked(cursor, "INSERT INTO videos (title, thumbnail_path, user_id, views) VALUES (%s, %s, %s, %s)",
+                   [(f'video {i}', 'bench.png', rng.choice(user_ids), rng.randint(0, 5000)) for i in range(videos)])
+    cursor.execute("SELECT video_id FROM videos WHERE thumbnail_path = 'bench.png'")
+    video_ids = [row['video_id'] for row in cursor.fetchall()]
+
+    insert_chunked(cursor, "INSERT INTO comments (video_id, user_id, content) VALUES (%s, %s, %s)",
+                   [(rng.choice(video_ids), rng.choice(user_ids), 'c') for _ in range(comments)])
+    cursor.execute("SELECT comment_id FROM comments WHERE video_id IN (SELECT video_id FROM videos WHERE thumbnail_path = 'bench.png')")
+    comment_ids = [row['comment_id'] for row in cursor.fetchall()]
+
+    insert_chunked(cursor, "INSERT INTO replies (comment_id, user_id, content) VALUES (%s, %s, %s)",
+                   [(rng.choice(comment_ids), rng.choice(user_ids), 'r') for _ in range(replies)])
+
+
+def timed(conn, sql, repeat):
+    best = None
+    for _ in range(repeat):
+        cursor = conn.cursor()
+        started = time.perf_counter()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        elapsed = time.perf_counter() - started
+        cursor.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return rows, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--videos', type=int, default=None, help='default: 2 per user')
+    parser.add_argument('--comments', type=int, default=None, help='default: 5 per user')
+    parser.add_argument('--replies', type=int, default=None, help='default: 5 per user')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    videos = args.videos if args.videos is not None else args.users * 2
+    comments = args.comments if args.comments is not None else args.users * 5
+    replies = args.replies if args.replies is not None else args.users * 5
+
+    conn = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **DB_CONFIG)
+    conn.begin()
+    try:
+        started = time.perf_counter()
+        seed(conn.cursor(), args.users, videos, comments, replies)
+        print(f"Seeded {args.users} users, {videos} videos, {comments} comments, "
+              f"{replies} replies in {time.perf_counter() - started:.1f}s")
+
+        new_rows, new_ms = timed(conn, MATERIALIZED_SQL, args.repeat)
+        print(f"user_stats top 50:        {new_ms:10.2f} ms")
+        old_rows, old_ms = timed(conn, LEGACY_SQL, args.repeat)
+        print(f"legacy view query top 50: {old_ms:10.2f} ms")
+
+        old_scores = [row['engagement_score'] for row in old_rows]
+        new_scores = [row['engagement_score'] for row in new_rows]
+        print(f"Speedup: {old_ms / new_ms:.0f}x, same scores: {old_scores == new_scores}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
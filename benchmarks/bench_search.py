@@ -0,0 +1,137 @@
+"""Time full-text search queries against a large seeded comment table.
+
+Seeds one user, N videos and M comments built from a Zipf-distributed
+vocabulary, then times the /search queries (search.py) for rare, common,
+prefix and multi-term searches, plus a LIKE scan for comparison. InnoDB
+only indexes committed rows, so the seed is committed and deleted again
+afterwards (the bench user's rows cascade).
+
+    python -m benchmarks.bench_search --comments 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import pymysql
+
+from app import DB_CONFIG
+import search
+
+
+CHUNK = 5000
+BENCH_USER = 'bench_search'
+
+
+def vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set()
+    while len(words) < size:
+        word = ''.join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+        if word not in search.STOPWORDS:
+            words.add(word)
+    return sorted(words)
+
+
+def sentence(words, weights, rng, length):
+    return ' '.join(rng.choices(words, weights, k=length))
+
+
+def seed(conn, videos, comments, vocab_size):
+    rng = random.Random(42)
+    words = vocabulary(vocab_size, rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]  # Zipf: a few very common words
+
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                   (BENCH_USER, f'{BENCH_USER}@example.com', 'x'))
+    user_id = cursor.lastrowid
+
+    rows = [(sentence(words, weights, rng, 5), sentence(words, weights, rng, 30), 'bench.png', user_id)
+            for _ in range(videos)]
+    for start in range(0, len(rows), CHUNK):
+        cursor.executemany("INSERT INTO videos (title, description, thumbnail_path, user_id) VALUES (%s, %s, %s, %s)",
+                           rows[start:start + CHUNK])
+    conn.commit()
+    cursor.execute("SELECT video_id FROM videos WHERE user_id = %s", (user_id,))
+    video_ids = [row['video_id'] for row in cursor.fetchall()]
+
+    for start in range(0, comments, CHUNK):
+        batch = [(rng.choice(video_ids), user_id, sentence(words, weights, rng, rng.randint(5, 25)))
+                 for _ in range(min(CHUNK, comments - start))]
+        cursor.executemany("INSERT INTO comments (video_id, user_id, content) VALUES (%s, %s, %s)", batch)
+        conn.commit()
+    cursor.close()
+    return words
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM users WHERE username = %s", (BENCH_USER,))
+    conn.commit()
+    cursor.close()
+
+
+def timed(conn, finder, query, page, repeat):
+    samples = []
+    for _ in range(repeat):
+        cursor = conn.cursor()
+        started = time.perf_counter()
+        rows, _ = finder(cursor, query, page)
+        samples.append((time.perf_counter() - started) * 1000)
+        cursor.close()
+    samples.sort()
+    return len(rows), statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def like_scan(conn, term):
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    cursor.execute("SELECT comment_id FROM comments WHERE content LIKE %s ORDER BY comment_id DESC LIMIT 20",
+                   (f'%{term}%',))
+    cursor.fetchall()
+    elapsed = (time.perf_counter() - started) * 1000
+    cursor.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comments', type=int, default=1000000)
+    parser.add_argument('--videos', type=int, default=None, help='default: 1 per 50 comments')
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help='leave the seeded rows in place')
+    args = parser.parse_args()
+    videos = args.videos if args.videos is not None else max(args.comments // 50, 1)
+
+    conn = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **DB_CONFIG)
+    try:
+        cleanup(conn)
+        started = time.perf_counter()
+        words = seed(conn, videos, args.comments, args.vocabulary)
+        print(f"Seeded {videos} videos and {args.comments} comments in {time.perf_counter() - started:.1f}s")
+
+        cases = [
+            ('rare term', words[-1]),
+            ('mid term', words[len(words) // 100]),
+            ('common term', words[0]),
+            ('prefix', words[len(words) // 100][:4]),
+            ('two terms', f'{words[0]} {words[len(words) // 100]}'),
+        ]
+        print(f"{'query':<14}{'table':<10}{'page':>5}{'rows':>6}{'median ms':>12}{'p95 ms':>10}")
+        for label, query in cases:
+            for table, finder in (('videos', search.search_videos), ('comments', search.search_comments)):
+                for page in (1, 5):
+                    rows, median, p95 = timed(conn, finder, query, page, args.repeat)
+                    print(f"{label:<14}{table:<10}{page:>5}{rows:>6}{median:>12.2f}{p95:>10.2f}")
+
+        print(f"LIKE scan (mid term, comments): {like_scan(conn, words[len(words) // 100]):.2f} ms")
+    finally:
+        if not args.keep:
+            cleanup(conn)
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
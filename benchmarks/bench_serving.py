@@ -0,0 +1,82 @@
+"""Load-test the sync (WSGI) and async (ASGI) serving modes side by side.
+
+Start both servers against the same database, then point this at them:
+
+    gunicorn -w 4 -b 127.0.0.1:5000 app:app
+    uvicorn asgi:application --workers 4 --port 8000
+    python -m benchmarks.bench_serving --target sync=http://127.0.0.1:5000 \\
+        --target async=http://127.0.0.1:8000 --path /video/1 --path /user/admin
+
+Each target gets the same closed-loop load: --concurrency clients issuing
+requests back to back for --duration seconds per path. The read cache
+answers most repeat requests, so the gap between the modes shows best with
+many distinct paths or the cache TTLs turned down. The client is plain
+threads and urllib, so run it on a separate machine for the highest loads.
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def worker(url, deadline, samples, errors, lock):
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+                ok = response.status < 400
+        except (urllib.error.URLError, OSError):
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            if ok:
+                samples.append(elapsed)
+            else:
+                errors.append(elapsed)
+
+
+def run(url, concurrency, duration):
+    samples, errors, lock = [], [], threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=worker, args=(url, deadline, samples, errors, lock))
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                        help='server to test, e.g. sync=http://127.0.0.1:5000 (repeatable)')
+    parser.add_argument('--path', action='append', default=None, help='path to request (repeatable); default /')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per target and path')
+    parser.add_argument('--warmup', type=float, default=2.0)
+    args = parser.parse_args()
+    targets = [target.split('=', 1) for target in args.target]
+    paths = args.path or ['/']
+
+    print(f"{'target':<8}{'path':<24}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for path in paths:
+        for name, base in targets:
+            url = base.rstrip('/') + path
+            run(url, args.concurrency, args.warmup)
+            samples, errors = run(url, args.concurrency, args.duration)
+            if not samples:
+                print(f"{name:<8}{path:<24}{0:>10}{0:>10}{'-':>10}{'-':>10}{'-':>10}{len(errors):>8}")
+                continue
+            samples.sort()
+            p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+            p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+            print(f"{name:<8}{path:<24}{len(samples):>10}{len(samples) / args.duration:>10.1f}"
+                  f"{statistics.median(samples):>10.2f}{p95:>10.2f}{p99:>10.2f}{len(errors):>8}")
+
+
+if __name__ == '__main__':
+    main()
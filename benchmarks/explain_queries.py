@@ -0,0 +1,211 @@
+"""Run EXPLAIN on every SQL statement in the app and flag scans and filesorts.
+
+Point DB_CONFIG at a seeded database (see benchmarks.seed) so the
+optimizer sees realistic table sizes, then:
+
+    python -m benchmarks.explain_queries
+    python -m benchmarks.explain_queries app.py trending.py --min-rows 500 --verbose
+
+Statements are found by parsing the source files: every string literal
+(including f-strings whose only substitutions are IN-list placeholders or
+an optional WHERE clause) that starts with SELECT, UPDATE, DELETE or
+INSERT ... SELECT. Each %s is filled with a sample value chosen from the
+column it is compared with (a popular video, an active user, now() for
+timestamps, 20 for LIMIT, ...). A statement is flagged when any table in
+its plan is read by a full table or full index scan, a filesort or a
+temporary table over at least --min-rows estimated rows. EXPLAIN never
+runs the statement itself. Exits with status 1 if anything is flagged.
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+from datetime import datetime
+
+import pymysql
+
+from app import DB_CONFIG
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FILES = ('app.py', 'trending.py', 'search.py', 'mentions.py', 'moderation.py', 'counters.py',
+                 'view_counter.py', 'activity_feed.py')
+
+SQL_START = re.compile(r'^\s*(SELECT\s.*\bFROM\b|UPDATE\s+\w+\s.*\bSET\b|DELETE\s+FROM\b|INSERT\s+(IGNORE\s+)?INTO\b)', re.S)
+PLAIN_INSERT = re.compile(r'^\s*INSERT\b(?!.*\bSELECT\b)', re.I | re.S)
+# f-string substitutions with a fixed SQL meaning; anything else makes a statement dynamic
+SUBSTITUTIONS = {
+    'placeholders': '%s',
+    'cases': 'WHEN %s THEN %s',
+    'where': '',
+}
+DYNAMIC = '\0'
+
+
+def sql_text(node):
+    """The SQL of a string or f-string node, DYNAMIC where it cannot be known"""
+    if isinstance(node, ast.Constant):
+        return node.value
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(value.value)
+        else:
+            parts.append(SUBSTITUTIONS.get(ast.unparse(value.value), DYNAMIC))
+    return ''.join(parts)
+
+
+def statements(path):
+    """(line, sql) for every SQL string literal in a Python source file"""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    inside_fstrings = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.JoinedStr):
+            inside_fstrings.update(id(value) for value in node.values)
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.JoinedStr) or (isinstance(node, ast.Constant) and isinstance(node.value, str)
+                                               and id(node) not in inside_fstrings):
+            text = sql_text(node)
+            if SQL_START.match(text):
+                found.append((node.lineno, text))
+    return sorted(found)
+
+
+def load_samples(cursor):
+    """Realistic values to bind: the most commented video, its top comment, its uploader"""
+    cursor.execute("""
+        SELECT v.video_id, v.user_id, v.thumbnail_path, u.username, u.email
+        FROM video_stats vs
+        JOIN videos v ON vs.video_id = v.video_id
+        JOIN users u ON v.user_id = u.user_id
+        ORDER BY vs.comment_count DESC
+        LIMIT 1
+    """)
+    video = cursor.fetchone()
+    if video is None:
+        raise SystemExit("No videos found; seed the database with benchmarks.seed first")
+    cursor.execute("SELECT comment_id FROM comments WHERE video_id = %s LIMIT 1", (video['video_id'],))
+    comment = cursor.fetchone()
+    return {
+        'video_id': video['video_id'],
+        'user_id': video['user_id'],
+        'mentioned_user_id': video['user_id'],
+        'comment_id': comment['comment_id'] if comment else 1,
+        'thumbnail_path': video['thumbnail_path'],
+        'username': video['username'],
+        'email': video['email'],
+        'created_at': datetime.now(),
+        'action_type': 'INSERT',
+        'table_name': 'videos',
+        'views': 0,
+        'refcount': 0,
+    }
+
+
+COMPARED_COLUMN = re.compile(r'([\w.]+)\s*(?:=|<>|!=|<=|>=|<|>|\bIN\s*\((?:\s*%s\s*,)*)\s*$', re.I)
+
+
+def bind(sql, samples):
+    """Sample arguments for each %s in `sql`, picked from what it is compared with"""
+    args = []
+    for match in re.finditer(r'%s', sql):
+        before = sql[max(match.start() - 200, 0):match.start()]
+        if re.search(r'\b(LIMIT|OFFSET)\s*$', before, re.I):
+            args.append(20)
+        elif re.search(r'\bINTERVAL\s*$', before, re.I):
+            args.append(30)
+        elif re.search(r'\bAGAINST\s*\(\s*$', before, re.I):
+            args.append('video')
+        else:
+            column = COMPARED_COLUMN.search(before)
+            name = column.group(1).rsplit('.', 1)[-1].lower() if column else None
+            if name in samples:
+                args.append(samples[name])
+            elif name and name.endswith('_id'):
+                args.append(2 ** 31 - 1)  # keyset "id < %s": start from the newest
+            else:
+                args.append(1)
+    return args
+
+
+def problems(plan, min_rows):
+    """Human-readable problems in an EXPLAIN result"""
+    found = []
+    for row in plan:
+        table = row.get('table') or ''
+        rows = row.get('rows') or 0
+        extra = row.get('Extra') or ''
+        if table.startswith('<') or rows < min_rows:
+            continue  # derived/union results are read in full by design
+        if row.get('type') == 'ALL':
+            found.append(f"{table}: full table scan (~{rows:,} rows)")
+        elif row.get('type') == 'index' and 'Using index' not in extra:
+            found.append(f"{table}: full index scan (~{rows:,} rows)")
+        if 'Using filesort' in extra:
+            found.append(f"{table}: filesort (~{rows:,} rows)")
+        if 'Using temporary' in extra:
+            found.append(f"{table}: temporary table (~{rows:,} rows)")
+    return found
+
+
+def summary_line(sql, width=90):
+    text = ' '.join(sql.split())
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES, help='source files (default: app and query modules)')
+    parser.add_argument('--min-rows', type=int, default=1000, help='ignore plan steps estimated below this')
+    parser.add_argument('--verbose', action='store_true', help='print every plan, not just flagged ones')
+    args = parser.parse_args()
+
+    conn = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **DB_CONFIG)
+    flagged = skipped = checked = 0
+    try:
+        cursor = conn.cursor()
+        samples = load_samples(cursor)
+        for name in args.files:
+            path = name if os.path.isabs(name) else os.path.join(ROOT, name)
+            for line, sql in statements(path):
+                where = f"{name}:{line}"
+                if DYNAMIC in sql:
+                    skipped += 1
+                    if args.verbose:
+                        print(f"{where:<22} skipped (built at runtime): {summary_line(sql.replace(DYNAMIC, '...'))}")
+                    continue
+                if PLAIN_INSERT.match(sql):
+                    continue  # INSERT ... VALUES has no access path to check
+                try:
+                    cursor.execute('EXPLAIN ' + sql, bind(sql, samples) or None)
+                    plan = cursor.fetchall()
+                except pymysql.Error as e:
+                    skipped += 1
+                    print(f"{where:<22} could not EXPLAIN ({e.args[-1]}): {summary_line(sql)}")
+                    continue
+                checked += 1
+                found = problems(plan, args.min_rows)
+                if found:
+                    flagged += 1
+                if found or args.verbose:
+                    print(f"{where:<22} {'FLAGGED' if found else 'ok':<8} {summary_line(sql)}")
+                    for problem in found:
+                        print(f"{'':<31}- {problem}")
+                if args.verbose:
+                    for row in plan:
+                        print(f"{'':<31}  {row.get('table')}: type={row.get('type')} key={row.get('key')} "
+                              f"rows={row.get('rows')} extra={row.get('Extra')}")
+        cursor.close()
+    finally:
+        conn.rollback()
+        conn.close()
+
+    print(f"\n{checked} statements explained, {flagged} flagged, {skipped} skipped")
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Drive a running server with a weighted mix of page views and comment posts.
+
+Seed a database with benchmarks.seed, start the app against it with
+PROFILE_HEADERS on (so responses report their query counts), then:
+
+    python -m benchmarks.load_test --base-url http://127.0.0.1:5000 --duration 60
+    python -m benchmarks.load_test --save-baseline before-indexes
+    python -m benchmarks.load_test --baseline before-indexes   # exits 1 on a regression
+
+--concurrency clients each loop over the scenarios in --mix, picked by
+weight: the home feed, video pages, trending, the leaderboard, profiles,
+and new comments and replies posted as a logged-in seeded user. Videos,
+profiles and comments are picked Zipf-wise from the most viewed videos,
+most engaged users and the comments on the hottest videos, read from the
+database in DB_CONFIG at startup. Each scenario reports throughput,
+p50/p95/p99 latency, errors and the mean X-Query-Count / Server-Timing db
+time per request. Baselines are JSON files in benchmarks/baselines/; a
+comparison flags scenarios whose p95 or queries per request grew, or whose
+throughput fell, by more than --tolerance. The comment scenarios write to
+the database, so never point this at production.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pymysql
+
+from app import DB_CONFIG
+from benchmarks.seed import sentence, zipf_rank
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+SCENARIOS = ('home', 'video', 'trending', 'leaderboard', 'user', 'comment', 'reply')
+DEFAULT_MIX = 'home=20,video=40,trending=10,leaderboard=5,user=15,comment=5,reply=5'
+WRITES = ('comment', 'reply')
+DB_TIMING = re.compile(r'db;dur=([\d.]+)')
+
+
+class Targets:
+    """Ids to request, hottest first, with Zipf-weighted picks"""
+
+    def __init__(self, video_ids, usernames, comment_ids, skew):
+        self.video_ids = video_ids
+        self.usernames = usernames
+        self.comment_ids = comment_ids
+        self.skew = skew
+
+    @classmethod
+    def load(cls, hot, prefix, skew):
+        conn = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **DB_CONFIG)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT video_id FROM videos ORDER BY views DESC, video_id LIMIT %s", (hot,))
+            video_ids = [row['video_id'] for row in cursor.fetchall()]
+            cursor.execute("""
+                SELECT u.username FROM user_stats s
+                JOIN users u ON s.user_id = u.user_id
+                ORDER BY s.engagement_score DESC, s.user_id DESC
+                LIMIT %s
+            """, (hot,))
+            usernames = [row['username'] for row in cursor.fetchall()]
+            comment_ids = []
+            if video_ids:
+                cursor.execute(f"""
+                    SELECT comment_id FROM comments
+                    WHERE video_id IN ({', '.join(['%s'] * min(len(video_ids), 100))})
+                    LIMIT %s
+                """, video_ids[:100] + [hot])
+                comment_ids = [row['comment_id'] for row in cursor.fetchall()]
+            cursor.execute("SELECT username FROM users WHERE username LIKE %s LIMIT %s",
+                           (prefix.replace('_', '\\_') + '%', hot))
+            logins = [row['username'] for row in cursor.fetchall()]
+            cursor.close()
+        finally:
+            conn.close()
+        return cls(video_ids, usernames, comment_ids, skew), logins
+
+    def pick(self, items, rng):
+        return items[zipf_rank(rng, len(items), self.skew)]
+
+
+class Client:
+    """One simulated user: a cookie jar and a random stream"""
+
+    def __init__(self, base_url, targets, rng):
+        self.base_url = base_url.rstrip('/')
+        self.targets = targets
+        self.rng = rng
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.logged_in = False
+
+    def login(self, username, password):
+        data = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+        with self.opener.open(self.base_url + '/login', data, timeout=30) as response:
+            response.read()
+            self.logged_in = not response.url.rstrip('/').endswith('/login')
+        return self.logged_in
+
+    def request(self, scenario):
+        """Run one scenario; returns (ok, X-Query-Count, db ms) with None where unreported"""
+        targets, rng = self.targets, self.rng
+        data, headers = None, {}
+        if scenario == 'home':
+            path = '/'
+        elif scenario == 'video':
+            path = f'/video/{targets.pick(targets.video_ids, rng)}'
+        elif scenario == 'trending':
+            path = '/trending'
+        elif scenario == 'leaderboard':
+            path = '/leaderboard'
+        elif scenario == 'user':
+            path = f'/user/{urllib.parse.quote(targets.pick(targets.usernames, rng))}'
+        elif scenario == 'comment':
+            path = f'/video/{targets.pick(targets.video_ids, rng)}/comment'
+            data = urllib.parse.urlencode({'content': sentence(rng)}).encode()
+            headers['Accept'] = 'application/json'
+        else:
+            path = f'/comment/{targets.pick(targets.comment_ids, rng)}/reply'
+            data = urllib.parse.urlencode({'content': sentence(rng)}).encode()
+            headers['Accept'] = 'application/json'
+
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                ok = response.status < 400
+                queries = response.headers.get('X-Query-Count')
+                timing = DB_TIMING.search(response.headers.get('Server-Timing', ''))
+        except urllib.error.HTTPError as e:
+            e.read()
+            return False, None, None
+        except (urllib.error.URLError, OSError):
+            return False, None, None
+        return ok, int(queries) if queries is not None else None, float(timing.group(1)) if timing else None
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in SCENARIOS}
+        self.errors = {name: 0 for name in SCENARIOS}
+        self.queries = {name: [] for name in SCENARIOS}
+        self.db_ms = {name: [] for name in SCENARIOS}
+
+    def add(self, scenario, elapsed_ms, ok, queries, db_ms):
+        with self.lock:
+            if not ok:
+                self.errors[scenario] += 1
+                return
+            self.samples[scenario].append(elapsed_ms)
+            if queries is not None:
+                self.queries[scenario].append(queries)
+            if db_ms is not None:
+                self.db_ms[scenario].append(db_ms)
+
+
+def percentile(sorted_samples, fraction):
+    return sorted_samples[max(int(len(sorted_samples) * fraction + 0.5) - 1, 0)]
+
+
+def summarize(results, duration):
+    summary = {}
+    for name, samples in results.samples.items():
+        if not samples and not results.errors[name]:
+            continue
+        samples = sorted(samples)
+        summary[name] = {
+            'requests': len(samples),
+            'errors': results.errors[name],
+            'rps': round(len(samples) / duration, 2),
+            'p50_ms': round(statistics.median(samples), 2) if samples else None,
+            'p95_ms': round(percentile(samples, 0.95), 2) if samples else None,
+            'p99_ms': round(percentile(samples, 0.99), 2) if samples else None,
+            'queries_per_request': round(statistics.mean(results.queries[name]), 2) if results.queries[name] else None,
+            'db_ms_per_request': round(statistics.mean(results.db_ms[name]), 2) if results.db_ms[name] else None,
+        }
+    return summary
+
+
+def run(clients, mix, duration, results):
+    names, weights = zip(*mix.items())
+    deadline = time.monotonic() + duration
+
+    def loop(client):
+        while time.monotonic() < deadline:
+            scenario = client.rng.choices(names, weights)[0]
+            if scenario in WRITES and not client.logged_in:
+                scenario = 'video'  # not logged in: read the video instead
+            started = time.perf_counter()
+            ok, queries, db_ms = client.request(scenario)
+            if results is not None:
+                results.add(scenario, (time.perf_counter() - started) * 1000, ok, queries, db_ms)
+
+    threads = [threading.Thread(target=loop, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario in --mix: {name}")
+        if float(weight or 0) > 0:
+            mix[name] = float(weight)
+    return mix
+
+
+def print_table(summary):
+    print(f"{'scenario':<13}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'queries':>9}{'db ms':>8}{'errors':>8}")
+    for name, row in summary.items():
+        cells = [f"{row[key]:>9}" if row[key] is not None else f"{'-':>9}"
+                 for key in ('requests', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')]
+        db = f"{row['db_ms_per_request']:>8}" if row['db_ms_per_request'] is not None else f"{'-':>8}"
+        print(f"{name:<13}{''.join(cells)}{db}{row['errors']:>8}")
+
+
+def compare(summary, baseline, tolerance):
+    """Print changes against a baseline; returns the list of regressions"""
+    regressions = []
+    print(f"\nAgainst baseline '{baseline['name']}' ({baseline.get('commit') or 'unknown commit'}):")
+    for name, row in summary.items():
+        before = baseline['scenarios'].get(name)
+        if not before or not row['requests'] or not before['requests']:
+            continue
+        changes = []
+        for key, worse_if_higher in (('p95_ms', True), ('rps', False), ('queries_per_request', True)):
+            old, new = before.get(key), row.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            flag = change > tolerance if worse_if_higher else change < -tolerance
+            changes.append(f"{key} {old} -> {new} ({change:+.0%}){' REGRESSION' if flag else ''}")
+            if flag:
+                regressions.append(f"{name} {key}")
+        print(f"  {name:<12} " + '; '.join(changes))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(BASELINE_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'scenario=weight list (default {DEFAULT_MIX})')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=60.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=10.0, help='unmeasured seconds first (fills caches)')
+    parser.add_argument('--hot', type=int, default=10000, help='videos, users and comments to pick from')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of the picks')
+    parser.add_argument('--prefix', default='seed_', help='username prefix of seeded users to log in as')
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save-baseline', metavar='NAME', help='save results as benchmarks/baselines/NAME.json')
+    parser.add_argument('--baseline', metavar='NAME', help='compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed relative change (default 0.15)')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    targets, logins = Targets.load(args.hot, args.prefix, args.skew)
+    if not targets.video_ids or not targets.usernames:
+        raise SystemExit("No videos or users found; seed the database with benchmarks.seed first")
+    if not targets.comment_ids:
+        mix.pop('reply', None)
+
+    rng = random.Random(args.seed)
+    clients = [Client(args.base_url, targets, random.Random(rng.random())) for _ in range(args.concurrency)]
+    if any(name in WRITES for name in mix):
+        for client in clients:
+            if logins:
+                client.login(rng.choice(logins), args.password)
+        logged_in = sum(client.logged_in for client in clients)
+        print(f"{logged_in}/{len(clients)} clients logged in for the comment scenarios")
+        if logged_in < len(clients):
+            print("Some logins failed; if the per-IP login limit stopped them, raise "
+                  "LOGIN_MAX_ATTEMPTS_PER_IP above --concurrency (or 0) on the server under test")
+
+    if args.warmup:
+        run(clients, mix, args.warmup, None)
+    results = Results()
+    run(clients, mix, args.duration, results)
+    summary = summarize(results, args.duration)
+    print_table(summary)
+    if not any(row['queries_per_request'] is not None for row in summary.values()):
+        print("(no X-Query-Count headers: start the server with PROFILE_HEADERS = True for query counts)")
+
+    regressions = []
+    if args.baseline:
+        with open(os.path.join(BASELINE_DIR, f'{args.baseline}.json')) as f:
+            regressions = compare(summary, json.load(f), args.tolerance)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save_baseline}.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'name': args.save_baseline,
+                'commit': git_commit(),
+                'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'settings': {key: getattr(args, key) for key in ('base_url', 'mix', 'concurrency', 'duration',
+                                                                  'warmup', 'hot', 'skew', 'seed')},
+                'scenarios': summary,
+            }, f, indent=2)
+        print(f"Saved baseline to {path}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
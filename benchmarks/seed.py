@@ -0,0 +1,237 @@
+"""Fill the complete_schema.sql tables with synthetic, skewed data for load tests.
+
+Loads a fresh database (not one with real users in it) in committed
+batches, so a run can be watched and its rows survive an interrupt:
+
+    mysql -u root -p < complete_schema.sql
+    python -m benchmarks.seed --users 100000 --videos 1000000 \\
+        --comments 5000000 --replies 5000000
+
+Popularity is Zipfian (--skew is the exponent): a few users upload and
+comment most, a few videos take most of the views and comments, and a few
+comments draw most replies. Hot items are scattered over the id and time
+range rather than bunched at the start. About --mention-rate of replies
+@mention a user. Every seeded user is named <prefix><n> and logs in with
+--password, which benchmarks.load_test relies on. The counter triggers
+run for every row, so large loads take a while; rows/s is printed per
+batch. Thumbnails all point at a handful of placeholder paths with no
+files behind them.
+"""
+import argparse
+import math
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+
+import pymysql
+from werkzeug.security import generate_password_hash
+
+from app import DB_CONFIG
+
+
+WORDS = ('great', 'video', 'thanks', 'love', 'this', 'part', 'music', 'first', 'how', 'why', 'what',
+         'really', 'nice', 'tutorial', 'again', 'watch', 'best', 'ever', 'lol', 'agree', 'not', 'sure')
+THUMBNAILS = [f'seed/thumbnail_{n}.jpg' for n in range(10)]
+
+
+def zipf_rank(rng, n, s):
+    """A rank in [0, n) with P(rank k) roughly proportional to 1 / (k + 1) ** s.
+
+    Inverts a continuous approximation of the Zipf CDF, so it needs no
+    per-item table even for millions of items.
+    """
+    u = rng.random()
+    if abs(s - 1.0) < 1e-9:
+        return min(int(n ** u) - 1, n - 1)
+    a = 1.0 - s
+    return min(int(((n ** a - 1.0) * u + 1.0) ** (1.0 / a)) - 1, n - 1)
+
+
+class Zipf:
+    """Zipf-distributed picks among n items, hot items scattered over the ordinals.
+
+    Ranks from zipf_rank() map to item ordinals through a fixed
+    multiplicative permutation; rank_of() is its inverse.
+    """
+
+    def __init__(self, n, s, rng):
+        self.n = n
+        self.s = s
+        self.rng = rng
+        step = max(int(n * 0.618), 1) | 1
+        while math.gcd(step, n) != 1:
+            step += 2
+        self.step = step
+        self.inverse = pow(step, -1, n) if n > 1 else 0
+
+    def sample(self):
+        return (zipf_rank(self.rng, self.n, self.s) * self.step) % self.n
+
+    def rank_of(self, ordinal):
+        return (ordinal * self.inverse) % self.n
+
+
+def sentence(rng, low=3, high=15):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def insert_batches(conn, label, sql, total, make_row, batch_size):
+    """Insert `total` rows made by make_row(ordinal), committing every batch"""
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    for start in range(0, total, batch_size):
+        rows = [make_row(ordinal) for ordinal in range(start, min(start + batch_size, total))]
+        cursor.executemany(sql, rows)
+        conn.commit()
+        done = start + len(rows)
+        elapsed = time.perf_counter() - started
+        print(f"\r{label:<9}{done:>12,} / {total:,}  {done / elapsed:>10,.0f} rows/s", end='', flush=True)
+    cursor.close()
+    if total:
+        print()
+
+
+def id_range(conn, table, key, after, expected):
+    """First id of the rows just inserted (after `after`), checking they are contiguous"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MIN({key}) AS first, MAX({key}) AS last, COUNT(*) AS n FROM {table} WHERE {key} > %s",
+                   (after,))
+    row = cursor.fetchone()
+    cursor.close()
+    if row['n'] != expected or (expected and row['last'] - row['first'] + 1 != expected):
+        raise SystemExit(f"{table}: expected {expected} contiguous new ids; load into an idle database "
+                         f"with innodb_autoinc_lock_mode 1 or 2 and no concurrent writers")
+    return row['first'] or 0
+
+
+def max_id(conn, table, key):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COALESCE(MAX({key}), 0) AS last FROM {table}")
+    last = cursor.fetchone()['last']
+    cursor.close()
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--videos', type=int, default=1000000)
+    parser.add_argument('--comments', type=int, default=5000000)
+    parser.add_argument('--replies', type=int, default=5000000)
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent (0 is uniform)')
+    parser.add_argument('--mention-rate', type=float, default=0.1)
+    parser.add_argument('--days', type=int, default=365, help='spread created_at over this many past days')
+    parser.add_argument('--max-views', type=int, default=5000000, help='views of the most popular video')
+    parser.add_argument('--prefix', default='seed_', help='username prefix')
+    parser.add_argument('--password', default='loadtest', help='password of every seeded user')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=args.days)
+    span = (now - start).total_seconds()
+    user_pick = Zipf(args.users, args.skew, rng)
+    video_pick = Zipf(args.videos, args.skew, rng)
+    comment_pick = Zipf(args.comments, args.skew, rng)
+
+    conn = pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **DB_CONFIG)
+    try:
+        started = time.perf_counter()
+        password_hash = generate_password_hash(args.password)
+        user_after = max_id(conn, 'users', 'user_id')
+        insert_batches(
+            conn, 'users', "INSERT INTO users (username, email, password_hash, created_at) VALUES (%s, %s, %s, %s)",
+            args.users,
+            lambda n: (f'{args.prefix}{n}', f'{args.prefix}{n}@example.com', password_hash,
+                       start + timedelta(seconds=span * 0.5 * n / args.users)),
+            args.batch_size
+        )
+        user_base = id_range(conn, 'users', 'user_id', user_after, args.users)
+
+        # Videos are inserted in time order; a video's popularity rank sets its views
+        video_after = max_id(conn, 'videos', 'video_id')
+        video_times = array('l', (int(span * 0.5 + span * 0.5 * n / args.videos) for n in range(args.videos)))
+        insert_batches(
+            conn, 'videos',
+            "INSERT INTO videos (title, description, thumbnail_path, user_id, views, created_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            args.videos,
+            lambda n: (sentence(rng, 2, 8), sentence(rng, 5, 30), THUMBNAILS[n % len(THUMBNAILS)],
+                       user_base + user_pick.sample(),
+                       int(args.max_views / (video_pick.rank_of(n) + 1) ** args.skew),
+                       start + timedelta(seconds=video_times[n])),
+            args.batch_size
+        )
+        video_base = id_range(conn, 'videos', 'video_id', video_after, args.videos)
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO thumbnails (thumbnail_path, refcount) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE refcount = refcount + VALUES(refcount)",
+            [(path, len(range(i, args.videos, len(THUMBNAILS)))) for i, path in enumerate(THUMBNAILS)]
+        )
+        conn.commit()
+        cursor.close()
+
+        # A comment lands some time after its video; replies some time after their comment
+        comment_after = max_id(conn, 'comments', 'comment_id')
+        comment_times = array('l')
+
+        def comment_row(n):
+            video = video_pick.sample()
+            posted = video_times[video] + int(rng.random() * (span - video_times[video]))
+            comment_times.append(posted)
+            return (video_base + video, user_base + user_pick.sample(), sentence(rng),
+                    start + timedelta(seconds=posted))
+
+        insert_batches(conn, 'comments',
+                       "INSERT INTO comments (video_id, user_id, content, created_at) VALUES (%s, %s, %s, %s)",
+                       args.comments, comment_row, args.batch_size)
+        comment_base = id_range(conn, 'comments', 'comment_id', comment_after, args.comments)
+
+        def reply_row(n):
+            comment = comment_pick.sample()
+            posted = comment_times[comment] + int(rng.random() * (span - comment_times[comment]))
+            content, mentioned = sentence(rng), None
+            if rng.random() < args.mention_rate:
+                mentioned = user_pick.sample()
+                content = f'@{args.prefix}{mentioned} {content}'
+                mentioned += user_base
+            return (comment_base + comment, user_base + user_pick.sample(), content, mentioned,
+                    start + timedelta(seconds=posted))
+
+        reply_after = max_id(conn, 'replies', 'reply_id')
+        insert_batches(conn, 'replies',
+                       "INSERT INTO replies (comment_id, user_id, content, mentioned_user_id, created_at) "
+                       "VALUES (%s, %s, %s, %s, %s)",
+                       args.replies, reply_row, args.batch_size)
+        del comment_times
+
+        # One mention per mentioning reply, in reply_id ranges to keep each transaction small
+        cursor = conn.cursor()
+        last_reply = max_id(conn, 'replies', 'reply_id')
+        for low in range(reply_after, last_reply, args.batch_size * 10):
+            cursor.execute("""
+                INSERT IGNORE INTO mentions (reply_id, mentioned_user_id, created_at)
+                SELECT reply_id, mentioned_user_id, created_at FROM replies
+                WHERE reply_id > %s AND reply_id <= %s
+                AND mentioned_user_id IS NOT NULL AND mentioned_user_id <> user_id
+            """, (low, low + args.batch_size * 10))
+            conn.commit()
+
+        print("Analyzing tables...")
+        for table in ('users', 'videos', 'comments', 'replies', 'mentions', 'user_stats', 'video_stats'):
+            cursor.execute(f"ANALYZE TABLE {table}")
+            cursor.fetchall()
+        cursor.close()
+        print(f"Seeded {args.users:,} users, {args.videos:,} videos, {args.comments:,} comments and "
+              f"{args.replies:,} replies in {time.perf_counter() - started:.0f}s "
+              f"(log in as {args.prefix}0 / {args.password})")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
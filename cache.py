@@ -0,0 +1,469 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # redis is optional; without it the cache is per-process only
+    redis = None
+
+
+MISSING = object()
+
+SHARED_ERRORS = (OSError,) + ((redis.RedisError,) if redis is not None else ())
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Holds at most `maxsize` entries; the least recently used entry is
+    evicted first. Hit, miss and eviction counters are kept for stats().
+    """
+
+    def __init__(self, maxsize=128, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key, default=MISSING):
+        """Return the cached value, or `default` if absent or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entry if full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling loader() on a miss"""
+        value = self.get(key)
+        if value is MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._invalidations += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        """Snapshot of cache counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
+
+
+class MemoryStore:
+    """In-process stand-in for the shared tier, with RedisStore's interface.
+
+    Values are opaque bytes. Useful in tests and single-process setups;
+    it is not shared between processes. Expired entries are dropped when
+    read, and swept from the whole store at most every `purge_interval`
+    seconds on writes, so keys that are never read again do not pile up.
+    """
+
+    def __init__(self, purge_interval=10.0):
+        self.purge_interval = purge_interval
+        self._data = {}  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+        self._purged_at = time.monotonic()
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _purge(self, now):
+        """Drop every expired entry, at most once per purge_interval (call with self._lock held)"""
+        if now - self._purged_at < self.purge_interval:
+            return
+        self._purged_at = now
+        for key in [key for key, (expires_at, _) in self._data.items()
+                    if expires_at is not None and expires_at <= now]:
+            del self._data[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            return None if entry is None else entry[1]
+
+    def get_many(self, keys):
+        with self._lock:
+            now = time.monotonic()
+            return [None if entry is None else entry[1] for entry in (self._live(key, now) for key in keys)]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            self._data[key] = (now + ttl, value)
+
+    def add(self, key, value, ttl):
+        """Set only if absent; True if this call set it"""
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            if self._live(key, now) is not None:
+                return False
+            self._data[key] = (now + ttl, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, ttl=None):
+        """Add one to a counter; a new counter expires after `ttl` seconds if given"""
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            entry = self._live(key, now)
+            if entry is None:
+                value, expires = 1, (now + ttl if ttl else None)
+            else:
+                value, expires = int(entry[1]) + 1, entry[0]
+            self._data[key] = (expires, str(value).encode())
+            return value
+
+
+class RedisStore:
+    """Shared tier backed by Redis (or anything speaking its protocol)"""
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError('The redis package is required for a shared cache (pip install redis)')
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def get_many(self, keys):
+        return self.client.mget(keys)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, px=int(ttl * 1000))
+
+    def add(self, key, value, ttl):
+        return bool(self.client.set(key, value, px=int(ttl * 1000), nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key, ttl=None):
+        if ttl:
+            self.client.set(key, 0, px=int(ttl * 1000), nx=True)  # INCR keeps the expiry
+        return self.client.incr(key)
+
+
+def shared_store_from_url(url):
+    """Shared tier for a CACHE_REDIS_URL: None, 'memory://' (the in-process fake) or a Redis URL"""
+    if not url:
+        return None
+    if url == 'memory://':
+        return MemoryStore()
+    return RedisStore(url)
+
+
+class TieredCache:
+    """Two-tier read cache: an in-process TTLCache in front of an optional shared store.
+
+    Entries carry the versions of the tags they were stored with;
+    invalidate(tag) bumps a tag's version, which turns every entry stored
+    under the old version into a miss in every process. With a shared
+    store, each process re-reads tag versions at most every `tag_ttl`
+    seconds, which bounds how long another worker's invalidation takes to
+    show up; invalidations made in this process apply immediately.
+
+    get_or_load() is single-flight: concurrent misses for one key in a
+    process run the loader once, and with a shared store a short lock
+    key lets one process load while the others wait up to
+    `lock_timeout` seconds for its result. Only callers of the same key
+    ever wait on each other, and a loader may itself call get_or_load().
+    Shared-store errors are logged and treated as misses, so an outage
+    only costs hit rate.
+
+    Tag versions not used for a while are forgotten: after `tag_ttl`
+    seconds with a shared store (they are re-read from it anyway), and
+    otherwise once every entry stored before the tag's last invalidation
+    has expired.
+    """
+
+    def __init__(self, shared=None, local_size=1024, ttl=30, tag_ttl=1.0, lock_timeout=5.0, prefix='vidstream:'):
+        self.shared = shared
+        self.ttl = ttl
+        self.tag_ttl = tag_ttl
+        self.lock_timeout = lock_timeout
+        self.prefix = prefix
+
+        self.local = TTLCache(maxsize=local_size, ttl=ttl)
+        self._tags = {}  # tag -> (version, read_at); read_at is the invalidation time without a shared store
+        self._version_seq = 0  # local tag versions, unique across tags so a forgotten tag never matches again
+        self._longest_ttl = ttl
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._flights = {}  # full key -> (loading thread id, Event set when its load ends)
+
+        self._local_hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._loads = 0
+        self._lock_waits = 0
+        self._invalidations = 0
+        self._shared_errors = 0
+
+    def _key(self, key):
+        if isinstance(key, tuple):
+            key = ':'.join(str(part) for part in key)
+        return f"{self.prefix}{key}"
+
+    def _shared_call(self, method, *args):
+        try:
+            return getattr(self.shared, method)(*args)
+        except SHARED_ERRORS as e:
+            print(f"Shared cache error: {e}")
+            with self._lock:
+                self._shared_errors += 1
+            return None
+
+    def _tag_versions(self, tags):
+        """Current version of each tag, from the local copy when fresh enough"""
+        now = time.monotonic()
+        versions, stale = {}, []
+        with self._lock:
+            for tag in tags:
+                known = self._tags.get(tag)
+                if known is not None and (self.shared is None or now - known[1] < self.tag_ttl):
+                    versions[tag] = known[0]
+                else:
+                    stale.append(tag)
+        if stale and self.shared is not None:
+            fetched = self._shared_call('get_many', [self._key(('tag', tag)) for tag in stale])
+            if fetched is None:
+                return None  # unknown versions; treat as a miss
+            with self._lock:
+                for tag, raw in zip(stale, fetched):
+                    versions[tag] = int(raw) if raw is not None else 0
+                    self._tags[tag] = (versions[tag], now)
+                self._prune_tags(now)
+        else:
+            for tag in stale:
+                versions[tag] = 0
+        return versions
+
+    def _prune_tags(self, now):
+        """Forget tag versions nothing can still depend on (call with self._lock held)"""
+        horizon = self.tag_ttl if self.shared is not None else self._longest_ttl
+        if now - self._pruned_at < horizon:
+            return
+        self._pruned_at = now
+        for tag in [tag for tag, (_, read_at) in self._tags.items() if now - read_at >= horizon]:
+            del self._tags[tag]
+
+    def _valid(self, entry):
+        expires_at, versions, _ = entry
+        if expires_at <= time.time():
+            return False
+        return not versions or self._tag_versions(versions) == versions
+
+    def get(self, key, default=MISSING):
+        """Return the cached value, or `default` if absent, expired or invalidated"""
+        full_key = self._key(key)
+        entry = self.local.get(full_key)
+        if entry is not MISSING:
+            if self._valid(entry):
+                with self._lock:
+                    self._local_hits += 1
+                return entry[2]
+            self.local.delete(full_key)
+            with self._lock:
+                self._stale += 1
+
+        if self.shared is not None:
+            raw = self._shared_call('get', full_key)
+            if raw is not None:
+                entry = pickle.loads(raw)
+                if self._valid(entry):
+                    self.local.set(full_key, entry, ttl=min(self.local.ttl, entry[0] - time.time()))
+                    with self._lock:
+                        self._shared_hits += 1
+                    return entry[2]
+                with self._lock:
+                    self._stale += 1
+
+        with self._lock:
+            self._misses += 1
+        return default
+
+    def set(self, key, value, ttl=None, tags=(), shared=True):
+        """Store a value under `tags`; shared=False keeps it in this process only"""
+        versions = self._tag_versions(tags) if tags else {}
+        if versions is not None:
+            self._store(key, value, ttl, versions, shared)
+
+    def _store(self, key, value, ttl, versions, shared):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl > self._longest_ttl:
+            with self._lock:
+                self._longest_ttl = max(self._longest_ttl, ttl)
+        full_key = self._key(key)
+        entry = (time.time() + ttl, versions, value)
+        self.local.set(full_key, entry, ttl=ttl)
+        if shared and self.shared is not None:
+            self._shared_call('set', full_key, pickle.dumps(entry), ttl)
+
+    def get_or_load(self, key, loader, ttl=None, tags=(), shared=True):
+        """Return the cached value for `key`, calling loader() once on a miss"""
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+
+        full_key = self._key(key)
+        me = threading.get_ident()
+        with self._lock:
+            flight = self._flights.get(full_key)
+            leading = flight is None
+            if leading:
+                flight = self._flights[full_key] = (me, threading.Event())
+        if not leading:
+            if flight[0] != me:  # a loader asking for its own key would wait on itself
+                with self._lock:
+                    self._lock_waits += 1
+                flight[1].wait(self.lock_timeout)
+                value = self.get(key)
+                if value is not MISSING:
+                    return value
+            # The other load failed or is too slow; load without waiting on it again
+            return self._load(key, full_key, loader, ttl, tags, shared)
+
+        try:
+            value = self.get(key)  # a load that just finished may have stored it
+            if value is not MISSING:
+                return value
+            return self._load(key, full_key, loader, ttl, tags, shared)
+        finally:
+            with self._lock:
+                del self._flights[full_key]
+            flight[1].set()
+
+    def _load(self, key, full_key, loader, ttl, tags, shared):
+        lock_key = self._key(('lock', full_key))
+        locked = False
+        if shared and self.shared is not None:
+            locked = self._shared_call('add', lock_key, b'1', self.lock_timeout)
+            if not locked:
+                value = self._wait_for(key)
+                if value is not MISSING:
+                    return value
+
+        # Versions are read before loading, so an invalidation during the load wins
+        versions = self._tag_versions(tags) if tags else {}
+        try:
+            value = loader()
+            with self._lock:
+                self._loads += 1
+            if versions is not None:
+                self._store(key, value, ttl, versions, shared)
+        finally:
+            if locked:
+                self._shared_call('delete', lock_key)
+        return value
+
+    def _wait_for(self, key):
+        """Poll for a value another process is loading, up to lock_timeout"""
+        with self._lock:
+            self._lock_waits += 1
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.get(key)
+            if value is not MISSING:
+                return value
+        return MISSING
+
+    def delete(self, key):
+        full_key = self._key(key)
+        self.local.delete(full_key)
+        if self.shared is not None:
+            self._shared_call('delete', full_key)
+
+    def invalidate(self, *tags):
+        """Expire every entry stored under any of `tags`, in every process"""
+        now = time.monotonic()
+        for tag in tags:
+            if self.shared is not None:
+                version = self._shared_call('incr', self._key(('tag', tag)))
+                if version is None:
+                    # Could not reach the shared tier; at least drop this process's copy
+                    self.local.clear()
+                    continue
+            else:
+                with self._lock:
+                    self._version_seq += 1
+                    version = self._version_seq
+            with self._lock:
+                self._tags[tag] = (version, now)
+                self._invalidations += 1
+                self._prune_tags(now)
+
+    def stats(self):
+        """Snapshot of cache counters"""
+        with self._lock:
+            lookups = self._local_hits + self._shared_hits + self._misses
+            return {
+                'backend': type(self.shared).__name__ if self.shared is not None else 'local',
+                'local': self.local.stats(),
+                'local_hits': self._local_hits,
+                'shared_hits': self._shared_hits,
+                'misses': self._misses,
+                'hit_rate': round((self._local_hits + self._shared_hits) / lookups, 4) if lookups else 0.0,
+                'stale': self._stale,
+                'loads': self._loads,
+                'lock_waits': self._lock_waits,
+                'invalidations': self._invalidations,
+                'shared_errors': self._shared_errors,
+                'tags': len(self._tags),
+            }
@@ -0,0 +1,179 @@
+import asyncio
+import itertools
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+
+
+HEARTBEAT = ': ping\n\n'  # SSE comment line; keeps proxies from closing idle streams
+RETRY = 'retry: 3000\n\n'  # milliseconds browsers wait before reconnecting
+SSE_HEADERS = {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',  # nginx must not buffer the stream
+}
+
+
+class CommentHub:
+    """In-process pub/sub of new comments and replies, one channel per video.
+
+    publish() encodes each event once as a Server-Sent Events frame and
+    hands that same string to every subscriber of the video. Subscribers
+    only buffer frames, so publishing never waits on a slow client; one
+    whose buffer fills up is dropped and reconnects. Each channel keeps
+    its last `history` frames so a client reconnecting with Last-Event-ID
+    is sent what it missed. Events only reach subscribers in this process.
+    """
+
+    def __init__(self, history=50, max_subscribers=10000, max_channels=10000):
+        self.history = history
+        self.max_subscribers = max_subscribers
+        self.max_channels = max_channels
+
+        self._lock = threading.Lock()
+        self._channels = OrderedDict()  # video_id -> (subscribers set, recent (seq, frame) deque)
+        self._seq = itertools.count(1)
+        self._boot = f"{os.getpid()}x{id(self):x}"  # event ids from another process or run never match
+        self._subscribers = 0
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._rejected = 0
+
+    def _channel(self, video_id):
+        channel = self._channels.get(video_id)
+        if channel is None:
+            channel = self._channels[video_id] = (set(), deque(maxlen=self.history))
+            self._evict()
+        self._channels.move_to_end(video_id)
+        return channel
+
+    def _evict(self):
+        # Forget the history of the least recently used channels nobody listens to
+        for video_id in list(self._channels):
+            if len(self._channels) <= self.max_channels:
+                break
+            if not self._channels[video_id][0]:
+                del self._channels[video_id]
+
+    def _missed(self, recent, last_event_id):
+        if not last_event_id:
+            return []
+        boot, _, seq = last_event_id.rpartition('.')
+        if boot != self._boot or not seq.isdigit():
+            return []  # another process's ids: its events never reached this one
+        return [frame for frame_seq, frame in recent if frame_seq > int(seq)]
+
+    def subscribe(self, video_id, subscriber, last_event_id=None):
+        """Start delivering a video's events to subscriber.push(frame).
+
+        Frames newer than `last_event_id` are replayed first. Returns False
+        if the process already has `max_subscribers` subscribers.
+        """
+        with self._lock:
+            if self._subscribers >= self.max_subscribers:
+                self._rejected += 1
+                return False
+            subscribers, recent = self._channel(video_id)
+            for frame in self._missed(recent, last_event_id):
+                subscriber.push(frame)
+            subscribers.add(subscriber)
+            self._subscribers += 1
+        return True
+
+    def unsubscribe(self, video_id, subscriber):
+        with self._lock:
+            channel = self._channels.get(video_id)
+            if channel is not None and subscriber in channel[0]:
+                channel[0].discard(subscriber)
+                self._subscribers -= 1
+
+    def publish(self, video_id, event, data):
+        """Send one event (e.g. 'comment' or 'reply') with a JSON-serializable payload"""
+        with self._lock:
+            seq = next(self._seq)
+            frame = f"id: {self._boot}.{seq}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            subscribers, recent = self._channel(video_id)
+            recent.append((seq, frame))
+            self._published += 1
+            for subscriber in list(subscribers):
+                if subscriber.push(frame):
+                    self._delivered += 1
+                else:
+                    subscribers.discard(subscriber)
+                    self._subscribers -= 1
+                    self._dropped += 1
+
+    def stats(self):
+        """Subscriber and delivery counters for the admin stats endpoint"""
+        with self._lock:
+            return {
+                'subscribers': self._subscribers,
+                'channels': len(self._channels),
+                'published': self._published,
+                'delivered': self._delivered,
+                'dropped_slow_clients': self._dropped,
+                'rejected': self._rejected,
+            }
+
+
+class QueueSubscriber:
+    """Frame buffer for a stream served from a WSGI thread (one thread per client)"""
+
+    def __init__(self, maxsize=100):
+        self._queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, frame):
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+    def frames(self, heartbeat=15):
+        """Yield frames as they arrive, a heartbeat when idle, until the buffer overflows"""
+        while not self.overflowed:
+            try:
+                yield self._queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield HEARTBEAT
+
+
+class AsyncSubscriber:
+    """Frame buffer for a stream served from an asyncio event loop (no thread per client).
+
+    push() may be called from any thread; frames are handed to the loop
+    with call_soon_threadsafe().
+    """
+
+    def __init__(self, maxsize=100, loop=None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, frame):
+        if self.overflowed:
+            return False
+        try:
+            self._loop.call_soon_threadsafe(self._offer, frame)
+        except RuntimeError:  # loop closed
+            return False
+        return True
+
+    def _offer(self, frame):
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def frames(self, heartbeat=15):
+        """Yield frames as they arrive, a heartbeat when idle, until the buffer overflows"""
+        while not self.overflowed:
+            try:
+                yield await asyncio.wait_for(self._queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
@@ -1,8 +1,12 @@
+DROP TABLE IF EXISTS user_stats;
+DROP TABLE IF EXISTS video_stats;
+DROP TABLE IF EXISTS mentions;
 DROP TABLE IF EXISTS replies;
 DROP TABLE IF EXISTS comments;
 DROP TABLE IF EXISTS videos;
 DROP TABLE IF EXISTS users;
 DROP TABLE IF EXISTS activity_log;
+DROP TABLE IF EXISTS thumbnails;
 
 CREATE TABLE users (
     user_id INT PRIMARY KEY AUTO_INCREMENT,
@@ -21,6 +25,10 @@ CREATE TABLE videos (
     user_id INT NOT NULL,
     views INT DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_videos_created (created_at, video_id),
+    INDEX idx_videos_user_created (user_id, created_at, video_id),
+    INDEX idx_videos_thumbnail (thumbnail_path),
+    FULLTEXT INDEX ft_videos_title_description (title, description),
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
@@ -30,6 +38,9 @@ CREATE TABLE comments (
     user_id INT NOT NULL,
     content TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_comments_video_created (video_id, created_at, comment_id),
+    INDEX idx_comments_created (created_at, comment_id),
+    FULLTEXT INDEX ft_comments_content (content),
     FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
@@ -41,19 +52,111 @@ CREATE TABLE replies (
     content TEXT NOT NULL,
     mentioned_user_id INT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_replies_comment_created (comment_id, created_at, reply_id),
     FOREIGN KEY (comment_id) REFERENCES comments(comment_id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
     FOREIGN KEY (mentioned_user_id) REFERENCES users(user_id) ON DELETE SET NULL
 );
 
+-- One row per user @mentioned in a reply (the author's own mentions excluded);
+-- replies.mentioned_user_id keeps only the first. Backs the /mentions inbox.
+CREATE TABLE mentions (
+    mention_id INT PRIMARY KEY AUTO_INCREMENT,
+    reply_id INT NOT NULL,
+    mentioned_user_id INT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_mentions_reply_user (reply_id, mentioned_user_id),
+    INDEX idx_mentions_user_created (mentioned_user_id, created_at, mention_id),
+    FOREIGN KEY (reply_id) REFERENCES replies(reply_id) ON DELETE CASCADE,
+    FOREIGN KEY (mentioned_user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Append-only activity feed: one row per video, comment or reply, written in the
+-- transaction that creates it. Author and video title are copied in (usernames
+-- never change), so a feed page is one range scan with no joins.
+CREATE TABLE feed_items (
+    feed_item_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    kind ENUM('video', 'comment', 'reply') NOT NULL,
+    user_id INT NOT NULL,
+    username VARCHAR(50) NOT NULL,
+    video_id INT NOT NULL,
+    video_title VARCHAR(200) NOT NULL,
+    comment_id INT NULL,
+    reply_id INT NULL,
+    summary VARCHAR(200) NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_feed_items_user (user_id, feed_item_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
+    FOREIGN KEY (comment_id) REFERENCES comments(comment_id) ON DELETE CASCADE,
+    FOREIGN KEY (reply_id) REFERENCES replies(reply_id) ON DELETE CASCADE
+);
+
+CREATE TABLE follows (
+    follower_id INT NOT NULL,
+    followee_id INT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (follower_id, followee_id),
+    INDEX idx_follows_followee (followee_id, follower_id),
+    FOREIGN KEY (follower_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (followee_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Each user's "following" feed, filled at write time by fanning feed items out
+-- to the author's followers; pages are range scans on the primary key
+CREATE TABLE user_feed (
+    user_id INT NOT NULL,
+    feed_item_id BIGINT NOT NULL,
+    PRIMARY KEY (user_id, feed_item_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (feed_item_id) REFERENCES feed_items(feed_item_id) ON DELETE CASCADE
+);
+
+CREATE TABLE video_stats (
+    video_id INT PRIMARY KEY,
+    comment_count INT NOT NULL DEFAULT 0,
+    reply_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE
+);
+
+CREATE TABLE user_stats (
+    user_id INT PRIMARY KEY,
+    total_videos INT NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_comments INT NOT NULL DEFAULT 0,
+    total_replies INT NOT NULL DEFAULT 0,
+    engagement_score INT AS (total_videos * 10 + total_comments * 2 + total_replies) STORED,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_user_stats_engagement (engagement_score, user_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Reference counts for content-addressed thumbnail files shared by several videos
+CREATE TABLE thumbnails (
+    thumbnail_path VARCHAR(255) PRIMARY KEY,
+    refcount INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Written in batches by the app's ActivityLogWriter (activity_events.py), not by triggers.
+-- Partitioned by month so old rows are dropped a partition at a time; only the
+-- catch-all partition exists here and `flask activity-log-maintain` adds the rest.
 CREATE TABLE activity_log (
-    log_id INT PRIMARY KEY AUTO_INCREMENT,
+    log_id INT NOT NULL AUTO_INCREMENT,
     action_type VARCHAR(50) NOT NULL,
     table_name VARCHAR(50) NOT NULL,
     record_id INT,
     user_id INT,
     details TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (log_id, created_at),
+    INDEX idx_activity_created (created_at, log_id),
+    INDEX idx_activity_action_created (action_type, created_at, log_id),
+    INDEX idx_activity_table_created (table_name, created_at, log_id)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 INSERT INTO users (username, email, password_hash, is_admin) 
@@ -119,15 +222,13 @@ BEGIN
         v.title,
         v.views,
         u.username AS uploaded_by,
-        COUNT(DISTINCT c.comment_id) AS total_comments,
-        COUNT(DISTINCT r.reply_id) AS total_replies,
+        COALESCE(vs.comment_count, 0) AS total_comments,
+        COALESCE(vs.reply_count, 0) AS total_replies,
         v.created_at
     FROM videos v
     JOIN users u ON v.user_id = u.user_id
-    LEFT JOIN comments c ON v.video_id = c.video_id
-    LEFT JOIN replies r ON c.comment_id = r.comment_id
-    WHERE v.video_id = video_id_param
-    GROUP BY v.video_id, v.title, v.views, u.username, v.created_at;
+    LEFT JOIN video_stats vs ON v.video_id = vs.video_id
+    WHERE v.video_id = video_id_param;
 END//
 DELIMITER ;
 
@@ -135,27 +236,20 @@ DELIMITER //
 DROP PROCEDURE IF EXISTS get_user_activity//
 CREATE PROCEDURE get_user_activity(IN username_param VARCHAR(50))
 BEGIN
-    DECLARE user_id_var INT;
-    
-    SELECT user_id INTO user_id_var FROM users WHERE username = username_param LIMIT 1;
-    
     SELECT 
         u.user_id,
         u.username,
         u.email,
         u.is_admin,
         u.created_at AS member_since,
-        COUNT(DISTINCT v.video_id) AS total_videos,
-        COALESCE(SUM(v.views), 0) AS total_views,
-        COUNT(DISTINCT c.comment_id) AS total_comments,
-        COUNT(DISTINCT r.reply_id) AS total_replies,
-        get_user_engagement_score(u.user_id) AS engagement_score
+        COALESCE(s.total_videos, 0) AS total_videos,
+        COALESCE(s.total_views, 0) AS total_views,
+        COALESCE(s.total_comments, 0) AS total_comments,
+        COALESCE(s.total_replies, 0) AS total_replies,
+        COALESCE(s.engagement_score, 0) AS engagement_score
     FROM users u
-    LEFT JOIN videos v ON u.user_id = v.user_id
-    LEFT JOIN comments c ON u.user_id = c.user_id
-    LEFT JOIN replies r ON u.user_id = r.user_id
-    WHERE u.user_id = user_id_var
-    GROUP BY u.user_id, u.username, u.email, u.is_admin, u.created_at;
+    LEFT JOIN user_stats s ON u.user_id = s.user_id
+    WHERE u.username = username_param;
 END//
 DELIMITER ;
 
@@ -163,21 +257,78 @@ DELIMITER //
 DROP PROCEDURE IF EXISTS cleanup_inactive_videos//
 CREATE PROCEDURE cleanup_inactive_videos(IN days_old INT)
 BEGIN
-    DECLARE deleted_count INT;
-    
-    SELECT COUNT(*) INTO deleted_count
-    FROM videos
-    WHERE views = 0 
-    AND created_at < DATE_SUB(NOW(), INTERVAL days_old DAY);
+    -- Delete in chunks of 500 so each statement holds few row locks and a
+    -- small undo log; ROW_COUNT() ends the loop, no separate COUNT(*) pass.
+    -- Thumbnail files and refcounts are not released here: prefer
+    -- `flask cleanup-inactive-videos`, which also reaps unused thumbnails.
+    DECLARE cutoff DATETIME DEFAULT DATE_SUB(NOW(), INTERVAL days_old DAY);
+    DECLARE deleted_count INT DEFAULT 0;
+    DECLARE chunk_count INT DEFAULT 1;
     
-    DELETE FROM videos
-    WHERE views = 0 
-    AND created_at < DATE_SUB(NOW(), INTERVAL days_old DAY);
+    WHILE chunk_count > 0 DO
+        DELETE FROM videos
+        WHERE views = 0 
+        AND created_at < cutoff
+        ORDER BY created_at
+        LIMIT 500;
+        SET chunk_count = ROW_COUNT();
+        SET deleted_count = deleted_count + chunk_count;
+    END WHILE;
     
     SELECT CONCAT('Deleted ', deleted_count, ' inactive videos') AS result;
 END//
 DELIMITER ;
 
+DELIMITER //
+DROP PROCEDURE IF EXISTS refresh_user_stats//
+CREATE PROCEDURE refresh_user_stats()
+BEGIN
+    -- Rebuild user_stats from scratch; one GROUP BY per table, no fan-out
+    INSERT INTO user_stats (user_id, total_videos, total_views, total_comments, total_replies)
+    SELECT 
+        u.user_id,
+        COALESCE(v.video_count, 0),
+        COALESCE(v.view_count, 0),
+        COALESCE(c.comment_count, 0),
+        COALESCE(r.reply_count, 0)
+    FROM users u
+    LEFT JOIN (SELECT user_id, COUNT(*) AS video_count, SUM(views) AS view_count
+               FROM videos GROUP BY user_id) v ON u.user_id = v.user_id
+    LEFT JOIN (SELECT user_id, COUNT(*) AS comment_count
+               FROM comments GROUP BY user_id) c ON u.user_id = c.user_id
+    LEFT JOIN (SELECT user_id, COUNT(*) AS reply_count
+               FROM replies GROUP BY user_id) r ON u.user_id = r.user_id
+    ON DUPLICATE KEY UPDATE
+        total_videos = VALUES(total_videos),
+        total_views = VALUES(total_views),
+        total_comments = VALUES(total_comments),
+        total_replies = VALUES(total_replies);
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS refresh_video_stats//
+CREATE PROCEDURE refresh_video_stats()
+BEGIN
+    -- Rebuild video_stats from scratch; one GROUP BY per table, no fan-out
+    INSERT INTO video_stats (video_id, comment_count, reply_count)
+    SELECT 
+        v.video_id,
+        COALESCE(c.comment_count, 0),
+        COALESCE(r.reply_count, 0)
+    FROM videos v
+    LEFT JOIN (SELECT video_id, COUNT(*) AS comment_count
+               FROM comments GROUP BY video_id) c ON v.video_id = c.video_id
+    LEFT JOIN (SELECT c.video_id, COUNT(*) AS reply_count
+               FROM replies r
+               JOIN comments c ON r.comment_id = c.comment_id
+               GROUP BY c.video_id) r ON v.video_id = r.video_id
+    ON DUPLICATE KEY UPDATE
+        comment_count = VALUES(comment_count),
+        reply_count = VALUES(reply_count);
+END//
+DELIMITER ;
+
 DELIMITER //
 DROP PROCEDURE IF EXISTS get_trending_videos//
 CREATE PROCEDURE get_trending_videos(IN days_param INT, IN limit_param INT)
@@ -206,9 +357,11 @@ CREATE TRIGGER after_video_insert
 AFTER INSERT ON videos
 FOR EACH ROW
 BEGIN
-    INSERT INTO activity_log (action_type, table_name, record_id, user_id, details)
-    VALUES ('INSERT', 'videos', NEW.video_id, NEW.user_id, 
-            CONCAT('Video uploaded: ', NEW.title));
+    UPDATE user_stats
+    SET total_videos = total_videos + 1, total_views = total_views + NEW.views
+    WHERE user_id = NEW.user_id;
+    
+    INSERT INTO video_stats (video_id) VALUES (NEW.video_id);
 END//
 DELIMITER ;
 
@@ -218,9 +371,25 @@ CREATE TRIGGER before_video_delete
 BEFORE DELETE ON videos
 FOR EACH ROW
 BEGIN
-    INSERT INTO activity_log (action_type, table_name, record_id, user_id, details)
-    VALUES ('DELETE', 'videos', OLD.video_id, OLD.user_id, 
-            CONCAT('Video deleted: ', OLD.title, ' (Views: ', OLD.views, ')'));
+    -- Cascaded comment/reply deletes do not fire triggers, so settle their authors here
+    UPDATE user_stats s
+    JOIN (SELECT r.user_id, COUNT(*) AS n
+          FROM replies r
+          JOIN comments c ON r.comment_id = c.comment_id
+          WHERE c.video_id = OLD.video_id
+          GROUP BY r.user_id) gone ON s.user_id = gone.user_id
+    SET s.total_replies = s.total_replies - gone.n;
+    
+    UPDATE user_stats s
+    JOIN (SELECT user_id, COUNT(*) AS n
+          FROM comments
+          WHERE video_id = OLD.video_id
+          GROUP BY user_id) gone ON s.user_id = gone.user_id
+    SET s.total_comments = s.total_comments - gone.n;
+    
+    UPDATE user_stats
+    SET total_videos = total_videos - 1, total_views = total_views - OLD.views
+    WHERE user_id = OLD.user_id;
 END//
 DELIMITER ;
 
@@ -230,9 +399,68 @@ CREATE TRIGGER after_comment_insert
 AFTER INSERT ON comments
 FOR EACH ROW
 BEGIN
-    INSERT INTO activity_log (action_type, table_name, record_id, user_id, details)
-    VALUES ('INSERT', 'comments', NEW.comment_id, NEW.user_id, 
-            CONCAT('Comment added on video_id: ', NEW.video_id));
+    UPDATE user_stats SET total_comments = total_comments + 1 WHERE user_id = NEW.user_id;
+    UPDATE video_stats SET comment_count = comment_count + 1 WHERE video_id = NEW.video_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS before_comment_delete//
+CREATE TRIGGER before_comment_delete
+BEFORE DELETE ON comments
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats s
+    JOIN (SELECT user_id, COUNT(*) AS n
+          FROM replies
+          WHERE comment_id = OLD.comment_id
+          GROUP BY user_id) gone ON s.user_id = gone.user_id
+    SET s.total_replies = s.total_replies - gone.n;
+    
+    UPDATE user_stats SET total_comments = total_comments - 1 WHERE user_id = OLD.user_id;
+    
+    UPDATE video_stats
+    SET comment_count = comment_count - 1,
+        reply_count = reply_count - (SELECT COUNT(*) FROM replies WHERE comment_id = OLD.comment_id)
+    WHERE video_id = OLD.video_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_reply_insert//
+CREATE TRIGGER after_reply_insert
+AFTER INSERT ON replies
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats SET total_replies = total_replies + 1 WHERE user_id = NEW.user_id;
+    UPDATE video_stats vs
+    JOIN comments c ON vs.video_id = c.video_id
+    SET vs.reply_count = vs.reply_count + 1
+    WHERE c.comment_id = NEW.comment_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_reply_delete//
+CREATE TRIGGER after_reply_delete
+AFTER DELETE ON replies
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats SET total_replies = total_replies - 1 WHERE user_id = OLD.user_id;
+    UPDATE video_stats vs
+    JOIN comments c ON vs.video_id = c.video_id
+    SET vs.reply_count = vs.reply_count - 1
+    WHERE c.comment_id = OLD.comment_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_user_insert//
+CREATE TRIGGER after_user_insert
+AFTER INSERT ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO user_stats (user_id) VALUES (NEW.user_id);
 END//
 DELIMITER ;
 
@@ -261,6 +489,20 @@ BEGIN
 END//
 DELIMITER ;
 
+DELIMITER //
+DROP TRIGGER IF EXISTS after_video_update//
+CREATE TRIGGER after_video_update
+AFTER UPDATE ON videos
+FOR EACH ROW
+BEGIN
+    IF NEW.views <> OLD.views THEN
+        UPDATE user_stats
+        SET total_views = total_views + (NEW.views - OLD.views)
+        WHERE user_id = NEW.user_id;
+    END IF;
+END//
+DELIMITER ;
+
 CREATE OR REPLACE VIEW popular_videos_view AS
 SELECT 
     v.video_id,
@@ -269,62 +511,39 @@ SELECT
     v.thumbnail_path,
     u.username AS uploader,
     v.views,
-    COUNT(DISTINCT c.comment_id) AS comment_count,
-    COUNT(DISTINCT r.reply_id) AS reply_count,
-    (v.views + COUNT(DISTINCT c.comment_id) * 5 + COUNT(DISTINCT r.reply_id) * 2) AS engagement_score,
+    vs.comment_count,
+    vs.reply_count,
+    (v.views + vs.comment_count * 5 + vs.reply_count * 2) AS engagement_score,
     v.created_at
 FROM videos v
 JOIN users u ON v.user_id = u.user_id
-LEFT JOIN comments c ON v.video_id = c.video_id
-LEFT JOIN replies r ON c.comment_id = r.comment_id
-GROUP BY v.video_id, v.title, v.description, v.thumbnail_path, u.username, v.views, v.created_at
+JOIN video_stats vs ON v.video_id = vs.video_id
 ORDER BY engagement_score DESC;
 
+-- Reads the materialized user_stats table; kept for ad-hoc queries and docs
 CREATE OR REPLACE VIEW user_leaderboard AS
 SELECT 
     u.user_id,
     u.username,
-    COUNT(DISTINCT v.video_id) AS total_videos,
-    COALESCE(SUM(v.views), 0) AS total_views,
-    COUNT(DISTINCT c.comment_id) AS total_comments,
-    COUNT(DISTINCT r.reply_id) AS total_replies,
-    get_user_engagement_score(u.user_id) AS engagement_score
-FROM users u
-LEFT JOIN videos v ON u.user_id = v.user_id
-LEFT JOIN comments c ON u.user_id = c.user_id
-LEFT JOIN replies r ON u.user_id = r.user_id
+    s.total_videos,
+    s.total_views,
+    s.total_comments,
+    s.total_replies,
+    s.engagement_score
+FROM user_stats s
+JOIN users u ON s.user_id = u.user_id
 WHERE u.is_admin = FALSE
-GROUP BY u.user_id, u.username
-ORDER BY engagement_score DESC;
+ORDER BY s.engagement_score DESC, s.user_id DESC;
 
 CREATE OR REPLACE VIEW recent_activity_feed AS
 SELECT 
-    'video' AS activity_type,
-    v.video_id AS item_id,
-    v.title AS content,
-    u.username,
-    v.created_at
-FROM videos v
-JOIN users u ON v.user_id = u.user_id
-UNION ALL
-SELECT 
-    'comment' AS activity_type,
-    c.comment_id AS item_id,
-    LEFT(c.content, 100) AS content,
-    u.username,
-    c.created_at
-FROM comments c
-JOIN users u ON c.user_id = u.user_id
-UNION ALL
-SELECT 
-    'reply' AS activity_type,
-    r.reply_id AS item_id,
-    LEFT(r.content, 100) AS content,
-    u.username,
-    r.created_at
-FROM replies r
-JOIN users u ON r.user_id = u.user_id
-ORDER BY created_at DESC
+    kind AS activity_type,
+    COALESCE(reply_id, comment_id, video_id) AS item_id,
+    COALESCE(summary, video_title) AS content,
+    username,
+    created_at
+FROM feed_items
+ORDER BY feed_item_id DESC
 LIMIT 50;
 
 GRANT EXECUTE ON FUNCTION youtube_app.get_user_video_count TO 'flaskuser'@'localhost';
@@ -334,8 +553,20 @@ GRANT EXECUTE ON PROCEDURE youtube_app.get_video_stats TO 'flaskuser'@'localhost
 GRANT EXECUTE ON PROCEDURE youtube_app.get_user_activity TO 'flaskuser'@'localhost';
 GRANT EXECUTE ON PROCEDURE youtube_app.get_trending_videos TO 'flaskuser'@'localhost';
 GRANT EXECUTE ON PROCEDURE youtube_app.cleanup_inactive_videos TO 'flaskuser'@'localhost';
-GRANT SELECT ON youtube_app.activity_log TO 'flaskuser'@'localhost';
+GRANT EXECUTE ON PROCEDURE youtube_app.refresh_user_stats TO 'flaskuser'@'localhost';
+GRANT EXECUTE ON PROCEDURE youtube_app.refresh_video_stats TO 'flaskuser'@'localhost';
+-- INSERT for the batched writer. Partition maintenance (`flask activity-log-maintain`)
+-- runs as its own account, so the web user can never alter or drop the audit table
+GRANT SELECT, INSERT ON youtube_app.activity_log TO 'flaskuser'@'localhost';
+CREATE USER IF NOT EXISTS 'flaskmaint'@'localhost' IDENTIFIED BY 'maintpass';
+GRANT SELECT, INSERT, CREATE, ALTER, DROP ON youtube_app.activity_log TO 'flaskmaint'@'localhost';
+GRANT SELECT ON youtube_app.user_stats TO 'flaskuser'@'localhost';
+GRANT SELECT ON youtube_app.video_stats TO 'flaskuser'@'localhost';
 GRANT SELECT ON youtube_app.popular_videos_view TO 'flaskuser'@'localhost';
 GRANT SELECT ON youtube_app.user_leaderboard TO 'flaskuser'@'localhost';
 GRANT SELECT ON youtube_app.recent_activity_feed TO 'flaskuser'@'localhost';
 FLUSH PRIVILEGES;
+
+-- Seed the counter tables for rows inserted before the triggers existed (the admin account)
+CALL refresh_user_stats();
+CALL refresh_video_stats();
@@ -0,0 +1,54 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it responses are only gzipped
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+}
+
+
+def choose_encoding(accept_encodings):
+    """Best content coding in a request's Accept-Encoding: 'br', 'gzip' or None"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+
+def compress(data, encoding, level=6):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)  # mtime=0 keeps the output deterministic
+
+
+def compress_response(response, accept_encodings, min_size=500, level=6):
+    """Compress a buffered text response in place when the client accepts it.
+
+    Streamed responses (comment event streams) and files sent straight
+    from disk are left alone, as are bodies under `min_size` bytes, which
+    gain little. A strong ETag is weakened, since the bytes now depend on
+    the coding; conditional requests still match it.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or response.status_code < 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings)
+    data = response.get_data()
+    if encoding is None or len(data) < min_size:
+        return response
+
+    response.set_data(compress(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -13,13 +13,109 @@ class Config:
     DB_USER = 'root'
     DB_PASSWORD = ''  # Change this to your MySQL password
     DB_NAME = 'youtube_app'
+    DB_POOL_SIZE = 10
+    DB_POOL_TIMEOUT = 5
+    DB_POOL_RECYCLE = 3600
+    DB_POOL_PING_INTERVAL = 30
+    DB_REPLICAS = []  # e.g. [{'host': 'replica1'}, {'host': '127.0.0.1', 'port': 3307}]
+    DB_MAINTENANCE_CONFIG = {'user': 'flaskmaint', 'password': 'maintpass'}  # for activity-log-maintain only
+    DB_REPLICA_MAX_LAG = 5
+    DB_REPLICA_RETRY_INTERVAL = 30
+    DB_REPLICA_CHECK_INTERVAL = 5
+    DB_STICKY_SECONDS = 10
+    DB_ASYNC = False  # asgi.py turns this on
+    DB_ASYNC_POOL_SIZE = 10
+    ASGI_THREADS = 32
+    
+    # JSON API / Response Settings
+    API_MAX_AGE = 0  # 0: clients revalidate every time (cheap with ETags)
+    COMPRESS_RESPONSES = True  # off if a proxy in front already compresses
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_LEVEL = 6
+    
+    # Profiling Settings
+    QUERY_PROFILING = True
+    SLOW_QUERY_SECONDS = 0.1
+    PROFILE_HEADERS = False  # always on when DEBUG is
+    PROFILE_LOG = True
+    METRICS_TOKEN = None  # None: /metrics only answers localhost; set a token to scrape from elsewhere
+    
+    # Login Settings
+    PASSWORD_HASH_METHOD = 'scrypt'  # e.g. 'scrypt:65536:8:1'; older hashes are upgraded at login
+    PASSWORD_HASH_WORKERS = 2  # 0 hashes on the request thread
+    PASSWORD_HASH_MAX_PENDING = 16
+    PASSWORD_HASH_TIMEOUT = 10
+    LOGIN_RATE_WINDOW = 300
+    LOGIN_MAX_ATTEMPTS_PER_IP = 30  # 0 turns the limit off (e.g. for load tests from one machine)
+    LOGIN_MAX_FAILURES_PER_USER = 10
+    TRUSTED_PROXIES = 0  # 1 behind a single nginx; client IPs then come from X-Forwarded-For
+    
+    # View Counter Settings
+    VIEW_FLUSH_INTERVAL = 5
+    VIEW_FLUSH_THRESHOLD = 1000
+    VIEW_MAX_PENDING = 100000
+    
+    # Cache Settings
+    CACHE_REDIS_URL = None  # e.g. 'redis://localhost:6379/0', or 'memory://' for a per-process stand-in
+    CACHE_LOCAL_SIZE = 1024
+    CACHE_TAG_TTL = 1
+    CACHE_LOCK_TIMEOUT = 5
+    FEED_CACHE_TTL = 30
+    LEADERBOARD_CACHE_TTL = 30
+    VIDEO_STATS_CACHE_TTL = 10
+    FRAGMENT_CACHE_TTL = 300
+    
+    # Bulk Moderation Settings
+    MODERATION_CHUNK_SIZE = 100
+    MODERATION_PAUSE = 0.2
+    MODERATION_JOB_HISTORY = 50
+    
+    # Mention Settings
+    MENTIONS_PER_PAGE = 30
+    USERNAME_CACHE_SIZE = 10000
+    USERNAME_CACHE_TTL = 600
+    
+    # Activity Feed Settings
+    FEED_PER_PAGE = 30
+    FEED_BUFFER_SIZE = 1000  # newest items kept in memory per process
+    FEED_SYNC_INTERVAL = 2
+    FEED_RESYNC_INTERVAL = 60
+    FEED_FANOUT_CHUNK = 1000
+    FEED_FANOUT_MAX_QUEUE = 10000
+    FEED_FOLLOW_BACKFILL = 50
+    
+    # Live Comment Settings
+    COMMENT_EVENTS_HISTORY = 50
+    COMMENT_EVENTS_QUEUE_SIZE = 100
+    COMMENT_EVENTS_MAX_SUBSCRIBERS = 10000
+    COMMENT_EVENTS_HEARTBEAT = 15
+    
+    # Trending Settings
+    TRENDING_WINDOW_DAYS = 30
+    TRENDING_TOP_N = 20
+    TRENDING_HALF_LIFE_HOURS = 24
+    TRENDING_REFRESH_INTERVAL = 60
+    TRENDING_RESYNC_INTERVAL = 600
+    
+    # Search Settings
+    SEARCH_RESULTS_PER_PAGE = 20
+    SEARCH_MAX_PAGE = 50
+    
+    # Activity Log Settings
+    ACTIVITY_LOG_PER_PAGE = 100
+    ACTIVITY_LOG_BATCH_SIZE = 500
+    ACTIVITY_LOG_FLUSH_INTERVAL = 2
+    ACTIVITY_LOG_MAX_QUEUE = 50000
+    ACTIVITY_LOG_RETENTION_MONTHS = 6
     
     # Upload Settings
     UPLOAD_FOLDER = 'static/uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    THUMBNAIL_WORKERS = 2
     
     # Application Settings
     SITE_NAME = 'VidStream'
     VIDEOS_PER_PAGE = 20
     COMMENTS_PER_PAGE = 50
+    REPLIES_PER_PAGE = 20
@@ -0,0 +1,74 @@
+"""Consistency checks for the denormalized counter tables.
+
+video_stats and user_stats are maintained by triggers. Anything that
+bypasses them (manual SQL, cascaded deletes from a user row, restores)
+can leave them out of step with the base tables; these helpers find
+and fix that drift.
+"""
+
+VIDEO_DRIFT_SQL = """
+    SELECT 
+        v.video_id,
+        vs.comment_count,
+        vs.reply_count,
+        COALESCE(c.comment_count, 0) AS actual_comments,
+        COALESCE(r.reply_count, 0) AS actual_replies
+    FROM videos v
+    LEFT JOIN video_stats vs ON v.video_id = vs.video_id
+    LEFT JOIN (SELECT video_id, COUNT(*) AS comment_count
+               FROM comments GROUP BY video_id) c ON v.video_id = c.video_id
+    LEFT JOIN (SELECT c.video_id, COUNT(*) AS reply_count
+               FROM replies r
+               JOIN comments c ON r.comment_id = c.comment_id
+               GROUP BY c.video_id) r ON v.video_id = r.video_id
+    WHERE vs.video_id IS NULL
+    OR vs.comment_count <> COALESCE(c.comment_count, 0)
+    OR vs.reply_count <> COALESCE(r.reply_count, 0)
+    LIMIT %s
+"""
+
+USER_DRIFT_SQL = """
+    SELECT 
+        u.user_id,
+        u.username,
+        s.total_videos,
+        s.total_views,
+        s.total_comments,
+        s.total_replies,
+        COALESCE(v.video_count, 0) AS actual_videos,
+        COALESCE(v.view_count, 0) AS actual_views,
+        COALESCE(c.comment_count, 0) AS actual_comments,
+        COALESCE(r.reply_count, 0) AS actual_replies
+    FROM users u
+    LEFT JOIN user_stats s ON u.user_id = s.user_id
+    LEFT JOIN (SELECT user_id, COUNT(*) AS video_count, SUM(views) AS view_count
+               FROM videos GROUP BY user_id) v ON u.user_id = v.user_id
+    LEFT JOIN (SELECT user_id, COUNT(*) AS comment_count
+               FROM comments GROUP BY user_id) c ON u.user_id = c.user_id
+    LEFT JOIN (SELECT user_id, COUNT(*) AS reply_count
+               FROM replies GROUP BY user_id) r ON u.user_id = r.user_id
+    WHERE s.user_id IS NULL
+    OR s.total_videos <> COALESCE(v.video_count, 0)
+    OR s.total_views <> COALESCE(v.view_count, 0)
+    OR s.total_comments <> COALESCE(c.comment_count, 0)
+    OR s.total_replies <> COALESCE(r.reply_count, 0)
+    LIMIT %s
+"""
+
+
+def find_drift(cursor, limit=100):
+    """Return up to `limit` drifted rows from each counter table"""
+    cursor.execute(VIDEO_DRIFT_SQL, (limit,))
+    videos = cursor.fetchall()
+    cursor.execute(USER_DRIFT_SQL, (limit,))
+    users = cursor.fetchall()
+    return {'videos': videos, 'users': users}
+
+
+def repair(conn):
+    """Rebuild both counter tables from the base tables in one transaction"""
+    cursor = conn.cursor()
+    cursor.callproc('refresh_video_stats')
+    cursor.callproc('refresh_user_stats')
+    conn.commit()
+    cursor.close()
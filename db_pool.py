@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+
+import pymysql
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class PooledConnection:
+    """Proxy around a pymysql connection checked out of a ConnectionPool.
+
+    Everything except close() is forwarded to the real connection. close()
+    is a no-op so the existing route code can keep calling it; the request
+    teardown hands the connection back with release().
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        """Keep the connection checked out until release() is called"""
+
+    def release(self):
+        """Return the connection to its pool (safe to call twice)"""
+        if not self._released:
+            self._released = True
+            self._pool._put(self._raw, self._created_at)
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of pymysql connections.
+
+    Connections are created lazily up to `size`. Callers that find the pool
+    exhausted wait up to `timeout` seconds. Idle connections are pinged
+    before reuse once they have sat unused for `ping_interval` seconds and
+    are replaced outright after `recycle` seconds so stale sockets never
+    reach a request.
+    """
+
+    def __init__(self, connect_kwargs, size=10, timeout=5.0, recycle=3600, ping_interval=30):
+        self.connect_kwargs = dict(connect_kwargs)
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (raw, created_at, last_used)
+        self._total = 0
+        self._in_use = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._recycled = 0
+
+    def _connect(self):
+        return pymysql.connect(cursorclass=pymysql.cursors.DictCursor, **self.connect_kwargs)
+
+    def acquire(self):
+        """Check out a healthy connection, blocking while the pool is exhausted"""
+        with self._lock:
+            if not self._idle and self._total >= self.size:
+                self._waits += 1
+                started = time.monotonic()
+                deadline = started + self.timeout
+                while not self._idle and self._total >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._wait_time += time.monotonic() - started
+                        raise PoolTimeout(f'No database connection available after {self.timeout}s')
+                    self._lock.wait(remaining)
+                self._wait_time += time.monotonic() - started
+
+            if self._idle:
+                raw, created_at, last_used = self._idle.pop()
+            else:
+                raw, created_at, last_used = None, None, None
+                self._total += 1
+            self._in_use += 1
+
+        try:
+            raw, created_at = self._checkout(raw, created_at, last_used)
+        except Exception:
+            with self._lock:
+                self._total -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+        return PooledConnection(self, raw, created_at)
+
+    def _checkout(self, raw, created_at, last_used):
+        """Open, recycle or health-check a connection outside the lock"""
+        now = time.monotonic()
+        if raw is not None and now - created_at > self.recycle:
+            self._discard(raw)
+            with self._lock:
+                self._recycled += 1
+            raw = None
+        elif raw is not None and now - last_used > self.ping_interval:
+            try:
+                raw.ping(reconnect=False)
+            except pymysql.Error:
+                self._discard(raw)
+                raw = None
+
+        if raw is None:
+            raw = self._connect()
+            created_at = time.monotonic()
+        return raw, created_at
+
+    def _put(self, raw, created_at):
+        healthy = True
+        try:
+            # Drop any transaction (and REPEATABLE READ snapshot) the request left open
+            raw.rollback()
+        except pymysql.Error:
+            healthy = False
+            self._discard(raw)
+
+        with self._lock:
+            self._in_use -= 1
+            if healthy and raw.open:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._total -= 1
+            self._lock.notify()
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except pymysql.Error:
+            pass
+
+    def stats(self):
+        """Snapshot of pool usage counters"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._total,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waits': self._waits,
+                'wait_time': round(self._wait_time, 6),
+                'timeouts': self._timeouts,
+                'recycled': self._recycled,
+            }
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+            self._total -= len(idle)
+        for raw, _, _ in idle:
+            self._discard(raw)
@@ -0,0 +1,172 @@
+import itertools
+import threading
+import time
+
+import pymysql
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class Replica:
+    """One read replica's pool and health state"""
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.down_until = 0.0
+        self.checked_at = 0.0
+        self.lag = None
+        self.check_lag = True
+        self.reads = 0
+        self.failures = 0
+        self.last_error = None
+
+
+class ReplicaRouter:
+    """Sends read-only work to healthy replicas, falling back to the primary.
+
+    acquire() has the same contract as ConnectionPool.acquire(), so the
+    router can stand in for a pool wherever only reads happen. Replicas
+    are tried round-robin. One that fails to connect, stops replicating or
+    lags more than `max_lag` seconds is skipped for `retry_interval`
+    seconds. Lag is read from SHOW REPLICA STATUS at most every
+    `check_interval` seconds per replica; without the REPLICATION CLIENT
+    privilege the check is skipped and only connection failures count.
+    """
+
+    def __init__(self, primary, replicas=(), max_lag=5, retry_interval=30, check_interval=5):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.retry_interval = retry_interval
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._order = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._fallbacks = 0
+
+    @classmethod
+    def from_config(cls, primary, replica_configs, base_config, pool_kwargs, **router_kwargs):
+        """Build one pool per replica; each config overrides `base_config` (host, port, ...)"""
+        replicas = []
+        for config in replica_configs:
+            connect_kwargs = dict(base_config, **config)
+            name = f"{connect_kwargs.get('host')}:{connect_kwargs.get('port', 3306)}"
+            replicas.append(Replica(name, ConnectionPool(connect_kwargs, **pool_kwargs)))
+        return cls(primary, replicas, **router_kwargs)
+
+    def _candidates(self):
+        if not self.replicas:
+            return []
+        with self._lock:
+            start = next(self._order)
+        now = time.monotonic()
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.down_until <= now]
+
+    def acquire(self):
+        """Check out a connection to a healthy replica, or to the primary if none is"""
+        for replica in self._candidates():
+            try:
+                conn = replica.pool.acquire()
+            except (pymysql.Error, PoolTimeout) as e:
+                self.mark_down(replica, e)
+                continue
+            if self._healthy(replica, conn):
+                with self._lock:
+                    replica.reads += 1
+                return conn
+            conn.release()
+
+        if self.replicas:
+            with self._lock:
+                self._fallbacks += 1
+        return self.primary.acquire()
+
+    def choose(self):
+        """The healthy replica the next read should go to, or None for the primary.
+
+        For callers with their own connections to each replica (the async
+        pools): health is judged as in acquire(), with the lag check run on
+        a connection from the replica's pool when it is due. Report
+        failures on those other connections with mark_down().
+        """
+        for replica in self._candidates():
+            if replica.check_lag and time.monotonic() - replica.checked_at >= self.check_interval:
+                try:
+                    conn = replica.pool.acquire()
+                except (pymysql.Error, PoolTimeout) as e:
+                    self.mark_down(replica, e)
+                    continue
+                try:
+                    healthy = self._healthy(replica, conn)
+                finally:
+                    conn.release()
+                if not healthy:
+                    continue
+            with self._lock:
+                replica.reads += 1
+            return replica
+
+        if self.replicas:
+            with self._lock:
+                self._fallbacks += 1
+        return None
+
+    def _healthy(self, replica, conn):
+        now = time.monotonic()
+        if not replica.check_lag or now - replica.checked_at < self.check_interval:
+            return True
+        replica.checked_at = now
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except pymysql.err.ProgrammingError:
+                cursor.execute("SHOW SLAVE STATUS")  # MySQL before 8.0.22
+            status = cursor.fetchone()
+            cursor.close()
+        except pymysql.err.OperationalError as e:
+            if e.args and e.args[0] == 1227:  # access denied: no REPLICATION CLIENT privilege
+                replica.check_lag = False
+                return True
+            self.mark_down(replica, e)
+            return False
+        except pymysql.Error as e:
+            self.mark_down(replica, e)
+            return False
+
+        if status is None:
+            # Not configured as a replica (e.g. a local stand-in); nothing to lag behind
+            replica.lag = None
+            return True
+        replica.lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        if replica.lag is None or replica.lag > self.max_lag:
+            self.mark_down(replica, f"replication lag {replica.lag}")
+            return False
+        return True
+
+    def mark_down(self, replica, error):
+        """Skip `replica` for retry_interval seconds"""
+        print(f"Replica {replica.name} unavailable: {error}")
+        with self._lock:
+            replica.down_until = time.monotonic() + self.retry_interval
+            replica.failures += 1
+            replica.last_error = str(error)
+
+    def stats(self):
+        """Per-replica health and usage counters"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'fallbacks_to_primary': self._fallbacks,
+                'replicas': [{
+                    'name': replica.name,
+                    'healthy': replica.down_until <= now,
+                    'lag': replica.lag,
+                    'reads': replica.reads,
+                    'failures': replica.failures,
+                    'last_error': replica.last_error,
+                    'pool': replica.pool.stats(),
+                } for replica in self.replicas],
+            }
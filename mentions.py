@@ -0,0 +1,75 @@
+import re
+
+from cache import MISSING, TTLCache
+
+
+MENTION = re.compile(r'@(\w+)')
+MAX_MENTIONS = 10  # per reply; more than this is spam, not conversation
+
+
+def extract_mentions(content, limit=MAX_MENTIONS):
+    """Distinct @usernames in `content`, in order of first appearance.
+
+    Usernames compare case-insensitively, like the users table's collation.
+    """
+    names = {}
+    for name in MENTION.findall(content or ''):
+        names.setdefault(name.lower(), name)
+        if len(names) >= limit:
+            break
+    return list(names.values())
+
+
+class UsernameCache:
+    """Resolves usernames to user ids with one query per batch of misses.
+
+    Hits, including usernames known not to exist, come from an in-process
+    TTL + LRU cache. Usernames never change once registered, so entries
+    only go stale when an account is created or deleted; register() calls
+    forget() for the new name and the TTL bounds the rest.
+    """
+
+    def __init__(self, maxsize=10000, ttl=600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def resolve(self, cursor, usernames):
+        """Map each lowercased username to (user_id, username), or None if unknown.
+
+        The result keeps the order of `usernames`, whichever tier each came from.
+        """
+        resolved = dict.fromkeys(name.lower() for name in usernames)
+        missing = []
+        for key in resolved:
+            found = self._cache.get(key)
+            if found is MISSING:
+                missing.append(key)
+            else:
+                resolved[key] = found
+
+        if missing:
+            placeholders = ', '.join(['%s'] * len(missing))
+            cursor.execute(f"SELECT user_id, username FROM users WHERE username IN ({placeholders})", missing)
+            for row in cursor.fetchall():
+                key = row['username'].lower()
+                if key in resolved:
+                    resolved[key] = (row['user_id'], row['username'])
+            for key in missing:
+                self._cache.set(key, resolved[key])
+        return resolved
+
+    def forget(self, username):
+        self._cache.delete(username.lower())
+
+    def stats(self):
+        return self._cache.stats()
+
+
+def record_mentions(cursor, reply_id, author_id, mentioned):
+    """Insert mentions rows for a new reply; `mentioned` is [(user_id, username)].
+
+    Authors mentioning themselves get no inbox entry.
+    """
+    rows = [(reply_id, user_id) for user_id, _ in mentioned if user_id != author_id]
+    if rows:
+        cursor.executemany("INSERT INTO mentions (reply_id, mentioned_user_id) VALUES (%s, %s)", rows)
+    return len(rows)
@@ -0,0 +1,9 @@
+-- Keyset pagination indexes for /video/<id> comment pages and
+-- /comment/<id>/replies. Safe to run once on an existing database:
+--   mysql -u root -p youtube_app < migrations/001_comment_thread_indexes.sql
+
+ALTER TABLE comments
+    ADD INDEX idx_comments_video_created (video_id, created_at, comment_id);
+
+ALTER TABLE replies
+    ADD INDEX idx_replies_comment_created (comment_id, created_at, reply_id);
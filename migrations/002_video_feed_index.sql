@@ -0,0 +1,5 @@
+-- Keyset pagination index for the homepage feed (ORDER BY created_at, video_id).
+--   mysql -u root -p youtube_app < migrations/002_video_feed_index.sql
+
+ALTER TABLE videos
+    ADD INDEX idx_videos_created (created_at, video_id);
@@ -0,0 +1,186 @@
+-- Materialized per-user stats backing /leaderboard (replaces the fan-out
+-- user_leaderboard view). Triggers keep it current; refresh_user_stats()
+-- rebuilds it from scratch.
+--   mysql -u root -p youtube_app < migrations/003_user_stats.sql
+
+CREATE TABLE user_stats (
+    user_id INT PRIMARY KEY,
+    total_videos INT NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_comments INT NOT NULL DEFAULT 0,
+    total_replies INT NOT NULL DEFAULT 0,
+    engagement_score INT AS (total_videos * 10 + total_comments * 2 + total_replies) STORED,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_user_stats_engagement (engagement_score, user_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS refresh_user_stats//
+CREATE PROCEDURE refresh_user_stats()
+BEGIN
+    -- Rebuild user_stats from scratch; one GROUP BY per table, no fan-out
+    INSERT INTO user_stats (user_id, total_videos, total_views, total_comments, total_replies)
+    SELECT 
+        u.user_id,
+        COALESCE(v.video_count, 0),
+        COALESCE(v.view_count, 0),
+        COALESCE(c.comment_count, 0),
+        COALESCE(r.reply_count, 0)
+    FROM users u
+    LEFT JOIN (SELECT user_id, COUNT(*) AS video_count, SUM(views) AS view_count
+               FROM videos GROUP BY user_id) v ON u.user_id = v.user_id
+    LEFT JOIN (SELECT user_id, COUNT(*) AS comment_count
+               FROM comments GROUP BY user_id) c ON u.user_id = c.user_id
+    LEFT JOIN (SELECT user_id, COUNT(*) AS reply_count
+               FROM replies GROUP BY user_id) r ON u.user_id = r.user_id
+    ON DUPLICATE KEY UPDATE
+        total_videos = VALUES(total_videos),
+        total_views = VALUES(total_views),
+        total_comments = VALUES(total_comments),
+        total_replies = VALUES(total_replies);
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_user_insert//
+CREATE TRIGGER after_user_insert
+AFTER INSERT ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO user_stats (user_id) VALUES (NEW.user_id);
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_video_insert//
+CREATE TRIGGER after_video_insert
+AFTER INSERT ON videos
+FOR EACH ROW
+BEGIN
+    INSERT INTO activity_log (action_type, table_name, record_id, user_id, details)
+    VALUES ('INSERT', 'videos', NEW.video_id, NEW.user_id, 
+            CONCAT('Video uploaded: ', NEW.title));
+    
+    UPDATE user_stats
+    SET total_videos = total_videos + 1, total_views = total_views + NEW.views
+    WHERE user_id = NEW.user_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_video_update//
+CREATE TRIGGER after_video_update
+AFTER UPDATE ON videos
+FOR EACH ROW
+BEGIN
+    IF NEW.views <> OLD.views THEN
+        UPDATE user_stats
+        SET total_views = total_views + (NEW.views - OLD.views)
+        WHERE user_id = NEW.user_id;
+    END IF;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS before_video_delete//
+CREATE TRIGGER before_video_delete
+BEFORE DELETE ON videos
+FOR EACH ROW
+BEGIN
+    INSERT INTO activity_log (action_type, table_name, record_id, user_id, details)
+    VALUES ('DELETE', 'videos', OLD.video_id, OLD.user_id, 
+            CONCAT('Video deleted: ', OLD.title, ' (Views: ', OLD.views, ')'));
+    
+    -- Cascaded comment/reply deletes do not fire triggers, so settle their authors here
+    UPDATE user_stats s
+    JOIN (SELECT r.user_id, COUNT(*) AS n
+          FROM replies r
+          JOIN comments c ON r.comment_id = c.comment_id
+          WHERE c.video_id = OLD.video_id
+          GROUP BY r.user_id) gone ON s.user_id = gone.user_id
+    SET s.total_replies = s.total_replies - gone.n;
+    
+    UPDATE user_stats s
+    JOIN (SELECT user_id, COUNT(*) AS n
+          FROM comments
+          WHERE video_id = OLD.video_id
+          GROUP BY user_id) gone ON s.user_id = gone.user_id
+    SET s.total_comments = s.total_comments - gone.n;
+    
+    UPDATE user_stats
+    SET total_videos = total_videos - 1, total_views = total_views - OLD.views
+    WHERE user_id = OLD.user_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_comment_insert//
+CREATE TRIGGER after_comment_insert
+AFTER INSERT ON comments
+FOR EACH ROW
+BEGIN
+    INSERT INTO activity_log (action_type, table_name, record_id, user_id, details)
+    VALUES ('INSERT', 'comments', NEW.comment_id, NEW.user_id, 
+            CONCAT('Comment added on video_id: ', NEW.video_id));
+    
+    UPDATE user_stats SET total_comments = total_comments + 1 WHERE user_id = NEW.user_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS before_comment_delete//
+CREATE TRIGGER before_comment_delete
+BEFORE DELETE ON comments
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats s
+    JOIN (SELECT user_id, COUNT(*) AS n
+          FROM replies
+          WHERE comment_id = OLD.comment_id
+          GROUP BY user_id) gone ON s.user_id = gone.user_id
+    SET s.total_replies = s.total_replies - gone.n;
+    
+    UPDATE user_stats SET total_comments = total_comments - 1 WHERE user_id = OLD.user_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_reply_insert//
+CREATE TRIGGER after_reply_insert
+AFTER INSERT ON replies
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats SET total_replies = total_replies + 1 WHERE user_id = NEW.user_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_reply_delete//
+CREATE TRIGGER after_reply_delete
+AFTER DELETE ON replies
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats SET total_replies = total_replies - 1 WHERE user_id = OLD.user_id;
+END//
+DELIMITER ;
+
+CREATE OR REPLACE VIEW user_leaderboard AS
+SELECT 
+    u.user_id,
+    u.username,
+    s.total_videos,
+    s.total_views,
+    s.total_comments,
+    s.total_replies,
+    s.engagement_score
+FROM user_stats s
+JOIN users u ON s.user_id = u.user_id
+WHERE u.is_admin = FALSE
+ORDER BY s.engagement_score DESC, s.user_id DESC;
+
+GRANT EXECUTE ON PROCEDURE youtube_app.refresh_user_stats TO 'flaskuser'@'localhost';
+GRANT SELECT ON youtube_app.user_stats TO 'flaskuser'@'localhost';
+FLUSH PRIVILEGES;
+
+CALL refresh_user_stats();
@@ -0,0 +1,182 @@
+-- Denormalized per-video comment/reply counters (video_stats) so
+-- /stats/video/<id> and /user/<username> are primary-key lookups.
+-- get_video_stats / get_user_activity now read the counter tables.
+-- Requires 003_user_stats.sql.
+--   mysql -u root -p youtube_app < migrations/004_video_stats.sql
+
+CREATE TABLE video_stats (
+    video_id INT PRIMARY KEY,
+    comment_count INT NOT NULL DEFAULT 0,
+    reply_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE
+);
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS refresh_video_stats//
+CREATE PROCEDURE refresh_video_stats()
+BEGIN
+    -- Rebuild video_stats from scratch; one GROUP BY per table, no fan-out
+    INSERT INTO video_stats (video_id, comment_count, reply_count)
+    SELECT 
+        v.video_id,
+        COALESCE(c.comment_count, 0),
+        COALESCE(r.reply_count, 0)
+    FROM videos v
+    LEFT JOIN (SELECT video_id, COUNT(*) AS comment_count
+               FROM comments GROUP BY video_id) c ON v.video_id = c.video_id
+    LEFT JOIN (SELECT c.video_id, COUNT(*) AS reply_count
+               FROM replies r
+               JOIN comments c ON r.comment_id = c.comment_id
+               GROUP BY c.video_id) r ON v.video_id = r.video_id
+    ON DUPLICATE KEY UPDATE
+        comment_count = VALUES(comment_count),
+        reply_count = VALUES(reply_count);
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS get_video_stats//
+CREATE PROCEDURE get_video_stats(IN video_id_param INT)
+BEGIN
+    SELECT 
+        v.video_id,
+        v.title,
+        v.views,
+        u.username AS uploaded_by,
+        COALESCE(vs.comment_count, 0) AS total_comments,
+        COALESCE(vs.reply_count, 0) AS total_replies,
+        v.created_at
+    FROM videos v
+    JOIN users u ON v.user_id = u.user_id
+    LEFT JOIN video_stats vs ON v.video_id = vs.video_id
+    WHERE v.video_id = video_id_param;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS get_user_activity//
+CREATE PROCEDURE get_user_activity(IN username_param VARCHAR(50))
+BEGIN
+    SELECT 
+        u.user_id,
+        u.username,
+        u.email,
+        u.is_admin,
+        u.created_at AS member_since,
+        COALESCE(s.total_videos, 0) AS total_videos,
+        COALESCE(s.total_views, 0) AS total_views,
+        COALESCE(s.total_comments, 0) AS total_comments,
+        COALESCE(s.total_replies, 0) AS total_replies,
+        COALESCE(s.engagement_score, 0) AS engagement_score
+    FROM users u
+    LEFT JOIN user_stats s ON u.user_id = s.user_id
+    WHERE u.username = username_param;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_video_insert//
+CREATE TRIGGER after_video_insert
+AFTER INSERT ON videos
+FOR EACH ROW
+BEGIN
+    INSERT INTO activity_log (action_type, table_name, record_id, user_id, details)
+    VALUES ('INSERT', 'videos', NEW.video_id, NEW.user_id, 
+            CONCAT('Video uploaded: ', NEW.title));
+    
+    UPDATE user_stats
+    SET total_videos = total_videos + 1, total_views = total_views + NEW.views
+    WHERE user_id = NEW.user_id;
+    
+    INSERT INTO video_stats (video_id) VALUES (NEW.video_id);
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_comment_insert//
+CREATE TRIGGER after_comment_insert
+AFTER INSERT ON comments
+FOR EACH ROW
+BEGIN
+    INSERT INTO activity_log (action_type, table_name, record_id, user_id, details)
+    VALUES ('INSERT', 'comments', NEW.comment_id, NEW.user_id, 
+            CONCAT('Comment added on video_id: ', NEW.video_id));
+    
+    UPDATE user_stats SET total_comments = total_comments + 1 WHERE user_id = NEW.user_id;
+    UPDATE video_stats SET comment_count = comment_count + 1 WHERE video_id = NEW.video_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS before_comment_delete//
+CREATE TRIGGER before_comment_delete
+BEFORE DELETE ON comments
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats s
+    JOIN (SELECT user_id, COUNT(*) AS n
+          FROM replies
+          WHERE comment_id = OLD.comment_id
+          GROUP BY user_id) gone ON s.user_id = gone.user_id
+    SET s.total_replies = s.total_replies - gone.n;
+    
+    UPDATE user_stats SET total_comments = total_comments - 1 WHERE user_id = OLD.user_id;
+    
+    UPDATE video_stats
+    SET comment_count = comment_count - 1,
+        reply_count = reply_count - (SELECT COUNT(*) FROM replies WHERE comment_id = OLD.comment_id)
+    WHERE video_id = OLD.video_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_reply_insert//
+CREATE TRIGGER after_reply_insert
+AFTER INSERT ON replies
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats SET total_replies = total_replies + 1 WHERE user_id = NEW.user_id;
+    UPDATE video_stats vs
+    JOIN comments c ON vs.video_id = c.video_id
+    SET vs.reply_count = vs.reply_count + 1
+    WHERE c.comment_id = NEW.comment_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_reply_delete//
+CREATE TRIGGER after_reply_delete
+AFTER DELETE ON replies
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats SET total_replies = total_replies - 1 WHERE user_id = OLD.user_id;
+    UPDATE video_stats vs
+    JOIN comments c ON vs.video_id = c.video_id
+    SET vs.reply_count = vs.reply_count - 1
+    WHERE c.comment_id = OLD.comment_id;
+END//
+DELIMITER ;
+
+CREATE OR REPLACE VIEW popular_videos_view AS
+SELECT 
+    v.video_id,
+    v.title,
+    v.description,
+    v.thumbnail_path,
+    u.username AS uploader,
+    v.views,
+    vs.comment_count,
+    vs.reply_count,
+    (v.views + vs.comment_count * 5 + vs.reply_count * 2) AS engagement_score,
+    v.created_at
+FROM videos v
+JOIN users u ON v.user_id = u.user_id
+JOIN video_stats vs ON v.video_id = vs.video_id
+ORDER BY engagement_score DESC;
+
+GRANT EXECUTE ON PROCEDURE youtube_app.refresh_video_stats TO 'flaskuser'@'localhost';
+GRANT SELECT ON youtube_app.video_stats TO 'flaskuser'@'localhost';
+FLUSH PRIVILEGES;
+
+CALL refresh_video_stats();
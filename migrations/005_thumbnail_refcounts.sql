@@ -0,0 +1,14 @@
+-- Reference counts for content-addressed thumbnails, so deleting one
+-- video never removes a file another video still uses.
+--   mysql -u root -p youtube_app < migrations/005_thumbnail_refcounts.sql
+
+CREATE TABLE thumbnails (
+    thumbnail_path VARCHAR(255) PRIMARY KEY,
+    refcount INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO thumbnails (thumbnail_path, refcount)
+SELECT thumbnail_path, COUNT(*)
+FROM videos
+GROUP BY thumbnail_path;
@@ -0,0 +1,79 @@
+-- Move activity logging out of the triggers into the app's batched writer
+-- (activity_events.py), and partition activity_log by month so retention
+-- drops whole partitions. Run `flask activity-log-maintain` afterwards to
+-- create the monthly partitions.
+--   mysql -u root -p youtube_app < migrations/006_activity_log_partitions.sql
+
+ALTER TABLE activity_log
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (log_id, created_at),
+    ADD INDEX idx_activity_created (created_at, log_id),
+    ADD INDEX idx_activity_action_created (action_type, created_at, log_id),
+    ADD INDEX idx_activity_table_created (table_name, created_at, log_id);
+
+ALTER TABLE activity_log
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+        PARTITION pmax VALUES LESS THAN MAXVALUE
+    );
+
+-- Same triggers, minus their activity_log INSERTs
+DELIMITER //
+DROP TRIGGER IF EXISTS after_video_insert//
+CREATE TRIGGER after_video_insert
+AFTER INSERT ON videos
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats
+    SET total_videos = total_videos + 1, total_views = total_views + NEW.views
+    WHERE user_id = NEW.user_id;
+    
+    INSERT INTO video_stats (video_id) VALUES (NEW.video_id);
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS before_video_delete//
+CREATE TRIGGER before_video_delete
+BEFORE DELETE ON videos
+FOR EACH ROW
+BEGIN
+    -- Cascaded comment/reply deletes do not fire triggers, so settle their authors here
+    UPDATE user_stats s
+    JOIN (SELECT r.user_id, COUNT(*) AS n
+          FROM replies r
+          JOIN comments c ON r.comment_id = c.comment_id
+          WHERE c.video_id = OLD.video_id
+          GROUP BY r.user_id) gone ON s.user_id = gone.user_id
+    SET s.total_replies = s.total_replies - gone.n;
+    
+    UPDATE user_stats s
+    JOIN (SELECT user_id, COUNT(*) AS n
+          FROM comments
+          WHERE video_id = OLD.video_id
+          GROUP BY user_id) gone ON s.user_id = gone.user_id
+    SET s.total_comments = s.total_comments - gone.n;
+    
+    UPDATE user_stats
+    SET total_videos = total_videos - 1, total_views = total_views - OLD.views
+    WHERE user_id = OLD.user_id;
+END//
+DELIMITER ;
+
+DELIMITER //
+DROP TRIGGER IF EXISTS after_comment_insert//
+CREATE TRIGGER after_comment_insert
+AFTER INSERT ON comments
+FOR EACH ROW
+BEGIN
+    UPDATE user_stats SET total_comments = total_comments + 1 WHERE user_id = NEW.user_id;
+    UPDATE video_stats SET comment_count = comment_count + 1 WHERE video_id = NEW.video_id;
+END//
+DELIMITER ;
+
+-- INSERT for the batched writer; `flask activity-log-maintain` connects as
+-- flaskmaint (DB_MAINTENANCE_CONFIG), the only account that may alter or drop the table
+GRANT SELECT, INSERT ON youtube_app.activity_log TO 'flaskuser'@'localhost';
+CREATE USER IF NOT EXISTS 'flaskmaint'@'localhost' IDENTIFIED BY 'maintpass';
+GRANT SELECT, INSERT, CREATE, ALTER, DROP ON youtube_app.activity_log TO 'flaskmaint'@'localhost';
+FLUSH PRIVILEGES;
@@ -0,0 +1,7 @@
+-- FULLTEXT indexes behind /search and /api/search. InnoDB keeps them in
+-- sync with every insert and delete; building them on a large table takes
+-- a while, so run this off-peak.
+--   mysql -u root -p youtube_app < migrations/007_fulltext_search.sql
+
+ALTER TABLE videos ADD FULLTEXT INDEX ft_videos_title_description (title, description);
+ALTER TABLE comments ADD FULLTEXT INDEX ft_comments_content (content);
@@ -0,0 +1,22 @@
+-- Mentions table behind the /mentions inbox: every @username in a reply
+-- gets a row, keyed for newest-first pages per mentioned user.
+-- Existing replies only recorded their first mention (replies.mentioned_user_id),
+-- so that is all the backfill can recover.
+--   mysql -u root -p youtube_app < migrations/008_mentions.sql
+
+CREATE TABLE mentions (
+    mention_id INT PRIMARY KEY AUTO_INCREMENT,
+    reply_id INT NOT NULL,
+    mentioned_user_id INT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_mentions_reply_user (reply_id, mentioned_user_id),
+    INDEX idx_mentions_user_created (mentioned_user_id, created_at, mention_id),
+    FOREIGN KEY (reply_id) REFERENCES replies(reply_id) ON DELETE CASCADE,
+    FOREIGN KEY (mentioned_user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+INSERT INTO mentions (reply_id, mentioned_user_id, created_at)
+SELECT reply_id, mentioned_user_id, created_at
+FROM replies
+WHERE mentioned_user_id IS NOT NULL AND mentioned_user_id <> user_id
+ORDER BY reply_id;
@@ -0,0 +1,30 @@
+-- cleanup_inactive_videos() deletes in chunks of 500 instead of one
+-- statement over every match, and drops its COUNT(*) pre-pass. Prefer
+-- `flask cleanup-inactive-videos`, which also removes unused thumbnails.
+--   mysql -u root -p youtube_app < migrations/009_chunked_cleanup.sql
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS cleanup_inactive_videos//
+CREATE PROCEDURE cleanup_inactive_videos(IN days_old INT)
+BEGIN
+    -- Delete in chunks of 500 so each statement holds few row locks and a
+    -- small undo log; ROW_COUNT() ends the loop, no separate COUNT(*) pass.
+    -- Thumbnail files and refcounts are not released here: prefer
+    -- `flask cleanup-inactive-videos`, which also reaps unused thumbnails.
+    DECLARE cutoff DATETIME DEFAULT DATE_SUB(NOW(), INTERVAL days_old DAY);
+    DECLARE deleted_count INT DEFAULT 0;
+    DECLARE chunk_count INT DEFAULT 1;
+    
+    WHILE chunk_count > 0 DO
+        DELETE FROM videos
+        WHERE views = 0 
+        AND created_at < cutoff
+        ORDER BY created_at
+        LIMIT 500;
+        SET chunk_count = ROW_COUNT();
+        SET deleted_count = deleted_count + chunk_count;
+    END WHILE;
+    
+    SELECT CONCAT('Deleted ', deleted_count, ' inactive videos') AS result;
+END//
+DELIMITER ;
@@ -0,0 +1,18 @@
+-- Indexes for the query shapes 001, 002 and 006 left uncovered, found with
+-- `python -m benchmarks.explain_queries` against a seeded database:
+--   idx_videos_user_created  /user/<name>: a user's videos, newest first, with no filesort
+--                            (also serves the user_id foreign key)
+--   idx_videos_thumbnail     thumbnail reaping: "is any video still using this file?"
+--                            without scanning videos
+--   idx_comments_created     /admin: comments newest first without a filesort
+-- Online DDL (ALGORITHM=INPLACE, LOCK=NONE) keeps the tables writable meanwhile.
+--   mysql -u root -p youtube_app < migrations/010_query_indexes.sql
+
+ALTER TABLE videos
+    ADD INDEX idx_videos_user_created (user_id, created_at, video_id),
+    ADD INDEX idx_videos_thumbnail (thumbnail_path),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE comments
+    ADD INDEX idx_comments_created (created_at, comment_id),
+    ALGORITHM=INPLACE, LOCK=NONE;
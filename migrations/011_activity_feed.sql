@@ -0,0 +1,76 @@
+-- Append-only activity feed (feed_items), follows and per-user fanned-out feeds
+-- (user_feed) behind /feed and /feed/following. Existing videos, comments and
+-- replies are copied into feed_items in time order; recent_activity_feed is
+-- redefined to read the newest 50 rows from it instead of sorting a UNION ALL
+-- of all three tables. Nobody follows anyone yet, so user_feed starts empty.
+--   mysql -u root -p youtube_app < migrations/011_activity_feed.sql
+
+CREATE TABLE feed_items (
+    feed_item_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    kind ENUM('video', 'comment', 'reply') NOT NULL,
+    user_id INT NOT NULL,
+    username VARCHAR(50) NOT NULL,
+    video_id INT NOT NULL,
+    video_title VARCHAR(200) NOT NULL,
+    comment_id INT NULL,
+    reply_id INT NULL,
+    summary VARCHAR(200) NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_feed_items_user (user_id, feed_item_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
+    FOREIGN KEY (comment_id) REFERENCES comments(comment_id) ON DELETE CASCADE,
+    FOREIGN KEY (reply_id) REFERENCES replies(reply_id) ON DELETE CASCADE
+);
+
+CREATE TABLE follows (
+    follower_id INT NOT NULL,
+    followee_id INT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (follower_id, followee_id),
+    INDEX idx_follows_followee (followee_id, follower_id),
+    FOREIGN KEY (follower_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (followee_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+CREATE TABLE user_feed (
+    user_id INT NOT NULL,
+    feed_item_id BIGINT NOT NULL,
+    PRIMARY KEY (user_id, feed_item_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (feed_item_id) REFERENCES feed_items(feed_item_id) ON DELETE CASCADE
+);
+
+INSERT INTO feed_items (kind, user_id, username, video_id, video_title, comment_id, reply_id, summary, created_at)
+SELECT kind, user_id, username, video_id, video_title, comment_id, reply_id, summary, created_at
+FROM (
+    SELECT 'video' AS kind, v.user_id, u.username, v.video_id, v.title AS video_title,
+           NULL AS comment_id, NULL AS reply_id, NULL AS summary, v.created_at, 0 AS position, v.video_id AS id
+    FROM videos v
+    JOIN users u ON v.user_id = u.user_id
+    UNION ALL
+    SELECT 'comment', c.user_id, u.username, c.video_id, v.title,
+           c.comment_id, NULL, LEFT(c.content, 200), c.created_at, 1, c.comment_id
+    FROM comments c
+    JOIN users u ON c.user_id = u.user_id
+    JOIN videos v ON c.video_id = v.video_id
+    UNION ALL
+    SELECT 'reply', r.user_id, u.username, c.video_id, v.title,
+           r.comment_id, r.reply_id, LEFT(r.content, 200), r.created_at, 2, r.reply_id
+    FROM replies r
+    JOIN users u ON r.user_id = u.user_id
+    JOIN comments c ON r.comment_id = c.comment_id
+    JOIN videos v ON c.video_id = v.video_id
+) existing
+ORDER BY created_at, position, id;
+
+CREATE OR REPLACE VIEW recent_activity_feed AS
+SELECT 
+    kind AS activity_type,
+    COALESCE(reply_id, comment_id, video_id) AS item_id,
+    COALESCE(summary, video_title) AS content,
+    username,
+    created_at
+FROM feed_items
+ORDER BY feed_item_id DESC
+LIMIT 50;
@@ -0,0 +1,296 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+
+from db_pool import PoolTimeout
+
+
+def chunked(ids, size):
+    """Split a list of ids into lists of at most `size`"""
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def delete_video_chunk(conn, video_ids):
+    """Delete videos in one transaction; returns (deleted rows, thumbnail paths to reap).
+
+    Thumbnail refcounts drop by the number of deleted videos using each
+    file. The files themselves are left for ThumbnailReaper, which only
+    runs after the commit.
+    """
+    placeholders = ', '.join(['%s'] * len(video_ids))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT video_id, title, views, user_id, thumbnail_path
+            FROM videos WHERE video_id IN ({placeholders}) FOR UPDATE
+        """, video_ids)
+        videos = cursor.fetchall()
+        if not videos:
+            conn.rollback()
+            return [], []
+        cursor.execute(f"DELETE FROM videos WHERE video_id IN ({placeholders})",
+                       [video['video_id'] for video in videos])
+
+        released = {}
+        for video in videos:
+            released[video['thumbnail_path']] = released.get(video['thumbnail_path'], 0) + 1
+        cursor.executemany("UPDATE thumbnails SET refcount = refcount - %s WHERE thumbnail_path = %s",
+                           [(count, path) for path, count in released.items()])
+        placeholders = ', '.join(['%s'] * len(released))
+        cursor.execute(f"SELECT thumbnail_path, refcount FROM thumbnails WHERE thumbnail_path IN ({placeholders})",
+                       list(released))
+        remaining = {row['thumbnail_path']: row['refcount'] for row in cursor.fetchall()}
+        # Untracked (pre-refcount) files are candidates too; the reaper checks videos for them
+        orphaned = [path for path in released if remaining.get(path, 0) <= 0]
+        if orphaned:
+            placeholders = ', '.join(['%s'] * len(orphaned))
+            cursor.execute(f"DELETE FROM thumbnails WHERE thumbnail_path IN ({placeholders})", orphaned)
+        conn.commit()
+        return videos, orphaned
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def delete_comment_chunk(conn, comment_ids):
+    """Delete comments (and their replies) in one transaction; returns the deleted rows"""
+    placeholders = ', '.join(['%s'] * len(comment_ids))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT comment_id, video_id, user_id
+            FROM comments WHERE comment_id IN ({placeholders}) FOR UPDATE
+        """, comment_ids)
+        comments = cursor.fetchall()
+        if comments:
+            cursor.execute(f"DELETE FROM comments WHERE comment_id IN ({placeholders})",
+                           [comment['comment_id'] for comment in comments])
+        conn.commit()
+        return comments
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+class ThumbnailReaper:
+    """Removes unreferenced thumbnail files on a worker thread, after the delete commits.
+
+    Before removing a file it locks the file's refcount row (or, if the
+    row is gone, the gap where it would be) so an upload of identical
+    content either finishes first and keeps the file, or waits until the
+    file is gone and writes a fresh copy.
+    """
+
+    def __init__(self, pool, thumbnail_processor):
+        self.pool = pool
+        self.thumbnail_processor = thumbnail_processor
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnail-reaper')
+        self._lock = threading.Lock()
+        self._removed = 0
+        self._kept = 0
+        self._failed = 0
+
+    def submit(self, paths):
+        for path in paths:
+            self._executor.submit(self._reap, path)
+
+    def _reap(self, path):
+        try:
+            conn = self.pool.acquire()
+        except (pymysql.Error, PoolTimeout) as e:
+            print(f"Error reaping thumbnail {path}: {e}")
+            with self._lock:
+                self._failed += 1
+            return
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT refcount FROM thumbnails WHERE thumbnail_path = %s FOR UPDATE", (path,))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("SELECT 1 FROM videos WHERE thumbnail_path = %s LIMIT 1", (path,))
+                in_use = cursor.fetchone() is not None
+            else:
+                in_use = row['refcount'] > 0
+            if not in_use:
+                self.thumbnail_processor.remove(path)
+            conn.commit()
+            with self._lock:
+                if in_use:
+                    self._kept += 1
+                else:
+                    self._removed += 1
+        except (pymysql.Error, OSError) as e:
+            conn.rollback()
+            print(f"Error reaping thumbnail {path}: {e}")
+            with self._lock:
+                self._failed += 1
+        finally:
+            cursor.close()
+            conn.release()
+
+    def wait(self):
+        """Block until every removal queued so far is done (for CLI commands about to exit)"""
+        # One worker runs tasks in order, so this no-op finishing means the rest have
+        self._executor.submit(lambda: None).result()
+
+    def stats(self):
+        with self._lock:
+            return {'removed': self._removed, 'kept_in_use': self._kept, 'failed': self._failed}
+
+
+class ModerationJob:
+    """Progress of one bulk delete"""
+
+    def __init__(self, job_id, kind, ids, requested_by):
+        self.job_id = job_id
+        self.kind = kind
+        self.ids = ids
+        self.requested_by = requested_by
+        self.state = 'queued'
+        self.processed = 0
+        self.deleted = 0
+        self.chunks = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'state': self.state,
+            'total': len(self.ids),
+            'processed': self.processed,
+            'deleted': self.deleted,
+            'chunks': self.chunks,
+            'error': self.error,
+            'requested_by': self.requested_by,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class BulkModerator:
+    """Runs bulk deletes of videos or comments in bounded, throttled chunks.
+
+    Every chunk of `chunk_size` ids is its own short transaction on a pool
+    connection that is handed back right after, and the runner sleeps
+    `pause` seconds between chunks so row locks, trigger work and undo
+    never pile up in front of live traffic. Jobs run one at a time on a
+    background thread (started lazily per process); run() does the same
+    work inline for CLI commands. `on_deleted(kind, rows)` is called after
+    each committed chunk, e.g. to invalidate caches.
+    """
+
+    KINDS = ('videos', 'comments')
+
+    def __init__(self, pool, reaper, chunk_size=100, pause=0.2, history=50, on_deleted=None):
+        self.pool = pool
+        self.reaper = reaper
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.history = history
+        self.on_deleted = on_deleted
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._jobs = OrderedDict()  # job_id -> ModerationJob, oldest first
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._pid = None
+
+    def submit(self, kind, ids, requested_by=None):
+        """Queue a bulk delete; returns the ModerationJob to poll"""
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown moderation kind: {kind}")
+        with self._lock:
+            job = ModerationJob(next(self._ids), kind, list(dict.fromkeys(ids)), requested_by)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.state in ('queued', 'running'):
+                    break
+                self._jobs.popitem(last=False)
+        self._ensure_started()
+        self._wakeup.set()
+        return job
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run_queue, name='bulk-moderator', daemon=True)
+            self._thread.start()
+
+    def _next_job(self):
+        with self._lock:
+            for job in self._jobs.values():
+                if job.state == 'queued':
+                    return job
+        return None
+
+    def _run_queue(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            job = self._next_job()
+            while job is not None:
+                self.run(job)
+                job = self._next_job()
+
+    def run(self, job, progress=None, chunk_size=None, pause=None):
+        """Process a job chunk by chunk in this thread; progress(job) after each chunk"""
+        delete_chunk = delete_video_chunk if job.kind == 'videos' else delete_comment_chunk
+        chunk_size = chunk_size or self.chunk_size
+        pause = self.pause if pause is None else pause
+        job.state = 'running'
+        try:
+            for chunk in chunked(job.ids, chunk_size):
+                if job.chunks:
+                    time.sleep(pause)
+                conn = self.pool.acquire()
+                try:
+                    if job.kind == 'videos':
+                        rows, orphaned = delete_chunk(conn, chunk)
+                        self.reaper.submit(orphaned)
+                    else:
+                        rows = delete_chunk(conn, chunk)
+                finally:
+                    conn.release()
+                job.processed += len(chunk)
+                job.deleted += len(rows)
+                job.chunks += 1
+                if rows and self.on_deleted:
+                    self.on_deleted(job.kind, rows)
+                if progress:
+                    progress(job)
+            job.state = 'done'
+        except (pymysql.Error, PoolTimeout) as e:
+            job.state = 'failed'
+            job.error = str(e)
+            print(f"Bulk delete job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Known jobs, newest first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
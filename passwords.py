@@ -0,0 +1,230 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from cache import SHARED_ERRORS, MemoryStore
+
+
+class HasherBusy(Exception):
+    """Raised when a password hash cannot be computed soon enough"""
+
+
+@lru_cache(maxsize=8)
+def method_params(method):
+    """The parameter prefix werkzeug writes for `method`, e.g. 'scrypt' -> 'scrypt:32768:8:1'"""
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def hash_password(password, method):
+    return generate_password_hash(password, method)
+
+
+def verify_password(password_hash, password, method):
+    """(matches, new hash or None); the new hash is made when the stored one used other parameters"""
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if password_hash.split('$', 1)[0] == method_params(method):
+        return True, None
+    return True, generate_password_hash(password, method)
+
+
+class PasswordHasher:
+    """Hashes and checks passwords in a small process pool, off the request threads.
+
+    Key derivation is deliberately expensive; done on the request thread,
+    a burst of logins (say, after a deploy resets sessions) holds every
+    worker thread for the length of a hash. Here at most `max_pending`
+    hashes are queued or running per process; beyond that, and when a
+    queued hash is not done within `timeout` seconds, callers get
+    HasherBusy and can tell the user to retry. With workers=0 hashes
+    run on the calling thread, still bounded by `max_pending`.
+
+    verify() hands back a fresh hash whenever the stored one was made
+    with a different method or cost than `method`, so raising the cost
+    reaches every account as its owner logs in.
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_pending=16, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+
+        self._hashed = 0
+        self._verified = 0
+        self._failed = 0
+        self._rehashed = 0
+        self._busy = 0
+
+    def _pool(self):
+        # Created on first use in each process, so every forked app worker gets its own.
+        # Never forked from the app process itself: by then its background threads
+        # run, and a child that inherits a lock one of them holds can hang. The
+        # forkserver is a fresh, single-threaded process that has only imported
+        # this module and the main module (app.py starts its threads on first use,
+        # not on import); hashing processes are forked from it.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                context = None
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload(['__main__', __name__])
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._busy += 1
+            raise HasherBusy('too many password hashes in progress')
+        with self._lock:
+            self._pending += 1
+        if not self.workers:
+            try:
+                return function(*args)
+            finally:
+                self._release()
+        try:
+            future = self._pool().submit(function, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)  # a timed-out hash keeps its slot until it finishes
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._busy += 1
+            raise HasherBusy(f'password hash not done within {self.timeout}s')
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None  # a worker died; start a fresh pool next time
+            raise HasherBusy('password hashing pool failed')
+
+    def hash(self, password):
+        """A new hash of `password` with the configured method"""
+        password_hash = self._run(hash_password, password, self.method)
+        with self._lock:
+            self._hashed += 1
+        return password_hash
+
+    def verify(self, password_hash, password):
+        """(matches, upgraded hash or None) for a stored hash"""
+        matches, new_hash = self._run(verify_password, password_hash, password, self.method)
+        with self._lock:
+            self._verified += 1
+            if not matches:
+                self._failed += 1
+            if new_hash:
+                self._rehashed += 1
+        return matches, new_hash
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Snapshot of hashing counters"""
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'pending': self._pending,
+                'hashed': self._hashed,
+                'verified': self._verified,
+                'failed': self._failed,
+                'rehashed': self._rehashed,
+                'busy': self._busy,
+            }
+
+
+class LoginRateLimiter:
+    """Fixed-window limits on login attempts per client IP and failures per username.
+
+    Counters live in the shared cache store when one is configured, so
+    the limits hold across workers; otherwise in an in-process
+    MemoryStore, where each worker counts on its own. A store outage
+    lets logins through rather than locking everyone out. A limit of 0
+    turns that limit off.
+    """
+
+    def __init__(self, store=None, max_per_ip=30, max_failures_per_user=10, window=300, prefix='vidstream:login:'):
+        self.store = store if store is not None else MemoryStore()
+        self.max_per_ip = max_per_ip
+        self.max_failures_per_user = max_failures_per_user
+        self.window = window
+        self.prefix = prefix
+
+        self._lock = threading.Lock()
+        self._blocked = 0
+        self._errors = 0
+
+    def _keys(self, ip, username):
+        window = int(time.time() // self.window)
+        return (f"{self.prefix}ip:{ip}:{window}",
+                f"{self.prefix}user:{(username or '').lower()}:{window}")
+
+    def _error(self, e):
+        print(f"Login rate limit store error: {e}")
+        with self._lock:
+            self._errors += 1
+
+    def retry_after(self, ip, username):
+        """Seconds until this IP or username may try again; 0 if it may now"""
+        ip_key, user_key = self._keys(ip, username)
+        try:
+            ip_count, user_count = self.store.get_many([ip_key, user_key])
+        except SHARED_ERRORS as e:
+            self._error(e)
+            return 0
+        ip_ok = not self.max_per_ip or int(ip_count or 0) < self.max_per_ip
+        user_ok = not self.max_failures_per_user or int(user_count or 0) < self.max_failures_per_user
+        if ip_ok and user_ok:
+            return 0
+        with self._lock:
+            self._blocked += 1
+        return max(int(self.window - time.time() % self.window), 1)
+
+    def attempted(self, ip):
+        """Count one login attempt from `ip`"""
+        try:
+            self.store.incr(self._keys(ip, None)[0], self.window)
+        except SHARED_ERRORS as e:
+            self._error(e)
+
+    def failed(self, username):
+        """Count one wrong password for `username`"""
+        try:
+            self.store.incr(self._keys(None, username)[1], self.window)
+        except SHARED_ERRORS as e:
+            self._error(e)
+
+    def succeeded(self, username):
+        """Forget `username`'s failures after a correct password"""
+        try:
+            self.store.delete(self._keys(None, username)[1])
+        except SHARED_ERRORS as e:
+            self._error(e)
+
+    def stats(self):
+        with self._lock:
+            return {'blocked': self._blocked, 'store_errors': self._errors}
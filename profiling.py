@@ -0,0 +1,278 @@
+import json
+import logging
+import threading
+import time
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+
+class RequestProfile:
+    """Database and template timings collected while serving one request"""
+
+    def __init__(self, slow_query_seconds=0.1):
+        self.slow_query_seconds = slow_query_seconds
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.acquire_time = 0.0
+        self.template_time = 0.0
+        self.slowest_sql = None
+        self.slowest_time = 0.0
+        self.slow_queries = []  # (sql, seconds) over slow_query_seconds
+        self._templates = []
+
+    def record(self, sql, elapsed):
+        """Count one statement that took `elapsed` seconds"""
+        self.queries += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_sql, self.slowest_time = sql, elapsed
+        if elapsed >= self.slow_query_seconds:
+            self.slow_queries.append((sql, elapsed))
+
+    def template_started(self):
+        self._templates.append(time.perf_counter())
+
+    def template_finished(self):
+        if self._templates:
+            started = self._templates.pop()
+            if not self._templates:  # a template rendered inside another is already counted
+                self.template_time += time.perf_counter() - started
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value for a Server-Timing header (shown in the browser's network panel)"""
+        return (f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+                f'acquire;dur={self.acquire_time * 1000:.2f}, '
+                f'render;dur={self.template_time * 1000:.2f}, '
+                f'total;dur={self.elapsed() * 1000:.2f}')
+
+    def to_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'acquire_ms': round(self.acquire_time * 1000, 2),
+            'render_ms': round(self.template_time * 1000, 2),
+            'slowest_ms': round(self.slowest_time * 1000, 2),
+            'slowest_sql': one_line(self.slowest_sql),
+            'slow_queries': len(self.slow_queries),
+        }
+
+
+def one_line(sql, limit=300):
+    """Collapse a statement's whitespace for headers and log lines"""
+    if sql is None:
+        return None
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= limit else sql[:limit] + '...'
+
+
+class ProfiledCursor:
+    """Cursor proxy that times every statement into a RequestProfile"""
+
+    def __init__(self, cursor, profile):
+        self._cursor = cursor
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def _timed(self, method, sql, *args):
+        started = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self._profile.record(sql, time.perf_counter() - started)
+
+    def execute(self, sql, args=None):
+        return self._timed(self._cursor.execute, sql, args)
+
+    def executemany(self, sql, args):
+        return self._timed(self._cursor.executemany, sql, args)
+
+    def callproc(self, name, args=()):
+        return self._timed(self._cursor.callproc, name, args)
+
+
+class ProfiledConnection:
+    """Connection proxy whose cursors report to a RequestProfile.
+
+    Everything else (commit, close, release, ...) goes to the wrapped
+    pooled connection.
+    """
+
+    def __init__(self, conn, profile):
+        self._conn = conn
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args):
+        return ProfiledCursor(self._conn.cursor(*args), self._profile)
+
+
+def acquire_profiled(pool, profile):
+    """pool.acquire(), timed and wrapped so `profile` sees the connection's queries"""
+    if profile is None:
+        return pool.acquire()
+    started = time.perf_counter()
+    try:
+        conn = pool.acquire()
+    finally:
+        profile.acquire_time += time.perf_counter() - started
+    return ProfiledConnection(conn, profile)
+
+
+def structured_logger(name):
+    """Logger for log_json(): one JSON object per line on stderr, unless logging is configured"""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def log_json(logger, level, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps(fields, default=str))
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Prometheus-style histogram keyed by label values (not thread-safe on its own)"""
+
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count], sum
+
+    def observe(self, values, amount):
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if amount <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        series[1] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                bucket = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labels, values, bucket)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, values)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labels, values)} {cumulative}')
+        return lines
+
+
+class Counter:
+    """Prometheus-style counter keyed by label values (not thread-safe on its own)"""
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, values, amount=1):
+        self._series[values] = self._series.get(values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for values, total in sorted(self._series.items()):
+            lines.append(f'{self.name}{_labels(self.labels, values)} {_number(total)}')
+        return lines
+
+
+class RequestMetrics:
+    """Per-route request latency, database time and query count histograms.
+
+    observe() takes the route pattern (e.g. /video/<int:video_id>), never
+    the raw path, so the number of series stays bounded. render() returns
+    the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix='vidstream', buckets=LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        route = ('route', 'method')
+        self.requests = Counter(f'{prefix}_requests_total', 'Requests served.', route + ('status',))
+        self.duration = Histogram(f'{prefix}_request_duration_seconds', 'Request latency.', route, buckets)
+        self.db_time = Histogram(f'{prefix}_request_db_seconds', 'Time spent in database statements per request.',
+                                 route, buckets)
+        self.queries = Histogram(f'{prefix}_request_queries', 'Database statements issued per request.',
+                                 route, QUERY_COUNT_BUCKETS)
+        self.acquire_time = Counter(f'{prefix}_db_acquire_seconds_total',
+                                    'Time spent waiting for pooled connections.', route)
+        self.template_time = Counter(f'{prefix}_template_render_seconds_total', 'Time spent rendering templates.',
+                                     route)
+        self.slow_queries = Counter(f'{prefix}_slow_queries_total', 'Statements slower than SLOW_QUERY_SECONDS.',
+                                    route)
+
+    def observe(self, route, method, status, elapsed, profile=None):
+        values = (route, method)
+        with self._lock:
+            self.requests.inc(values + (str(status),))
+            self.duration.observe(values, elapsed)
+            if profile is not None:
+                self.db_time.observe(values, profile.db_time)
+                self.queries.observe(values, profile.queries)
+                self.acquire_time.inc(values, profile.acquire_time)
+                self.template_time.inc(values, profile.template_time)
+                if profile.slow_queries:
+                    self.slow_queries.inc(values, len(profile.slow_queries))
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.duration, self.db_time, self.queries,
+                           self.acquire_time, self.template_time, self.slow_queries):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def gauge(name, help, samples):
+    """Exposition lines for a gauge; `samples` is [(labels dict, value)]"""
+    lines = [f'# HELP {name} {help}', f'# TYPE {name} gauge']
+    for labels, value in samples:
+        lines.append(f'{name}{_labels(list(labels), list(labels.values()))} {_number(value)}')
+    return '\n'.join(lines) + '\n'
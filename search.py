@@ -0,0 +1,98 @@
+import re
+
+
+MIN_TERM_LENGTH = 3  # InnoDB's default innodb_ft_min_token_size; shorter terms are never indexed
+MAX_TERMS = 8
+
+# Characters with a meaning in BOOLEAN MODE are stripped by the tokenizer below
+TERM = re.compile(r'\w+', re.UNICODE)
+
+# InnoDB's default stopwords of indexable length; as required terms they would match nothing
+STOPWORDS = {
+    'about', 'are', 'com', 'for', 'from', 'how', 'that', 'the', 'this',
+    'und', 'was', 'what', 'when', 'where', 'who', 'will', 'with', 'www',
+}
+
+# Ranking subqueries touch only the table with the FULLTEXT index and order
+# by the bare MATCH() score, so InnoDB can stop after LIMIT + OFFSET hits;
+# the joins for display columns then run on one page of ids.
+SQL_VIDEOS = """
+    SELECT v.video_id, v.title, v.thumbnail_path, v.views, v.created_at, u.username, hit.score
+    FROM (
+        SELECT video_id, MATCH(title, description) AGAINST (%s IN BOOLEAN MODE) AS score
+        FROM videos
+        WHERE MATCH(title, description) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY MATCH(title, description) AGAINST (%s IN BOOLEAN MODE) DESC
+        LIMIT %s OFFSET %s
+    ) hit
+    JOIN videos v ON v.video_id = hit.video_id
+    JOIN users u ON v.user_id = u.user_id
+    ORDER BY hit.score DESC, v.video_id DESC
+"""
+
+SQL_COMMENTS = """
+    SELECT c.comment_id, c.video_id, c.content, c.created_at, u.username, v.title AS video_title, hit.score
+    FROM (
+        SELECT comment_id, MATCH(content) AGAINST (%s IN BOOLEAN MODE) AS score
+        FROM comments
+        WHERE MATCH(content) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY MATCH(content) AGAINST (%s IN BOOLEAN MODE) DESC
+        LIMIT %s OFFSET %s
+    ) hit
+    JOIN comments c ON c.comment_id = hit.comment_id
+    JOIN users u ON c.user_id = u.user_id
+    JOIN videos v ON c.video_id = v.video_id
+    ORDER BY hit.score DESC, c.comment_id DESC
+"""
+
+SEARCH_TABLES = ('videos', 'comments')
+
+
+def boolean_query(text):
+    """Turn free text into a BOOLEAN MODE query, or None if nothing is searchable.
+
+    Every term is required and prefix-matched, so "funn cat" finds
+    "Funny cats". Stopwords and terms shorter than MIN_TERM_LENGTH are
+    dropped because the index never contains them.
+    """
+    terms = [term for term in TERM.findall((text or '').lower())
+             if len(term) >= MIN_TERM_LENGTH and term not in STOPWORDS]
+    if not terms:
+        return None
+    return ' '.join(f"+{term}*" for term in dict.fromkeys(terms[:MAX_TERMS]))
+
+
+def _search(cursor, sql, query, page, per_page):
+    against = boolean_query(query)
+    if against is None:
+        return [], False
+    offset = (page - 1) * per_page
+    cursor.execute(sql, (against, against, against, per_page + 1, offset))
+    rows = cursor.fetchall()
+    return rows[:per_page], len(rows) > per_page
+
+
+def search_videos(cursor, query, page=1, per_page=20):
+    """Rank videos by title/description relevance; returns (videos, has_more)"""
+    return _search(cursor, SQL_VIDEOS, query, page, per_page)
+
+
+def search_comments(cursor, query, page=1, per_page=20):
+    """Rank comments by content relevance; returns (comments, has_more)"""
+    return _search(cursor, SQL_COMMENTS, query, page, per_page)
+
+
+def rebuild(conn):
+    """Rebuild the searchable tables and their FULLTEXT indexes.
+
+    InnoDB keeps the indexes in sync on every insert and delete but only
+    marks deleted documents; OPTIMIZE TABLE purges them and compacts the
+    index after heavy deletes or a change to the token-size settings.
+    """
+    cursor = conn.cursor()
+    results = []
+    for table in SEARCH_TABLES:
+        cursor.execute(f"OPTIMIZE TABLE {table}")
+        results.extend(cursor.fetchall())
+    cursor.close()
+    return results
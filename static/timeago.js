@@ -0,0 +1,40 @@
+// Relative timestamps for <time class="timeago" datetime="..."> elements.
+// Same wording as the server-side timeago filter in app.py; rendering it here
+// keeps cached HTML fragments free of "N minutes ago" text that goes stale.
+(function () {
+    // [upper bound in seconds, unit size in seconds, unit name]
+    const units = [
+        [3600, 60, 'minute'],
+        [86400, 3600, 'hour'],
+        [604800, 86400, 'day'],
+        [2592000, 604800, 'week'],
+    ];
+
+    function format(date, now) {
+        const seconds = (now - date) / 1000;
+        if (seconds < 60) {
+            return 'just now';
+        }
+        for (const [limit, size, name] of units) {
+            if (seconds < limit) {
+                const count = Math.floor(seconds / size);
+                return `${count} ${name}${count > 1 ? 's' : ''} ago`;
+            }
+        }
+        return date.toLocaleDateString('en-US', { year: 'numeric', month: 'long', day: '2-digit' });
+    }
+
+    function render(root) {
+        const now = Date.now();
+        (root || document).querySelectorAll('time.timeago').forEach(element => {
+            const date = new Date(element.getAttribute('datetime'));
+            if (!isNaN(date)) {
+                element.textContent = format(date, now);
+            }
+        });
+    }
+
+    window.timeago = { format, render };
+    document.addEventListener('DOMContentLoaded', () => render());
+    setInterval(() => render(), 60000);
+})();
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pymysql
+
+# The app's modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, args=None):
+        self.conn.executed.append(sql)
+        if self.conn.error is not None:
+            raise self.conn.error
+
+    def fetchone(self):
+        return self.conn.status
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Stands in for a pooled connection; `status` is what SHOW REPLICA STATUS returns"""
+
+    def __init__(self, pool, status=None, error=None):
+        self.pool = pool
+        self.status = status
+        self.error = error
+        self.executed = []
+        self.released = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def release(self):
+        self.released = True
+
+
+class FakePool:
+    """ConnectionPool stand-in that hands out FakeConnections, or fails to connect while `down`"""
+
+    def __init__(self, name, status=None, error=None):
+        self.name = name
+        self.status = status
+        self.error = error
+        self.down = False
+        self.acquired = 0
+
+    def acquire(self):
+        if self.down:
+            raise pymysql.err.OperationalError(2003, f"Can't connect to MySQL server on '{self.name}'")
+        self.acquired += 1
+        return FakeConnection(self, self.status, self.error)
+
+    def stats(self):
+        return {'acquired': self.acquired}
@@ -0,0 +1,83 @@
+import threading
+import time
+from datetime import datetime
+
+from activity_feed import ActivityFeed
+
+
+def feed_item(feed_item_id):
+    return {'feed_item_id': feed_item_id, 'kind': 'video', 'user_id': 1, 'username': 'alice',
+            'video_id': feed_item_id, 'video_title': f'Video {feed_item_id}', 'comment_id': None,
+            'reply_id': None, 'summary': None, 'created_at': datetime(2026, 1, 1)}
+
+
+class GatedFeedPool:
+    """Read pool whose feed_items queries return `rows`, but only while `gate` is open"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.gate = threading.Event()
+
+    def acquire(self):
+        return self
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        self.gate.wait(5)
+
+    def fetchall(self):
+        return [dict(row) for row in self.rows]
+
+    def close(self):
+        pass
+
+    def release(self):
+        pass
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def ids(page):
+    return [item['feed_item_id'] for item in page[0]]
+
+
+def test_first_page_does_not_wait_for_the_initial_load():
+    pool = GatedFeedPool([feed_item(n) for n in (3, 2, 1)])
+    feed = ActivityFeed(pool, None)
+
+    began = time.monotonic()
+    assert feed.recent(limit=2) is None  # not loaded yet: the caller reads the table
+    assert time.monotonic() - began < 0.5
+
+    pool.gate.set()
+    assert wait_for(lambda: feed.stats()['syncs'] == 1)
+    page = feed.recent(limit=2)
+    assert ids(page) == [3, 2] and page[1] == '2'
+
+
+def test_due_sync_runs_in_the_background():
+    pool = GatedFeedPool([feed_item(n) for n in (2, 1)])
+    pool.gate.set()
+    feed = ActivityFeed(pool, None, sync_interval=0)
+    feed.recent()
+    assert wait_for(lambda: feed.stats()['syncs'] == 1)
+
+    pool.gate.clear()
+    pool.rows = [feed_item(3)]
+    began = time.monotonic()
+    page = feed.recent()
+    assert time.monotonic() - began < 0.5
+    assert ids(page) == [2, 1]  # served as it is while the sync runs
+
+    pool.gate.set()
+    assert wait_for(lambda: feed.stats()['syncs'] == 2)
+    assert ids(feed.recent()) == [3, 2, 1]
@@ -0,0 +1,143 @@
+from datetime import datetime
+
+import pytest
+
+from cache import TieredCache
+
+
+class FakeViewCounter:
+    def __init__(self):
+        self.views = {}
+
+    def increment(self, video_id):
+        self.views[video_id] = self.views.get(video_id, 0) + 1
+
+    def pending(self, video_id):
+        return self.views.get(video_id, 0)
+
+
+class FakeTrending:
+    def __init__(self, videos=(), loaded=True):
+        self.videos = list(videos)
+        self.loaded = loaded
+
+    def top(self):
+        return self.videos
+
+    def record_view(self, video_id):
+        pass
+
+
+def video_row():
+    return {
+        'video_id': 7, 'title': 'Cats', 'description': 'More cats', 'thumbnail_path': 'cats.jpg',
+        'views': 10, 'created_at': datetime(2026, 1, 2, 3, 4, 5), 'username': 'alice',
+        'comment_count': 2, 'reply_count': 1, 'stats_updated_at': datetime(2026, 1, 3),
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import app as vidstream
+
+    monkeypatch.setattr(vidstream, 'read_cache', TieredCache())
+    monkeypatch.setattr(vidstream, 'view_counter', FakeViewCounter())
+    monkeypatch.setattr(vidstream, 'trending_engine', FakeTrending())
+    monkeypatch.setattr(vidstream, 'run_reads', lambda *queries: [video_row() for _ in queries])
+    vidstream.app.config['TESTING'] = True
+    return vidstream, vidstream.app.test_client()
+
+
+def test_video_detail_revalidates_while_views_climb(client):
+    vidstream, http = client
+
+    first = http.get('/api/v1/videos/7')
+    assert first.status_code == 200
+    assert first.json['views'] == 11
+
+    again = http.get('/api/v1/videos/7', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert vidstream.view_counter.views[7] == 2  # a revalidation is still a view
+
+
+def test_video_detail_etag_changes_with_other_fields(client, monkeypatch):
+    vidstream, http = client
+    etag = http.get('/api/v1/videos/7').headers['ETag']
+
+    monkeypatch.setattr(vidstream, 'run_reads', lambda *queries: [dict(video_row(), comment_count=3)])
+    changed = http.get('/api/v1/videos/7', headers={'If-None-Match': etag})
+
+    assert changed.status_code == 200
+    assert changed.json['comment_count'] == 3
+
+
+def test_trending_is_unavailable_until_loaded(client, monkeypatch):
+    vidstream, http = client
+    monkeypatch.setattr(vidstream, 'trending_engine', FakeTrending(loaded=False))
+
+    response = http.get('/api/v1/trending')
+
+    assert response.status_code == 503
+    assert 'ETag' not in response.headers
+
+
+def test_trending_lists_loaded_videos(client, monkeypatch):
+    vidstream, http = client
+    monkeypatch.setattr(vidstream, 'trending_engine', FakeTrending([video_row()]))
+
+    response = http.get('/api/v1/trending')
+
+    assert response.status_code == 200
+    assert [video['video_id'] for video in response.json['videos']] == [7]
+
+
+def test_leaderboard_page_and_api_share_rows(client, monkeypatch):
+    vidstream, http = client
+    loads = []
+
+    def load_rows():
+        loads.append(1)
+        return [{'user_id': 1, 'username': 'alice', 'total_videos': 3, 'total_views': 40,
+                 'total_comments': 5, 'total_replies': 2, 'engagement_score': 60}]
+
+    monkeypatch.setattr(vidstream, 'load_leaderboard_rows', load_rows)
+
+    assert b'alice' in http.get('/leaderboard').data
+    assert b'alice' in http.get('/leaderboard').data
+    assert http.get('/api/v1/leaderboard').json['users'][0]['username'] == 'alice'
+    assert len(loads) == 1
+
+
+def test_malformed_comment_cursor_shows_the_cached_first_page(client, monkeypatch):
+    vidstream, http = client
+    monkeypatch.setattr(vidstream, 'run_reads',
+                        lambda *queries: [video_row(), []][:len(queries)])
+
+    first = http.get('/video/7')
+    size = vidstream.read_cache.local.stats()['size']
+    junk = [http.get(f'/video/7?before={value}') for value in ('junk', 'x' * 50, '%00')]
+
+    assert vidstream.read_cache.local.stats()['size'] == size
+    for response in junk:
+        assert b'Live comments and replies' in response.data
+        assert b'Newest' not in response.data
+    assert b'Live comments and replies' in first.data
+
+
+def test_metrics_without_a_token_only_answer_localhost(client, monkeypatch):
+    vidstream, http = client
+    monkeypatch.setitem(vidstream.app.config, 'METRICS_TOKEN', None)
+
+    assert http.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'}).status_code == 403
+    assert http.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 200
+
+
+def test_metrics_with_a_token_require_it(client, monkeypatch):
+    vidstream, http = client
+    monkeypatch.setitem(vidstream.app.config, 'METRICS_TOKEN', 's3cret')
+    remote = {'REMOTE_ADDR': '203.0.113.9'}
+
+    assert http.get('/metrics', environ_base=remote).status_code == 401
+    assert http.get('/metrics', environ_base=remote, headers={'Authorization': 'Bearer nope'}).status_code == 401
+    assert http.get('/metrics', environ_base=remote,
+                    headers={'Authorization': 'Bearer s3cret'}).status_code == 200
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import pymysql
+import pytest
+
+import async_db
+from async_db import AsyncDatabase
+from db_pool import PoolTimeout
+
+
+def loop_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'async-db']
+
+
+class HangingDatabase(AsyncDatabase):
+    async def _create_pool(self):
+        await asyncio.sleep(60)
+
+
+class RefusedDatabase(AsyncDatabase):
+    async def _create_pool(self):
+        raise pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+
+
+@pytest.fixture(autouse=True)
+def fake_aiomysql(monkeypatch):
+    monkeypatch.setattr(async_db, 'aiomysql', object())
+
+
+def test_slow_pool_creation_times_out_and_cleans_up():
+    database = HangingDatabase({}, timeout=0.1)
+
+    for _ in range(3):
+        with pytest.raises(PoolTimeout):
+            database.gather(("SELECT 1", (), True))
+
+    assert loop_threads() == []
+    assert database.stats()['started'] is False
+    assert database.stats()['timeouts'] == 3
+
+
+def test_failed_pool_creation_raises_and_cleans_up():
+    database = RefusedDatabase({}, timeout=1)
+
+    for _ in range(3):
+        with pytest.raises(pymysql.err.OperationalError):
+            database.gather(("SELECT 1", (), True))
+
+    assert loop_threads() == []
+    assert database.stats()['started'] is False
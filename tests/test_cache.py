@@ -0,0 +1,258 @@
+import threading
+import time
+
+from cache import MISSING, MemoryStore, TieredCache
+
+
+def counting_loader(value, calls, delay=0):
+    def load():
+        calls.append(value)
+        if delay:
+            time.sleep(delay)
+        return value
+    return load
+
+
+def test_local_hit_skips_the_loader():
+    cache = TieredCache()
+    calls = []
+
+    assert cache.get_or_load('key', counting_loader('a', calls)) == 'a'
+    assert cache.get_or_load('key', counting_loader('b', calls)) == 'a'
+    assert calls == ['a']
+    stats = cache.stats()
+    assert stats['local_hits'] == 1 and stats['loads'] == 1
+
+
+def test_shared_hit_fills_another_process():
+    store = MemoryStore()
+    first, second = TieredCache(shared=store), TieredCache(shared=store)
+    calls = []
+
+    first.get_or_load(('video', 1), counting_loader('a', calls))
+    assert second.get_or_load(('video', 1), counting_loader('b', calls)) == 'a'
+    assert calls == ['a']
+    assert second.stats()['shared_hits'] == 1
+
+    # Now in second's local tier too
+    assert second.get(('video', 1)) == 'a'
+    assert second.stats()['local_hits'] == 1
+
+
+def test_shared_false_stays_in_process():
+    store = MemoryStore()
+    first, second = TieredCache(shared=store), TieredCache(shared=store)
+
+    first.set('fragment', 'html', shared=False)
+
+    assert first.get('fragment') == 'html'
+    assert second.get('fragment') is MISSING
+
+
+def test_expired_entries_miss():
+    cache = TieredCache()
+    cache.set('key', 'value', ttl=0.05)
+    time.sleep(0.1)
+
+    assert cache.get('key') is MISSING
+
+
+def test_invalidate_expires_tagged_entries_only():
+    cache = TieredCache()
+    cache.set('feed', 'videos', tags=('videos',))
+    cache.set('stats', 'stats', tags=('video:1',))
+    cache.set('both', 'both', tags=('videos', 'video:1'))
+
+    cache.invalidate('videos')
+
+    assert cache.get('feed') is MISSING
+    assert cache.get('both') is MISSING
+    assert cache.get('stats') == 'stats'
+
+
+def test_entries_stored_after_invalidation_hit():
+    cache = TieredCache()
+    cache.set('feed', 'old', tags=('videos',))
+    cache.invalidate('videos')
+    cache.set('feed', 'new', tags=('videos',))
+
+    assert cache.get('feed') == 'new'
+
+
+def test_invalidation_reaches_other_processes_after_tag_ttl():
+    store = MemoryStore()
+    first = TieredCache(shared=store, tag_ttl=0.05)
+    second = TieredCache(shared=store, tag_ttl=0.05)
+    first.set('feed', 'old', tags=('videos',))
+    assert second.get('feed') == 'old'
+
+    first.invalidate('videos')
+    assert first.get('feed') is MISSING
+    time.sleep(0.1)
+    assert second.get('feed') is MISSING
+
+
+def test_invalidation_during_a_load_wins():
+    cache = TieredCache()
+
+    def load():
+        cache.invalidate('videos')  # a write lands while the page is being read
+        return 'stale'
+
+    assert cache.get_or_load('feed', load, tags=('videos',)) == 'stale'
+    assert cache.get('feed') is MISSING
+
+
+def test_unused_tags_are_forgotten():
+    cache = TieredCache(ttl=0.05)
+    cache.set('before', 'value', tags=('video:1',))
+    cache.invalidate(*[f'video:{n}' for n in range(100)])
+    assert cache.stats()['tags'] == 100
+
+    time.sleep(0.1)
+    cache.invalidate('video:100')
+
+    assert cache.stats()['tags'] == 1
+    assert cache.get('before') is MISSING  # forgetting a tag never revives older entries
+
+
+def test_unused_tags_are_forgotten_with_a_shared_store():
+    store = MemoryStore()
+    cache = TieredCache(shared=store, tag_ttl=0.05)
+    cache.set('stats', 'old', tags=('video:1',))
+    cache.invalidate(*[f'video:{n}' for n in range(100)])
+
+    time.sleep(0.1)
+    cache.invalidate('video:100')
+
+    assert cache.stats()['tags'] == 1
+    assert cache.get('stats') is MISSING  # versions are re-read from the store
+
+
+def test_concurrent_misses_load_once():
+    cache = TieredCache()
+    calls = []
+    loader = counting_loader('value', calls, delay=0.1)
+    start = threading.Barrier(8)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(cache.get_or_load('key', loader))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['value'] * 8
+    assert calls == ['value']
+
+
+def test_concurrent_misses_across_processes_load_once():
+    store = MemoryStore()
+    caches = [TieredCache(shared=store) for _ in range(4)]
+    calls = []
+    loader = counting_loader('value', calls, delay=0.2)
+    start = threading.Barrier(len(caches))
+    results = []
+
+    def worker(cache):
+        start.wait()
+        results.append(cache.get_or_load('key', loader))
+
+    threads = [threading.Thread(target=worker, args=(cache,)) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['value'] * 4
+    assert calls == ['value']
+
+
+def test_slow_load_does_not_block_other_keys():
+    cache = TieredCache()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.5)
+        return 'slow'
+
+    thread = threading.Thread(target=cache.get_or_load, args=('slow', slow))
+    thread.start()
+    started.wait()
+    began = time.monotonic()
+    for n in range(200):  # covers every key a striped lock could have shared with 'slow'
+        cache.get_or_load(('other', n), lambda: 'fast')
+    elapsed = time.monotonic() - began
+    thread.join()
+
+    assert elapsed < 0.25
+
+
+def test_loader_may_load_other_keys():
+    cache = TieredCache(lock_timeout=1)
+
+    def outer():
+        return cache.get_or_load('inner', lambda: 'rows') + '!'
+
+    assert cache.get_or_load('outer', outer) == 'rows!'
+    assert cache.get('inner') == 'rows'
+
+
+def test_loader_asking_for_its_own_key_does_not_wait():
+    cache = TieredCache(lock_timeout=5)
+    calls = []
+
+    def load():
+        calls.append(1)
+        if len(calls) == 1:
+            return cache.get_or_load('key', load)
+        return 'value'
+
+    began = time.monotonic()
+    assert cache.get_or_load('key', load) == 'value'
+    assert time.monotonic() - began < 1
+
+
+def test_failed_load_lets_waiters_load():
+    cache = TieredCache()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError('database down')
+
+    errors = []
+
+    def leader():
+        try:
+            cache.get_or_load('key', failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    started.wait()
+    assert cache.get_or_load('key', lambda: 'value') == 'value'
+    thread.join()
+    assert len(errors) == 1
+
+
+def test_shared_store_errors_count_as_misses():
+    class BrokenStore(MemoryStore):
+        def get(self, key):
+            raise OSError('connection refused')
+
+        def get_many(self, keys):
+            raise OSError('connection refused')
+
+    cache = TieredCache(shared=BrokenStore())
+    calls = []
+
+    assert cache.get_or_load('key', counting_loader('value', calls)) == 'value'
+    assert cache.stats()['shared_errors'] > 0
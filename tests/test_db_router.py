@@ -0,0 +1,214 @@
+import pymysql
+import pytest
+
+from conftest import FakePool
+from db_router import Replica, ReplicaRouter
+
+
+def make_router(*replica_pools, **kwargs):
+    primary = FakePool('primary')
+    replicas = [Replica(pool.name, pool) for pool in replica_pools]
+    return primary, ReplicaRouter(primary, replicas, **kwargs)
+
+
+def test_reads_are_spread_round_robin():
+    first, second = FakePool('replica1'), FakePool('replica2')
+    primary, router = make_router(first, second)
+
+    pools = [router.acquire().pool for _ in range(4)]
+
+    assert pools == [first, second, first, second]
+    assert primary.acquired == 0
+
+
+def test_lagging_replica_is_skipped():
+    lagging = FakePool('replica1', status={'Seconds_Behind_Source': 30})
+    healthy = FakePool('replica2', status={'Seconds_Behind_Source': 1})
+    primary, router = make_router(lagging, healthy, max_lag=5)
+
+    pools = [router.acquire().pool for _ in range(3)]
+
+    assert pools == [healthy, healthy, healthy]
+    stats = router.stats()['replicas']
+    assert stats[0]['healthy'] is False and stats[0]['lag'] == 30
+    assert stats[1]['healthy'] is True and stats[1]['reads'] == 3
+
+
+def test_stopped_replication_counts_as_lagging():
+    stopped = FakePool('replica1', status={'Seconds_Behind_Source': None})
+    primary, router = make_router(stopped)
+
+    assert router.acquire().pool is primary
+
+
+def test_lag_check_uses_older_status_column():
+    replica = FakePool('replica1', status={'Seconds_Behind_Master': 2})
+    primary, router = make_router(replica, max_lag=5)
+
+    assert router.acquire().pool is replica
+
+
+def test_lag_check_skipped_without_privilege():
+    denied = pymysql.err.OperationalError(1227, 'Access denied; you need the REPLICATION CLIENT privilege')
+    replica = FakePool('replica1', error=denied)
+    primary, router = make_router(replica)
+
+    assert router.acquire().pool is replica
+    assert router.acquire().pool is replica
+    assert router.replicas[0].check_lag is False
+
+
+def test_fails_over_to_the_next_replica():
+    broken, healthy = FakePool('replica1'), FakePool('replica2')
+    broken.down = True
+    primary, router = make_router(broken, healthy)
+
+    pools = [router.acquire().pool for _ in range(3)]
+
+    assert pools == [healthy, healthy, healthy]
+    assert router.stats()['replicas'][0]['failures'] == 1  # not retried until retry_interval passes
+
+
+def test_replica_is_retried_after_retry_interval(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('db_router.time.monotonic', lambda: clock[0])
+    replica = FakePool('replica1')
+    replica.down = True
+    primary, router = make_router(replica, retry_interval=30)
+
+    assert router.acquire().pool is primary
+    replica.down = False
+    clock[0] += 10
+    assert router.acquire().pool is primary
+    clock[0] += 25
+    assert router.acquire().pool is replica
+
+
+def test_all_replicas_down_falls_back_to_primary():
+    first, second = FakePool('replica1'), FakePool('replica2')
+    first.down = second.down = True
+    primary, router = make_router(first, second)
+
+    assert router.acquire().pool is primary
+    assert router.acquire().pool is primary
+    assert router.stats()['fallbacks_to_primary'] == 2
+
+
+def test_no_replicas_reads_from_primary():
+    primary, router = make_router()
+
+    assert router.acquire().pool is primary
+    assert router.stats()['fallbacks_to_primary'] == 0
+
+
+@pytest.fixture
+def app_pools(monkeypatch):
+    import app as vidstream
+
+    primary, router = make_router(FakePool('replica1'))
+    monkeypatch.setattr(vidstream, 'db_pool', primary)
+    monkeypatch.setattr(vidstream, 'read_router', router)
+    return vidstream, primary, router
+
+
+def test_reads_go_to_replicas_without_recent_writes(app_pools):
+    vidstream, primary, router = app_pools
+    with vidstream.app.test_request_context('/'):
+        conn = vidstream.get_read_connection()
+        assert conn.pool is router.replicas[0].pool
+
+
+def test_session_sticks_to_primary_after_a_write(app_pools, monkeypatch):
+    vidstream, primary, router = app_pools
+    clock = [1000.0]
+    monkeypatch.setattr('app.time.time', lambda: clock[0])
+
+    with vidstream.app.test_request_context('/'):
+        vidstream.stick_to_primary()
+        assert vidstream.get_read_connection().pool is primary
+        session_state = dict(vidstream.session)
+
+    # Once DB_STICKY_SECONDS have passed the session reads from replicas again
+    clock[0] += vidstream.app.config['DB_STICKY_SECONDS'] + 1
+    with vidstream.app.test_request_context('/'):
+        vidstream.session.update(session_state)
+        assert vidstream.get_read_connection().pool is router.replicas[0].pool
+
+
+def test_request_holding_a_primary_connection_reads_from_it(app_pools):
+    vidstream, primary, router = app_pools
+    with vidstream.app.test_request_context('/'):
+        written = vidstream.get_db_connection()
+        assert vidstream.get_read_connection() is written
+
+
+def test_choose_skips_lagging_and_unreachable_replicas():
+    lagging = FakePool('replica1', status={'Seconds_Behind_Source': 30})
+    broken = FakePool('replica2')
+    broken.down = True
+    healthy = FakePool('replica3')
+    primary, router = make_router(lagging, broken, healthy, max_lag=5)
+
+    assert router.choose().pool is healthy
+    assert router.choose().pool is healthy
+    assert primary.acquired == 0
+
+
+def test_choose_returns_none_when_every_replica_is_down():
+    replica = FakePool('replica1')
+    primary, router = make_router(replica)
+
+    router.mark_down(router.replicas[0], 'async query failed')
+
+    assert router.choose() is None
+    assert router.stats()['fallbacks_to_primary'] == 1
+
+
+class FakeAsyncDatabase:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.batches = 0
+
+    def gather(self, *queries, on_query=None):
+        self.batches += 1
+        if self.error is not None:
+            raise self.error
+        return [self.name for _ in queries]
+
+
+@pytest.fixture
+def async_app(app_pools, monkeypatch):
+    vidstream, primary, router = app_pools
+    databases = {'primary': FakeAsyncDatabase('primary'), 'replica1': FakeAsyncDatabase('replica1')}
+    monkeypatch.setitem(vidstream.app.config, 'DB_ASYNC', True)
+    monkeypatch.setattr(vidstream, 'async_db', databases['primary'])
+    monkeypatch.setattr(vidstream, 'async_replicas', {'replica1': databases['replica1']})
+    return vidstream, router, databases
+
+
+QUERY = ("SELECT 1", (), True)
+
+
+def test_async_reads_go_to_replicas(async_app):
+    vidstream, router, databases = async_app
+    with vidstream.app.test_request_context('/'):
+        assert vidstream.run_reads(QUERY, QUERY) == ['replica1', 'replica1']
+
+
+def test_async_reads_stick_to_primary_after_a_write(async_app):
+    vidstream, router, databases = async_app
+    with vidstream.app.test_request_context('/'):
+        vidstream.stick_to_primary()
+        assert vidstream.run_reads(QUERY) == ['primary']
+    assert databases['replica1'].batches == 0
+
+
+def test_async_replica_failure_retries_on_primary(async_app):
+    vidstream, router, databases = async_app
+    databases['replica1'].error = pymysql.err.OperationalError(2013, 'Lost connection to MySQL server')
+    with vidstream.app.test_request_context('/'):
+        assert vidstream.run_reads(QUERY) == ['primary']
+        assert vidstream.run_reads(QUERY) == ['primary']
+    assert databases['replica1'].batches == 1  # skipped once marked down
+    assert router.stats()['replicas'][0]['healthy'] is False
@@ -0,0 +1,55 @@
+from mentions import UsernameCache, extract_mentions
+
+
+class UsersCursor:
+    """Answers the IN (...) lookup from `users`, in table order rather than argument order"""
+
+    def __init__(self, users):
+        self.users = users
+        self.queries = []
+        self._rows = []
+
+    def execute(self, sql, args):
+        self.queries.append(list(args))
+        wanted = {name.lower() for name in args}
+        self._rows = [{'user_id': user_id, 'username': name}
+                      for user_id, name in self.users if name.lower() in wanted]
+
+    def fetchall(self):
+        return self._rows
+
+
+USERS = [(1, 'Bob'), (2, 'alice'), (3, 'carol')]
+
+
+def test_extract_mentions_keeps_first_appearance():
+    assert extract_mentions('@alice hi @Bob and @ALICE again') == ['alice', 'Bob']
+
+
+def test_resolve_keeps_input_order_across_cache_hits():
+    cache = UsernameCache()
+    cursor = UsersCursor(USERS)
+    cache.resolve(cursor, ['bob'])
+
+    resolved = cache.resolve(cursor, extract_mentions('@alice hi @bob'))
+
+    assert list(resolved) == ['alice', 'bob']
+    assert list(resolved.values())[0] == (2, 'alice')
+    assert cursor.queries[-1] == ['alice']  # bob came from the cache
+
+
+def test_resolve_keeps_input_order_from_the_database():
+    cursor = UsersCursor(USERS)
+
+    resolved = UsernameCache().resolve(cursor, ['carol', 'Alice', 'bob'])
+
+    assert list(resolved.items()) == [('carol', (3, 'carol')), ('alice', (2, 'alice')), ('bob', (1, 'Bob'))]
+
+
+def test_unknown_usernames_are_cached_as_none():
+    cache = UsernameCache()
+    cursor = UsersCursor(USERS)
+
+    assert cache.resolve(cursor, ['nobody', 'alice']) == {'nobody': None, 'alice': (2, 'alice')}
+    assert cache.resolve(cursor, ['nobody']) == {'nobody': None}
+    assert len(cursor.queries) == 1
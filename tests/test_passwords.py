@@ -0,0 +1,90 @@
+import time
+
+from cache import MemoryStore
+from passwords import LoginRateLimiter, PasswordHasher
+
+
+def test_memory_store_sweeps_expired_keys_on_write():
+    store = MemoryStore(purge_interval=0.05)
+    for n in range(1000):
+        store.incr(f'login:ip:10.0.{n // 256}.{n % 256}', 0.05)
+    assert len(store) == 1000
+
+    time.sleep(0.1)
+    store.incr('login:ip:10.1.0.1', 60)
+
+    assert len(store) == 1
+
+
+def test_memory_store_keeps_live_and_unexpiring_keys():
+    store = MemoryStore(purge_interval=0)
+    store.set('live', b'1', 60)
+    store.incr('forever')
+    store.set('gone', b'1', 0.01)
+    time.sleep(0.02)
+    store.add('other', b'1', 60)
+
+    assert store.get_many(['live', 'forever', 'gone']) == [b'1', b'1', None]
+    assert len(store) == 3
+
+
+def test_rate_limiter_counters_do_not_outlive_their_window():
+    store = MemoryStore(purge_interval=0)
+    limiter = LoginRateLimiter(store, window=0.5)
+
+    for n in range(1000):
+        limiter.attempted(f'10.0.{n // 256}.{n % 256}')
+        limiter.failed(f'made-up-{n}')
+    assert len(store) == 2000
+
+    time.sleep(0.6)
+    limiter.attempted('10.1.0.1')
+
+    assert len(store) == 1
+
+
+def test_rate_limiter_blocks_per_ip_and_per_user():
+    limiter = LoginRateLimiter(MemoryStore(), max_per_ip=3, max_failures_per_user=2, window=300)
+
+    for _ in range(3):
+        assert limiter.retry_after('10.0.0.1', 'alice') == 0
+        limiter.attempted('10.0.0.1')
+    assert limiter.retry_after('10.0.0.1', 'bob') > 0
+    assert limiter.retry_after('10.0.0.2', 'bob') == 0
+
+    limiter.failed('Bob')
+    limiter.failed('bob')
+    assert limiter.retry_after('10.0.0.2', 'bob') > 0
+    limiter.succeeded('BOB')
+    assert limiter.retry_after('10.0.0.2', 'bob') == 0
+
+
+def test_zero_turns_a_limit_off():
+    limiter = LoginRateLimiter(MemoryStore(), max_per_ip=0, max_failures_per_user=1)
+
+    for _ in range(100):
+        limiter.attempted('10.0.0.1')
+    assert limiter.retry_after('10.0.0.1', 'alice') == 0
+
+    limiter.failed('alice')
+    assert limiter.retry_after('10.0.0.1', 'alice') > 0
+
+
+def test_hasher_round_trip_in_worker_processes():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+    try:
+        password_hash = hasher.hash('secret')
+        assert hasher.verify(password_hash, 'secret') == (True, None)
+        assert hasher.verify(password_hash, 'wrong') == (False, None)
+    finally:
+        hasher.stop()
+
+
+def test_hasher_upgrades_hashes_made_with_other_settings():
+    old = PasswordHasher(method='pbkdf2:sha256:1000', workers=0).hash('secret')
+    hasher = PasswordHasher(method='pbkdf2:sha256:2000', workers=0)
+
+    matches, new_hash = hasher.verify(old, 'secret')
+
+    assert matches and new_hash.startswith('pbkdf2:sha256:2000$')
+    assert hasher.verify(new_hash, 'secret') == (True, None)
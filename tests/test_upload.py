@@ -0,0 +1,80 @@
+import hashlib
+import io
+
+import pymysql
+import pytest
+
+
+class FailingInsertCursor:
+    """Accepts the refcount statements and fails the INSERT INTO videos"""
+
+    lastrowid = 1
+
+    def execute(self, sql, args=None):
+        if 'INSERT INTO videos' in sql:
+            raise pymysql.err.OperationalError(1205, 'Lock wait timeout exceeded')
+
+    def fetchone(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.rolled_back = False
+
+    def cursor(self):
+        return FailingInsertCursor()
+
+    def commit(self):
+        raise AssertionError('nothing should commit')
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def upload(monkeypatch, tmp_path):
+    import app as vidstream
+
+    conn = FakeConnection()
+    monkeypatch.setitem(vidstream.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(vidstream, 'get_db_connection', lambda: conn)
+    http = vidstream.app.test_client()
+    with http.session_transaction() as session:
+        session['user_id'] = 1
+        session['username'] = 'alice'
+
+    def post(content):
+        return http.post('/upload', data={
+            'title': 'Cats', 'description': '',
+            'thumbnail': (io.BytesIO(content), 'фото.jpg'),
+        }, content_type='multipart/form-data')
+    return post, conn, tmp_path
+
+
+def test_failed_insert_removes_the_file_it_stored(upload):
+    post, conn, folder = upload
+
+    response = post(b'new image bytes')
+
+    assert response.status_code == 302
+    assert conn.rolled_back
+    assert list(folder.iterdir()) == []
+
+
+def test_failed_insert_keeps_a_file_other_videos_share(upload):
+    post, conn, folder = upload
+    content = b'shared image bytes'
+    shared = folder / (hashlib.sha256(content).hexdigest()[:32] + '.jpg')
+    shared.write_bytes(content)  # already stored for another video
+
+    post(content)
+
+    assert conn.rolled_back
+    assert shared.exists()
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only originals are served
+    Image = None
+
+
+CHUNK_SIZE = 64 * 1024
+
+# <32 hex chars of SHA-256>[_<size>].<ext>; the bytes behind such a name never change
+CONTENT_NAME = re.compile(r'^[0-9a-f]{32}(_[a-z]+)?\.[a-z0-9]+$')
+
+# Variant name -> max width in pixels. Variants never upscale.
+VARIANT_WIDTHS = {
+    'sm': 320,
+    'md': 640,
+    'lg': 1280,
+}
+
+
+def stream_upload(file, upload_folder):
+    """Stream an uploaded file to a temporary file, hashing it on the way.
+
+    The file is copied in CHUNK_SIZE pieces, so it is never held in
+    memory. Returns (temp_path, sha256 hexdigest); hand temp_path to
+    store_upload() once the name is settled.
+    """
+    os.makedirs(upload_folder, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=upload_folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path, digest.hexdigest()
+
+
+def store_upload(temp_path, upload_folder, filename):
+    """Move a streamed upload into place as `filename`.
+
+    If a file with that (content-hash) name already exists the temporary
+    copy is discarded instead, so identical uploads share one file.
+    Returns True if this call created the file.
+    """
+    final_path = os.path.join(upload_folder, filename)
+    if os.path.exists(final_path):
+        os.remove(temp_path)
+        return False
+    os.replace(temp_path, final_path)
+    return True
+
+
+def is_content_addressed(filename):
+    """True for names produced by stream_upload() and their variants"""
+    return CONTENT_NAME.match(filename) is not None
+
+
+def variant_name(filename, size):
+    """File name of a resized WebP variant of `filename`"""
+    stem = filename.rsplit('.', 1)[0]
+    return f"{stem}_{size}.webp"
+
+
+class ThumbnailProcessor:
+    """Resizes uploaded thumbnails into WebP variants on a worker pool.
+
+    submit() returns immediately; variants appear on disk once a worker
+    finishes. has_variant() lets templates fall back to the original
+    until then.
+    """
+
+    def __init__(self, upload_folder, max_workers=2, quality=80):
+        self.upload_folder = upload_folder
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='thumbnail')
+        self._ready = set()  # (filename, size) known to exist on disk
+        self._in_flight = set()  # filenames queued or being processed
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    def submit(self, filename):
+        """Queue variant generation for an uploaded file"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            # A deduplicated re-upload of a file that is already being resized
+            if filename in self._in_flight:
+                return None
+            self._in_flight.add(filename)
+        return self._executor.submit(self._process, filename)
+
+    def _process(self, filename):
+        source = os.path.join(self.upload_folder, filename)
+        try:
+            with Image.open(source) as image:
+                image.load()
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+                for size, width in VARIANT_WIDTHS.items():
+                    target = os.path.join(self.upload_folder, variant_name(filename, size))
+                    if os.path.exists(target):
+                        self._mark_ready(filename, size)
+                        continue
+                    variant = image.copy()
+                    variant.thumbnail((width, width * 4))
+                    temp_path = f"{target}.tmp"
+                    variant.save(temp_path, 'WEBP', quality=self.quality)
+                    os.replace(temp_path, target)
+                    self._mark_ready(filename, size)
+        except (OSError, ValueError) as e:
+            print(f"Error creating thumbnail variants for {filename}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(filename)
+
+    def _mark_ready(self, filename, size):
+        with self._lock:
+            self._ready.add((filename, size))
+
+    def has_variant(self, filename, size):
+        """True if the `size` variant of `filename` exists on disk"""
+        if not self.enabled:
+            return False
+        key = (filename, size)
+        with self._lock:
+            if key in self._ready:
+                return True
+        if os.path.exists(os.path.join(self.upload_folder, variant_name(filename, size))):
+            self._mark_ready(filename, size)
+            return True
+        return False
+
+    def remove(self, filename):
+        """Delete an original and all of its variants"""
+        paths = [filename] + [variant_name(filename, size) for size in VARIANT_WIDTHS]
+        with self._lock:
+            self._ready -= {(filename, size) for size in VARIANT_WIDTHS}
+        for name in paths:
+            path = os.path.join(self.upload_folder, name)
+            if os.path.exists(path):
+                os.remove(path)
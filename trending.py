@@ -0,0 +1,264 @@
+import heapq
+import math
+import threading
+import time
+
+import pymysql
+
+from db_pool import PoolTimeout
+
+
+# Same shape (and 30-day window) as the original /trending query, minus the
+# ORDER BY / LIMIT, so the engine can be checked against it.
+SQL_TRENDING = """
+    SELECT
+        v.video_id,
+        v.title,
+        v.thumbnail_path,
+        v.views,
+        u.username,
+        COUNT(DISTINCT c.comment_id) AS comment_count,
+        v.created_at
+    FROM videos v
+    JOIN users u ON v.user_id = u.user_id
+    LEFT JOIN comments c ON v.video_id = c.video_id
+    WHERE v.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
+    GROUP BY v.video_id, v.title, v.thumbnail_path, v.views, u.username, v.created_at
+"""
+
+SQL_WINDOW = """
+    SELECT
+        v.video_id,
+        v.title,
+        v.thumbnail_path,
+        v.views,
+        u.username,
+        COALESCE(vs.comment_count, 0) AS comment_count,
+        v.created_at
+    FROM videos v
+    JOIN users u ON v.user_id = u.user_id
+    LEFT JOIN video_stats vs ON v.video_id = vs.video_id
+    WHERE v.created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
+"""
+
+
+class TrendingEngine:
+    """Incrementally maintained, time-decayed trending list.
+
+    Every video uploaded in the last `window_days` has an in-memory entry
+    with its view and comment counts and a score that decays by half every
+    `half_life_hours`. record_view() and record_comment() decay the score to
+    now and add the event's weight, so a burst of recent activity outranks
+    a large but old total.
+
+    top() returns a precomputed top-N list. It is rebuilt from the in-memory
+    entries every `refresh_interval` seconds, and entry membership and
+    counters are resynced from the database every `resync_interval` seconds
+    to pick up activity seen by other worker processes. Both happen on a
+    background thread; only the very first top() call loads synchronously.
+    """
+
+    def __init__(self, pool, window_days=30, top_n=20, half_life_hours=24, view_weight=1,
+                 comment_weight=5, refresh_interval=60, resync_interval=600):
+        self.pool = pool
+        self.window_days = window_days
+        self.top_n = top_n
+        self.half_life = half_life_hours * 3600
+        self.view_weight = view_weight
+        self.comment_weight = comment_weight
+        self.refresh_interval = refresh_interval
+        self.resync_interval = resync_interval
+
+        self._lock = threading.Lock()
+        self._videos = {}  # video_id -> entry
+        self._top = []
+        self._version = 0  # bumped whenever _top changes, for caching rendered copies
+        self._loaded = False
+        self._refreshing = False
+        self._refreshed_at = 0.0
+        self._resynced_at = 0.0
+
+    def _decay_to(self, entry, now):
+        elapsed = now - entry['touched']
+        if elapsed > 0:
+            entry['score'] *= 0.5 ** (elapsed / self.half_life)
+            entry['touched'] = now
+
+    def _seed_score(self, views, comments, created_at, now):
+        """Estimate a decayed score for a video whose event times are unknown.
+
+        Assumes its engagement was spread evenly since upload and integrates
+        the decay curve over that period.
+        """
+        total = views * self.view_weight + comments * self.comment_weight
+        age = max(now - created_at.timestamp(), 3600)
+        rate = total / age
+        return rate * self.half_life / math.log(2) * (1 - 0.5 ** (age / self.half_life))
+
+    def _bump(self, video_id, field, weight, count):
+        with self._lock:
+            entry = self._videos.get(video_id)
+            if entry is None:
+                # Unknown or outside the window; the next resync decides
+                return
+            self._decay_to(entry, time.time())
+            entry['score'] += weight * count
+            entry[field] += count
+
+    def record_view(self, video_id, count=1):
+        self._bump(video_id, 'views', self.view_weight, count)
+
+    def record_comment(self, video_id, count=1):
+        self._bump(video_id, 'comment_count', self.comment_weight, count)
+
+    def record_video(self, video_id, title, thumbnail_path, username, created_at):
+        """Add a freshly uploaded video with no engagement yet"""
+        with self._lock:
+            self._videos[video_id] = {
+                'video_id': video_id,
+                'title': title,
+                'thumbnail_path': thumbnail_path,
+                'username': username,
+                'created_at': created_at,
+                'views': 0,
+                'comment_count': 0,
+                'score': 0.0,
+                'touched': time.time(),
+            }
+
+    def remove_video(self, video_id):
+        with self._lock:
+            self._videos.pop(video_id, None)
+            self._top = [video for video in self._top if video['video_id'] != video_id]
+            self._version += 1
+
+    def top(self):
+        """Return the precomputed trending list, refreshing it in the background when stale"""
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """(version, videos): top()'s list and the version it was built as, read together.
+
+        The version changes every time the list is rebuilt, so it can key
+        rendered copies of exactly this list.
+        """
+        if not self._loaded:
+            self.resync()
+        now = time.monotonic()
+        with self._lock:
+            stale = now - self._refreshed_at >= self.refresh_interval
+            if stale and not self._refreshing:
+                self._refreshing = True
+                resync = now - self._resynced_at >= self.resync_interval
+                threading.Thread(target=self._background_refresh, args=(resync,),
+                                 name='trending-refresh', daemon=True).start()
+            return self._version, self._top
+
+    @property
+    def loaded(self):
+        """False until the entries have been loaded from the database once"""
+        return self._loaded
+
+    def _background_refresh(self, resync):
+        try:
+            if resync:
+                self.resync()
+            else:
+                self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh(self):
+        """Rebuild the top-N list from the in-memory entries"""
+        now = time.time()
+        cutoff = now - self.window_days * 86400
+        with self._lock:
+            for video_id in [vid for vid, entry in self._videos.items()
+                             if entry['created_at'].timestamp() < cutoff]:
+                del self._videos[video_id]
+            for entry in self._videos.values():
+                self._decay_to(entry, now)
+            best = heapq.nlargest(self.top_n, self._videos.values(),
+                                  key=lambda entry: (entry['score'], entry['views'], entry['video_id']))
+            self._top = [{key: value for key, value in entry.items() if key != 'touched'}
+                         for entry in best]
+            self._version += 1
+            self._refreshed_at = time.monotonic()
+
+    def resync(self):
+        """Reload window membership and counters from the database, then refresh.
+
+        Existing entries keep their decayed scores; only videos new to this
+        process get a seeded score.
+        """
+        try:
+            rows = self._query(SQL_WINDOW, (self.window_days,))
+        except (pymysql.Error, PoolTimeout) as e:
+            print(f"Error loading trending videos: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            fresh = {}
+            for row in rows:
+                entry = self._videos.get(row['video_id'])
+                if entry is None:
+                    entry = dict(row, touched=now,
+                                 score=self._seed_score(row['views'], row['comment_count'], row['created_at'], now))
+                else:
+                    entry.update(row)
+                fresh[row['video_id']] = entry
+            self._videos = fresh
+            self._loaded = True
+            self._resynced_at = time.monotonic()
+        self.refresh()
+
+    def _query(self, sql, params):
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+        finally:
+            conn.release()
+
+    def check(self):
+        """Compare a from-scratch rebuild with the original GROUP BY query.
+
+        Returns a dict with counter mismatches between the engine and SQL,
+        and the overlap between the decayed top-N and SQL's views-ordered
+        top-N (they are expected to differ in order, not wildly in content).
+        """
+        self._loaded = False
+        with self._lock:
+            self._videos = {}
+        self.resync()
+
+        rows = self._query(SQL_TRENDING, (self.window_days,))
+        expected = {row['video_id']: row for row in rows}
+        with self._lock:
+            engine = {video_id: dict(entry) for video_id, entry in self._videos.items()}
+            engine_top = [video['video_id'] for video in self._top]
+
+        mismatches = []
+        for video_id in sorted(set(expected) | set(engine)):
+            want, got = expected.get(video_id), engine.get(video_id)
+            if want is None or got is None:
+                mismatches.append({'video_id': video_id, 'in_sql': want is not None, 'in_engine': got is not None})
+            elif (want['views'], want['comment_count']) != (got['views'], got['comment_count']):
+                mismatches.append({'video_id': video_id,
+                                   'sql': (want['views'], want['comment_count']),
+                                   'engine': (got['views'], got['comment_count'])})
+
+        sql_top = [row['video_id'] for row in sorted(rows, key=lambda row: (row['views'], row['comment_count']),
+                                                    reverse=True)[:self.top_n]]
+        return {
+            'videos': len(expected),
+            'mismatches': mismatches,
+            'engine_top': engine_top,
+            'sql_top': sql_top,
+            'top_overlap': len(set(engine_top) & set(sql_top)),
+        }
@@ -0,0 +1,157 @@
+import os
+import threading
+
+import pymysql
+
+from db_pool import PoolTimeout
+
+
+class ViewCounter:
+    """Write-behind accumulator for video view counts.
+
+    increment() only touches an in-memory dict. A background thread
+    coalesces the pending counts per video_id and writes them with one
+    multi-row UPDATE every `flush_interval` seconds, or sooner once
+    `flush_threshold` views are pending. stop() performs a final flush.
+
+    Loss bound: a crash loses at most the views recorded since the last
+    successful flush, i.e. roughly `flush_interval` seconds of traffic or
+    `flush_threshold` views, whichever comes first. If the database is
+    unreachable, unflushed counts are kept and retried, but never more
+    than `max_pending` views; beyond that new views are dropped and
+    counted in stats()['dropped'].
+    """
+
+    BATCH_SIZE = 500  # video_ids per UPDATE statement
+
+    def __init__(self, pool, flush_interval=5.0, flush_threshold=1000, max_pending=100000):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_total = 0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self._flushes = 0
+        self._flushed_views = 0
+        self._statements = 0
+        self._failures = 0
+        self._dropped = 0
+
+    def increment(self, video_id, count=1):
+        """Record `count` views for a video"""
+        self._ensure_started()
+        with self._lock:
+            if self._pending_total + count > self.max_pending:
+                self._dropped += count
+                return
+            self._pending[video_id] = self._pending.get(video_id, 0) + count
+            self._pending_total += count
+            full = self._pending_total >= self.flush_threshold
+        if full:
+            self._wakeup.set()
+
+    def pending(self, video_id):
+        """Views recorded for a video but not yet written to the database"""
+        with self._lock:
+            return self._pending.get(video_id, 0)
+
+    def flush(self):
+        """Write all pending counts now; returns the number of views written"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._pending_total = 0
+        if not batch:
+            return 0
+
+        try:
+            self._write(batch)
+        except (pymysql.Error, PoolTimeout) as e:
+            print(f"Error flushing view counts: {e}")
+            self._requeue(batch)
+            return 0
+
+        written = sum(batch.values())
+        with self._lock:
+            self._flushes += 1
+            self._flushed_views += written
+        return written
+
+    def _write(self, batch):
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.cursor()
+            items = sorted(batch.items())  # consistent lock order across workers
+            for start in range(0, len(items), self.BATCH_SIZE):
+                chunk = items[start:start + self.BATCH_SIZE]
+                cases = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+                placeholders = ', '.join(['%s'] * len(chunk))
+                params = [value for item in chunk for value in item]
+                params.extend(video_id for video_id, _ in chunk)
+                cursor.execute(f"""
+                    UPDATE videos
+                    SET views = views + CASE video_id {cases} END
+                    WHERE video_id IN ({placeholders})
+                """, params)
+                with self._lock:
+                    self._statements += 1
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.release()
+
+    def _requeue(self, batch):
+        with self._lock:
+            self._failures += 1
+            for video_id, count in batch.items():
+                if self._pending_total + count > self.max_pending:
+                    self._dropped += count
+                    continue
+                self._pending[video_id] = self._pending.get(video_id, 0) + count
+                self._pending_total += count
+
+    def _ensure_started(self):
+        # Checked per process so forked workers each get their own flusher
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stop(self):
+        """Stop the background thread and flush whatever is left"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self._thread = None
+        self.flush()
+
+    def stats(self):
+        """Snapshot of flush counters"""
+        with self._lock:
+            return {
+                'pending_views': self._pending_total,
+                'pending_videos': len(self._pending),
+                'flushes': self._flushes,
+                'flushed_views': self._flushed_views,
+                'statements': self._statements,
+                'failures': self._failures,
+                'dropped': self._dropped,
+            }